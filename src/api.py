@@ -1,51 +1,206 @@
 import aiohttp
-import json
 import asyncio
+import time
 import uuid
+from collections import Counter, OrderedDict, defaultdict, deque
 from loguru import logger
-from typing import Dict, Any, Optional
+from typing import Awaitable, Callable, Dict, Any, Iterable, List, Optional, Tuple
+from .utils.json_codec import get_codec
+from .utils.metrics import BucketHistogram, PrometheusWriter, RollingHistogram
+from .utils.send_scheduler import PRIORITY_LOW, SendScheduler, with_priority
+from .utils.api_cache import ApiCache
+from .utils.forward_message import build_nodes, needs_forward, split_text
+from .utils.send_coalescer import SendCoalescer
+from .utils.message_builder import Message, to_cq
+
+# 各API的默认超时上限（秒），查询类请求应尽快失败，不拖慢回复
+DEFAULT_ACTION_TIMEOUTS = {
+    "get_status": 5.0,
+    "get_login_info": 5.0,
+    "get_stranger_info": 5.0,
+    "get_group_info": 5.0,
+    "get_group_member_info": 5.0,
+    "get_friend_list": 10.0,
+    "get_group_list": 10.0,
+    "get_group_member_list": 15.0,
+    "send_like": 5.0,
+}
+
+# 只对幂等的查询类API自适应收紧超时。发送消息等API超时后NapCat可能仍会执行，
+# 收紧后偶尔一次较慢的调用会被当作失败（调用方可能重发），因此始终使用固定上限
+DEFAULT_ADAPTIVE_ACTIONS = (
+    "get_status",
+    "get_version_info",
+    "get_login_info",
+    "get_stranger_info",
+    "get_group_info",
+    "get_group_member_info",
+    "get_group_member_list",
+    "get_friend_list",
+    "get_group_list",
+    "get_msg",
+    "can_send_image",
+    "can_send_record",
+)
+
+# API调用结果：成功 / NapCat返回失败 / 超时 / 已发出但等待响应时断线 / 出站缓冲已满 /
+# 发送限速队列已满 / 无法连接HTTP API / 其他异常
+OUTCOMES = ("ok", "failed", "timeout", "disconnected", "dropped", "rejected", "unreachable", "error")
+# 确定没有送达、可以安全重发的结果（超时和断线时NapCat可能已经执行）
+UNDELIVERED = frozenset({"failed", "dropped", "rejected", "unreachable"})
+
+# 保留多少个已超时或已取消的请求，用于识别迟到的响应
+_EXPIRED_ECHO_LIMIT = 1000
 
 class API:
-    def __init__(self, bot):
+    def __init__(self, bot, config: Optional[Dict[str, Any]] = None, name: str = "default"):
         self.bot = bot
-        self.session = None
+        # 全机器人共用的HTTP连接池，HTTP方式调用API和插件的出站请求都使用它
+        self.http = bot.http
+        # 所属账号名称，以及负责收发的消息处理器（由MessageHandler创建时设置）
+        self.name = name
+        self.handler = None
         
-        config = bot.config["bot"]["napcat"]
+        config = config if config is not None else bot.config["bot"]["napcat"]
         self.host = config.get("host", "127.0.0.1")
         self.port = config.get("port", 5700)
         self.token = config.get("access_token", "")
         self.base_url = f"http://{self.host}:{self.port}"
-        self.api_timeout = 30.0
+        
+        # 按API设置超时：配置的值为上限，开启自适应后按观测到的延迟分位数收紧
+        timeout_config = config.get("api_timeouts", {})
+        self.api_timeout = float(timeout_config.get("default", 30.0))
+        self.action_timeouts = {
+            action: float(value)
+            for action, value in {**DEFAULT_ACTION_TIMEOUTS, **timeout_config.get("actions", {})}.items()
+        }
+        self.adaptive_timeouts = timeout_config.get("adaptive", True)
+        self.adaptive_min_timeout = float(timeout_config.get("min", 0.5))
+        self.adaptive_multiplier = float(timeout_config.get("multiplier", 4.0))
+        self.adaptive_min_samples = int(timeout_config.get("min_samples", 20))
+        self.adaptive_actions = frozenset(timeout_config.get("adaptive_actions", DEFAULT_ADAPTIVE_ACTIONS))
+        self._adaptive_timeout: Dict[str, float] = {}
+        self.action_latency: Dict[str, RollingHistogram] = {}
+        
+        # 按API统计：调用结果计数、进行中的请求数和累计延迟分布（/metrics）
+        # 结果见 OUTCOMES，其中 rejected / dropped / unreachable / failed 表示消息确定没有发出
+        self.results: Dict[str, Counter] = defaultdict(Counter)
+        self.inflight = Counter()
+        self.latency_buckets: Dict[str, BucketHistogram] = {}
+        # 超时、迟到和无主响应统计
+        self.timeouts = Counter()
+        self.late_responses = Counter()
+        self.orphan_responses = 0
+        # NapCat HTTP服务地址，没有可用的WebSocket连接时（如仅HTTP POST上报的账号）通过HTTP调用API
+        self.http_api_url = (config.get("http_api_url") or "").rstrip("/")
+        self.codec = get_codec(bot.config["bot"].get("json_codec", "auto"))
+        
+        # 断线期间的出站缓冲，重连后按顺序补发
+        self.outbound_buffer_size = config.get("outbound_buffer_size", 100)
+        # 断线时是否把已发出但未收到回应的只读请求重新发送，其余请求立即失败
+        self.resend_idempotent = config.get("resend_idempotent", True)
+        self._outbound_buffer = deque()
         
         # 请求回应映射
         self._echo_callbacks = {}
+        self._echo_requests: Dict[str, Dict[str, Any]] = {}
+        self._echo_started: Dict[str, float] = {}
+        # 已超时或已取消的请求: echo -> (action, 发送时间)
+        self._expired: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        
+        # 发送限速：全局和按群/用户的令牌桶，按优先级排队
+        admin_config = bot.config["bot"].get("admin", {})
+        self.scheduler = SendScheduler(config.get("send_scheduler", {}), admin_config.get("super_users", []))
+        
+        # 只读API(get_stranger_info等)的结果缓存
+        self.cache = ApiCache(config.get("api_cache", {}))
+        
+        # 超长文本回复改为一条合并转发消息，按句子分段
+        forward_config = config.get("forward", {})
+        self.forward_enabled = forward_config.get("enabled", True)
+        self.forward_max_length = int(forward_config.get("max_length", 500))
+        self.forward_max_lines = int(forward_config.get("max_lines", 30))
+        self.forward_chunk_size = max(50, int(forward_config.get("chunk_size", 300)))
+        self.forward_name = forward_config.get("name", "BettQQBot")
+        self.forwarded = 0
+        
+        # 合并窗口：同一群/私聊短时间内的多条回复合并为一条发送（默认关闭）
+        self.coalescer = SendCoalescer(config.get("coalesce", {}))
         
-    async def _create_session(self):
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        # 广播：同时发出的消息数、失败重试次数和重试间隔
+        broadcast_config = config.get("broadcast", {})
+        self.broadcast_window = max(1, int(broadcast_config.get("window", 5)))
+        self.broadcast_retries = int(broadcast_config.get("retries", 2))
+        self.broadcast_retry_delay = float(broadcast_config.get("retry_delay", 2.0))
+        self.broadcast_progress_every = max(1, int(broadcast_config.get("progress_every", 20)))
+        
+        suffix = "" if name == "default" else f"@{name}"
+        bot.register_stats_provider(f"api{suffix}", self.stats)
+        bot.register_stats_provider(f"send{suffix}", self.scheduler.stats)
+        bot.register_stats_provider(f"cache{suffix}", self.cache.stats)
+        
+    def http_session(self):
+        """使用共用的HTTP连接池发送请求，退出时不关闭连接
+        
+        用法: async with self.bot.api.http_session() as session: ...
+        """
+        return self.http.borrow()
         
     async def close(self):
-        if self.session and not self.session.closed:
-            await self.session.close()
-            self.session = None
+        # HTTP连接池由机器人在所有组件关闭后统一关闭
+        await self.coalescer.flush_all()
+        await self.scheduler.stop()
             
     async def initialize(self):
         """初始化API连接"""
-        # 创建会话
-        await self._create_session()
-        
         # 打印连接信息
         logger.info("API 已初始化")
         logger.debug("API 配置已加载")
         
     async def call_api(self, action: str, **params):
-        """通过WebSocket调用API"""
-        # 使用WebSocket连接发送请求
-        if not self.bot.handler.connected or not self.bot.handler.ws:
-            logger.error(f"WebSocket未连接，无法调用API: {action}".replace("free", ""))
-            return None
+        """调用API，返回响应中的data，失败时返回None
+        
+        只读API的结果会被缓存，并发的相同请求只发送一次；
+        传入 no_cache=True 时跳过缓存重新获取。
+        """
+        no_cache = params.pop("no_cache", False)
+        if self.cache.cacheable(action):
+            if not no_cache:
+                return await self.cache.get(action, params, lambda: self._request(action, params))
+            result = await self._request(action, params)
+            self.cache.put(action, params, result)
+            return result
+        return await self._request(action, params)
+        
+    async def _request(self, action: str, params: Dict[str, Any]):
+        """发送请求，返回响应中的data，失败时返回None"""
+        return (await self._perform(action, params))[1]
+        
+    async def _perform(self, action: str, params: Dict[str, Any]) -> Tuple[str, Any]:
+        """发送请求，返回 (结果, data)，结果为 OUTCOMES 之一
+        
+        WebSocket断开时，配置了 http_api_url 的账号改为通过共用的HTTP连接池调用NapCat的HTTP API；
+        否则请求进入有界的出站缓冲区，重连后补发，缓冲区已满时立即返回，不再等满超时时间。
+        """
+        # 发送类请求先经过限速调度，队列已满时放弃发送
+        if not await self.scheduler.acquire(action, params):
+            outcome, data = "rejected", None
+        else:
+            self.inflight[action] += 1
+            try:
+                handler = self.handler
+                if self.http_api_url and not (handler.connected and handler.ws):
+                    outcome, data = await self._call_http(action, params)
+                else:
+                    outcome, data = await self._call_ws(action, params)
+            finally:
+                self.inflight[action] -= 1
+        self.results[action][outcome] += 1
+        return outcome, data
             
+    async def _call_ws(self, action: str, params: Dict[str, Any]) -> Tuple[str, Any]:
+        """通过WebSocket调用API，断开时进入出站缓冲区"""
+        handler = self.handler
         echo = str(uuid.uuid4())
         data = {
             "action": action,
@@ -56,67 +211,461 @@ class API:
         # 创建一个Future来接收响应
         future = asyncio.get_event_loop().create_future()
         self._echo_callbacks[echo] = future
+        self._echo_requests[echo] = data
+        self._echo_started[echo] = time.monotonic()
+        timeout = self.timeout_for(action)
         
         try:
-            # 通过WebSocket发送请求
-            await self.bot.handler.ws.send(json.dumps(data))
+            if handler.connected and handler.ws:
+                try:
+                    # 通过WebSocket发送请求
+                    await handler.ws.send(self.codec.dumps(data))
+                except Exception as e:
+                    logger.warning(f"发送API请求失败，缓冲等待重连: {action}, {e}".replace("free", ""))
+                    if not self._buffer_request(echo):
+                        return "dropped", None
+            elif not self._buffer_request(echo):
+                logger.error(f"WebSocket未连接且出站缓冲已满，无法调用API: {action}".replace("free", ""))
+                return "dropped", None
             
             # 等待响应，超时处理
             try:
-                result = await asyncio.wait_for(future, timeout=self.api_timeout)
-                return result.get("data")
+                result = await asyncio.wait_for(future, timeout=timeout)
+                return "failed" if result.get("status") == "failed" else "ok", result.get("data")
             except asyncio.TimeoutError:
-                logger.error(f"API调用超时: {action}".replace("free", ""))
-                self._echo_callbacks.pop(echo, None)
-                return None
+                self._on_timeout(action, timeout)
+                logger.error(f"API调用超时: {action} ({timeout:.1f}s)".replace("free", ""))
+                return "timeout", None
+            except ConnectionError as e:
+                # 请求已发出，NapCat可能已经执行
+                logger.error(f"API调用因连接断开而失败: {action}, {e}".replace("free", ""))
+                return "disconnected", None
         except Exception as e:
             logger.error(f"API调用异常: {e}".replace("free", ""))
-            self._echo_callbacks.pop(echo, None)
+            return "error", None
+        finally:
+            # 超时、取消或失败时清理回调，并记下请求以便识别之后迟到的响应
+            started = self._echo_started.pop(echo, None)
+            if self._echo_callbacks.pop(echo, None) is not None and started is not None:
+                self._expire(echo, action, started)
+            self._echo_requests.pop(echo, None)
+            
+    async def _call_http(self, action: str, params: Dict[str, Any]) -> Tuple[str, Any]:
+        """通过NapCat的HTTP服务调用API"""
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        timeout = self.timeout_for(action)
+        started = time.monotonic()
+        try:
+            async with self.http.session.post(
+                f"{self.http_api_url}/{action}",
+                data=self.codec.dumps(params),
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as resp:
+                result = self.codec.loads(await resp.read())
+            self._observe(action, time.monotonic() - started)
+        except asyncio.TimeoutError:
+            self._on_timeout(action, timeout)
+            logger.error(f"HTTP API调用超时: {action} ({timeout:.1f}s)")
+            return "timeout", None
+        except aiohttp.ClientConnectorError as e:
+            # 连接未建立，请求没有发出
+            logger.error(f"无法连接NapCat HTTP API: {action}, {e}")
+            return "unreachable", None
+        except Exception as e:
+            logger.error(f"HTTP API调用异常: {action}, {e}")
+            return "error", None
+        if result.get("status") == "failed":
+            logger.error(f"收到错误响应: {result}")
+            return "failed", result.get("data")
+        return "ok", result.get("data")
+        
+    async def probe(self, action: str = "get_status", timeout: float = 10.0) -> Optional[float]:
+        """直接在当前连接上发送一个探测请求，返回往返时间(秒)，超时或无法发送时返回None
+        
+        不经过出站缓冲；收到任何响应（包括失败的响应）都说明链路可用。
+        """
+        handler = self.handler
+        websocket = handler.ws if handler is not None else None
+        if websocket is None:
             return None
+        echo = str(uuid.uuid4())
+        future = asyncio.get_event_loop().create_future()
+        self._echo_callbacks[echo] = future
+        started = time.monotonic()
+        try:
+            await websocket.send(self.codec.dumps({"action": action, "params": {}, "echo": echo}))
+            await asyncio.wait_for(future, timeout=timeout)
+            return time.monotonic() - started
+        except (asyncio.TimeoutError, ConnectionError):
+            return None
+        except Exception as e:
+            logger.debug(f"发送探测请求失败: {e}")
+            return None
+        finally:
+            if self._echo_callbacks.pop(echo, None) is not None:
+                self._expire(echo, action, started)
+        
+    def _buffer_request(self, echo: str) -> bool:
+        """将请求放入出站缓冲区，缓冲区已满时返回False"""
+        if len(self._outbound_buffer) >= self.outbound_buffer_size:
+            return False
+        self._outbound_buffer.append(echo)
+        logger.debug(f"API请求已进入出站缓冲区，当前长度: {len(self._outbound_buffer)}")
+        return True
+        
+    def _is_idempotent(self, action: str) -> bool:
+        """只读请求可以安全地重复发送"""
+        return action.startswith("get_") or action.startswith("can_")
+        
+    def on_disconnect(self):
+        """连接断开时处理已发出但尚未收到回应的请求
+        
+        只读请求在允许时转入出站缓冲区等待补发，其余请求立即失败，
+        避免调用方各自等满超时时间。
+        """
+        buffered = set(self._outbound_buffer)
+        failed = 0
+        requeued = 0
+        for echo, future in list(self._echo_callbacks.items()):
+            if echo in buffered or future.done():
+                continue
+            request = self._echo_requests.get(echo, {})
+            if (self.resend_idempotent and self._is_idempotent(request.get("action", ""))
+                    and self._buffer_request(echo)):
+                requeued += 1
+                continue
+            future.set_exception(ConnectionError("WebSocket连接已断开"))
+            failed += 1
+        if failed or requeued:
+            logger.warning(f"连接断开: {failed} 个进行中的API请求已失败，{requeued} 个已转入缓冲等待重发")
+            
+    async def on_connect(self):
+        """连接建立后按顺序补发出站缓冲区中的请求"""
+        handler = self.handler
+        flushed = 0
+        while self._outbound_buffer and handler.connected and handler.ws:
+            echo = self._outbound_buffer[0]
+            future = self._echo_callbacks.get(echo)
+            if future is None or future.done():
+                # 调用方已超时或已取消
+                self._outbound_buffer.popleft()
+                continue
+            try:
+                await handler.ws.send(self.codec.dumps(self._echo_requests[echo]))
+            except Exception as e:
+                logger.warning(f"补发缓冲的API请求失败，等待下次重连: {e}")
+                return
+            self._outbound_buffer.popleft()
+            flushed += 1
+        if flushed:
+            logger.info(f"已补发 {flushed} 个缓冲的API请求")
         
     def handle_api_response(self, data: Dict[str, Any]):
         """处理API响应"""
         echo = data.get("echo")
-        if not echo or echo not in self._echo_callbacks:
+        if not echo:
             return
-            
-        future = self._echo_callbacks.pop(echo)
+        future = self._echo_callbacks.pop(echo, None)
+        if future is None:
+            self._handle_unmatched_response(echo)
+            return
+        
+        started = self._echo_started.get(echo)
+        request = self._echo_requests.get(echo)
+        if started is not None and request is not None:
+            self._observe(request["action"], time.monotonic() - started)
         if not future.done():
             future.set_result(data)
+            
+    def _handle_unmatched_response(self, echo: str):
+        """统计迟到（请求已超时或取消）和无主（未知echo）的响应"""
+        expired = self._expired.pop(echo, None)
+        if expired is None:
+            self.orphan_responses += 1
+            logger.debug(f"收到未知请求的响应: {echo}")
+            return
+        action, started = expired
+        elapsed = time.monotonic() - started
+        self.late_responses[action] += 1
+        # 迟到的响应也计入延迟统计，避免超时过紧时只观测到快速响应
+        self._observe(action, elapsed)
+        logger.warning(f"API响应迟到: {action}，耗时 {elapsed:.2f}s")
+        
+    def _expire(self, echo: str, action: str, started: float):
+        self._expired[echo] = (action, started)
+        if len(self._expired) > _EXPIRED_ECHO_LIMIT:
+            self._expired.popitem(last=False)
+            
+    def timeout_for(self, action: str) -> float:
+        """当前对该API使用的超时时间"""
+        ceiling = self.action_timeouts.get(action, self.api_timeout)
+        adaptive = self._adaptive_timeout.get(action)
+        return min(ceiling, adaptive) if adaptive else ceiling
+        
+    def _observe(self, action: str, elapsed: float):
+        """记录一次响应耗时，样本足够后按 p99 × multiplier 调整该API的超时（仅限 adaptive_actions）"""
+        histogram = self.action_latency.get(action)
+        if histogram is None:
+            histogram = self.action_latency[action] = RollingHistogram(200)
+        histogram.observe(elapsed)
+        buckets = self.latency_buckets.get(action)
+        if buckets is None:
+            buckets = self.latency_buckets[action] = BucketHistogram()
+        buckets.observe(elapsed)
+        if (self.adaptive_timeouts and action in self.adaptive_actions
+                and histogram.count >= self.adaptive_min_samples and histogram.count % 10 == 0):
+            self._adaptive_timeout[action] = max(
+                self.adaptive_min_timeout, histogram.percentile(99) * self.adaptive_multiplier
+            )
+            
+    def _on_timeout(self, action: str, timeout: float):
+        """超时后放宽该API的自适应超时，防止延迟整体升高时连续失败"""
+        self.timeouts[action] += 1
+        if action in self._adaptive_timeout:
+            self._adaptive_timeout[action] = timeout * 2
+            
+    def stats(self) -> Dict[str, Any]:
+        actions = sorted(set(self.results) | set(self.action_latency))
+        return {
+            "pending": len(self._echo_callbacks),
+            "inflight": sum(self.inflight.values()),
+            "buffered": len(self._outbound_buffer),
+            "timeouts": dict(self.timeouts),
+            "late_responses": dict(self.late_responses),
+            "orphan_responses": self.orphan_responses,
+            "forwarded": self.forwarded,
+            "coalesce": self.coalescer.stats(),
+            "actions": {
+                action: {
+                    "results": dict(self.results.get(action, {})),
+                    "inflight": self.inflight[action],
+                    "timeout_s": round(self.timeout_for(action), 2),
+                    "latency_ms": self.action_latency[action].summary(scale=1000) if action in self.action_latency else {},
+                }
+                for action in actions
+            },
+        }
+        
+    def write_metrics(self, writer: PrometheusWriter):
+        """导出本账号的API指标到 /metrics"""
+        account = self.name
+        for action, results in sorted(self.results.items()):
+            for result, count in sorted(results.items()):
+                writer.sample("api_requests_total", "counter", "API调用次数，按结果分类",
+                              count, {"account": account, "action": action, "result": result})
+        for action, count in sorted(self.inflight.items()):
+            writer.sample("api_inflight", "gauge", "已发出、尚未收到响应的API请求数",
+                          count, {"account": account, "action": action})
+        for action, histogram in sorted(self.latency_buckets.items()):
+            writer.histogram("api_latency_seconds", "NapCat处理API请求的往返延迟（含迟到的响应）",
+                             histogram, {"account": account, "action": action})
+            writer.sample("api_timeout_seconds", "gauge", "当前使用的API超时时间",
+                          self.timeout_for(action), {"account": account, "action": action})
+        for action, count in sorted(self.late_responses.items()):
+            writer.sample("api_late_responses_total", "counter", "超时或取消后才到达的API响应数",
+                          count, {"account": account, "action": action})
+        writer.sample("api_orphan_responses_total", "counter", "无法对应到请求的API响应数",
+                      self.orphan_responses, {"account": account})
+        writer.sample("api_buffered", "gauge", "断线期间出站缓冲中的API请求数",
+                      len(self._outbound_buffer), {"account": account})
+        
+    async def send_private_msg(self, user_id: int, message: Message, coalesce: bool = True) -> Optional[Dict[str, Any]]:
+        """message 可以是CQ码字符串，也可以是消息段数组（见 MessageBuilder）
         
-    async def send_private_msg(self, user_id: int, message: str) -> Dict[str, Any]:
+        开启合并窗口时，对当前会话的回复进入窗口后立即返回None（还没有发出，没有 message_id）；
+        需要 message_id 或确认发送结果（记录、撤回）的调用方应传入 coalesce=False。
+        """
+        if self.forward_enabled and needs_forward(message, self.forward_max_length, self.forward_max_lines):
+            return await self._send_long_msg(message, user_id=user_id)
+        if coalesce and self.coalescer.accepts(("u", user_id)):
+            return self.coalescer.submit(
+                ("u", user_id), to_cq(message),
+                lambda text: self._send_merged(text, user_id=user_id),
+                self.scheduler.resolve_priority(), mention=False,
+            )
         return await self.call_api(
             "send_private_msg",
             user_id=user_id,
             message=message
         )
         
-    async def send_group_msg(self, group_id: int, message: str) -> Dict[str, Any]:
+    async def send_group_msg(self, group_id: int, message: Message, coalesce: bool = True) -> Optional[Dict[str, Any]]:
+        """message 可以是CQ码字符串，也可以是消息段数组（见 MessageBuilder）
+        
+        合并窗口的返回值同 send_private_msg，需要发送结果时传入 coalesce=False。
+        """
+        if self.forward_enabled and needs_forward(message, self.forward_max_length, self.forward_max_lines):
+            return await self._send_long_msg(message, group_id=group_id)
+        if coalesce and self.coalescer.accepts(("g", group_id)):
+            return self.coalescer.submit(
+                ("g", group_id), to_cq(message),
+                lambda text: self._send_merged(text, group_id=group_id),
+                self.scheduler.resolve_priority(),
+            )
         return await self.call_api(
             "send_group_msg",
             group_id=group_id,
             message=message
         )
         
-    async def get_stranger_info(self, user_id: int) -> Dict[str, Any]:
+    async def _send_merged(self, text: str, group_id: Optional[int] = None,
+                           user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """发出合并窗口合并后的消息：加上@前缀后的整条消息同样做超长检查"""
+        if self.forward_enabled and needs_forward(text, self.forward_max_length, self.forward_max_lines):
+            return await self._send_long_msg(text, group_id=group_id, user_id=user_id)
+        if group_id:
+            return await self.call_api("send_group_msg", group_id=group_id, message=text)
+        return await self.call_api("send_private_msg", user_id=user_id, message=text)
+        
+    async def send_group_forward_msg(self, group_id: int, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await self.call_api(
+            "send_group_forward_msg",
+            group_id=group_id,
+            messages=messages
+        )
+        
+    async def send_private_forward_msg(self, user_id: int, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await self.call_api(
+            "send_private_forward_msg",
+            user_id=user_id,
+            messages=messages
+        )
+        
+    async def send_forward(self, texts: List[str], group_id: Optional[int] = None,
+                           user_id: Optional[int] = None) -> Dict[str, Any]:
+        """把多段文本作为一条合并转发消息发送，每段一个节点，只调用一次API"""
+        nodes = build_nodes(texts, self.forward_name, self.handler.self_id if self.handler else None)
+        if group_id:
+            return await self.send_group_forward_msg(group_id=group_id, messages=nodes)
+        return await self.send_private_forward_msg(user_id=user_id, messages=nodes)
+        
+    async def _send_long_msg(self, message: Message, group_id: Optional[int] = None,
+                             user_id: Optional[int] = None) -> Dict[str, Any]:
+        """超长文本按句子分段后以合并转发发出，转发失败时退回逐段发送普通消息"""
+        chunks = split_text(to_cq(message), self.forward_chunk_size)
+        result = await self.send_forward(chunks, group_id=group_id, user_id=user_id)
+        if result is not None:
+            self.forwarded += 1
+            return result
+        logger.warning(f"合并转发发送失败，改为分 {len(chunks)} 段发送")
+        for chunk in chunks:
+            if group_id:
+                result = await self.call_api("send_group_msg", group_id=group_id, message=chunk)
+            else:
+                result = await self.call_api("send_private_msg", user_id=user_id, message=chunk)
+        return result
+        
+    async def get_stranger_info(self, user_id: int, no_cache: bool = False) -> Dict[str, Any]:
         return await self.call_api(
             "get_stranger_info",
-            user_id=user_id
+            user_id=user_id,
+            no_cache=no_cache
         )
         
-    async def get_group_info(self, group_id: int) -> Dict[str, Any]:
+    async def get_group_info(self, group_id: int, no_cache: bool = False) -> Dict[str, Any]:
         return await self.call_api(
             "get_group_info",
-            group_id=group_id
+            group_id=group_id,
+            no_cache=no_cache
         )
         
-    async def get_group_member_info(self, group_id: int, user_id: int) -> Dict[str, Any]:
+    async def get_group_member_info(self, group_id: int, user_id: int, no_cache: bool = False) -> Dict[str, Any]:
         return await self.call_api(
             "get_group_member_info",
             group_id=group_id,
-            user_id=user_id
+            user_id=user_id,
+            no_cache=no_cache
         )
         
+    async def get_group_member_list(self, group_id: int) -> List[Dict[str, Any]]:
+        return await self.call_api(
+            "get_group_member_list",
+            group_id=group_id
+        )
+        
+    async def get_group_list(self) -> List[Dict[str, Any]]:
+        return await self.call_api("get_group_list")
+        
+    async def get_friend_list(self) -> List[Dict[str, Any]]:
+        return await self.call_api("get_friend_list")
+        
+    async def broadcast(self, message: Message, group_ids: Iterable[int] = (), user_ids: Iterable[int] = (),
+                        progress: Optional[Callable[[int, int], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """向多个群和好友发送同一条消息
+        
+        最多同时有 window 条消息在发送中，所有消息以低优先级经过发送限速，
+        不挤占正常的回复。只有确定没有送达的目标（NapCat返回失败、限速队列或
+        出站缓冲已满、无法连接）才会在等待 retry_delay × 第几次重试 秒后重试，
+        最多重试 retries 次；超时或等待响应时断线的目标可能已经收到，不重试，
+        直接计为失败，避免重复发送。只有拿到 message_id 才算成功。
+        广播不经过回复合并窗口；超长消息以合并转发发送，转发失败时不再拆分重发。
+        
+        Args:
+            message: 消息内容
+            group_ids: 目标群号
+            user_ids: 目标好友QQ号
+            progress: 可选的异步回调 progress(已完成数, 总数)，每完成 progress_every 个目标及全部完成时调用
+            
+        Returns:
+            Dict[str, Any]: {"total": 目标数, "succeeded": 成功数, "failed": [("group"/"private", ID), ...], "seconds": 耗时}
+        """
+        targets = [("group", group_id) for group_id in dict.fromkeys(group_ids)]
+        targets += [("private", user_id) for user_id in dict.fromkeys(user_ids)]
+        window = asyncio.Semaphore(self.broadcast_window)
+        failed: List[Tuple[str, int]] = []
+        done = 0
+        started = time.monotonic()
+        
+        async def send(kind: str, target_id: int):
+            nonlocal done
+            for attempt in range(self.broadcast_retries + 1):
+                if attempt:
+                    # 等待重试时不占用发送窗口
+                    await asyncio.sleep(self.broadcast_retry_delay * attempt)
+                async with window:
+                    outcome, data = await self._broadcast_one(kind, target_id, message)
+                if outcome == "ok" and isinstance(data, dict) and data.get("message_id"):
+                    break
+                if outcome not in UNDELIVERED:
+                    # 可能已经送达，重试会重复发送
+                    failed.append((kind, target_id))
+                    logger.warning(f"广播发送结果不确定，不再重试: {kind} {target_id} ({outcome})")
+                    break
+            else:
+                failed.append((kind, target_id))
+                logger.warning(f"广播发送失败: {kind} {target_id}")
+            done += 1
+            if progress is not None and (done % self.broadcast_progress_every == 0 or done == len(targets)):
+                try:
+                    await progress(done, len(targets))
+                except Exception as e:
+                    logger.error(f"广播进度回调出错: {e}")
+        
+        logger.info(f"开始广播，共 {len(targets)} 个目标")
+        with with_priority(PRIORITY_LOW):
+            await asyncio.gather(*(send(kind, target_id) for kind, target_id in targets))
+        seconds = round(time.monotonic() - started, 1)
+        logger.info(f"广播完成: 成功 {len(targets) - len(failed)}/{len(targets)}，耗时 {seconds} 秒")
+        return {
+            "total": len(targets),
+            "succeeded": len(targets) - len(failed),
+            "failed": failed,
+            "seconds": seconds,
+        }
+        
+    async def _broadcast_one(self, kind: str, target_id: int, message: Message) -> Tuple[str, Any]:
+        """向一个目标发送广播消息，返回 (结果, data)"""
+        params: Dict[str, Any] = {"group_id": target_id} if kind == "group" else {"user_id": target_id}
+        if self.forward_enabled and needs_forward(message, self.forward_max_length, self.forward_max_lines):
+            chunks = split_text(to_cq(message), self.forward_chunk_size)
+            params["messages"] = build_nodes(chunks, self.forward_name, self.handler.self_id if self.handler else None)
+            return await self._perform(f"send_{kind}_forward_msg", params)
+        params["message"] = message
+        return await self._perform(f"send_{kind}_msg", params)
+        
     async def set_group_add_request(self, flag: str, sub_type: str, approve: bool, reason: str = "") -> Dict[str, Any]:
         return await self.call_api(
             "set_group_add_request",
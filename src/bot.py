@@ -6,21 +6,156 @@ from .utils.config import load_config
 from .plugins import PluginManager
 from .utils.user_manager import UserManager
 from .utils.message_manager import MessageManager
+from .utils.context import current_connection
+from .utils.loop_monitor import LoopMonitor
+from .utils.recorder import FrameRecorder
+from .utils.roster import GroupRoster
+from .utils.http_client import HttpClient
+from .utils.metrics import PrometheusWriter
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 class BettQQBot:
     def __init__(self, config_path: str):
         self.config = load_config(config_path)
+        # 各模块注册的运行统计，供 /debug stats 查看
+        self.stats_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
         self.message_manager = MessageManager()
-        self.api = API(self)
         self.plugin_manager = PluginManager(self)
-        self.handler = MessageHandler(self)
+        # 事件流录制，未开启时为None
+        recorder_config = self.config["bot"].get("recorder", {})
+        self.recorder: Optional[FrameRecorder] = (
+            FrameRecorder(recorder_config) if recorder_config.get("enabled", False) else None
+        )
+        # 共用的HTTP连接池（长连接、DNS缓存、按主机限制连接数）
+        self.http = HttpClient(self.config["bot"].get("http", {}))
+        self.register_stats_provider("http", self.http.stats)
+        # 群成员名单缓存，由各连接收到的事件增量更新
+        self.roster = GroupRoster(self, self.config["bot"].get("roster", {}))
+        self.register_stats_provider("roster", self.roster.stats)
+        # 每个NapCat连接（账号）一个消息处理器和API，共享插件与数据
+        self.connections: List[MessageHandler] = [
+            MessageHandler(self, API(self, config, name), config, name)
+            for name, config in self._connection_configs()
+        ]
         self.user_manager = UserManager(Path("data/users.json"))
         self.task = None
+        # 服务端模式（反向WebSocket / HTTP POST），在 start() 中启动
+        self.server = None
+        # Prometheus 指标端点，在 start() 中启动
+        self.metrics_server = None
+        self.register_stats_provider("connections", self._connection_stats)
+        # 事件循环延迟监控，发现阻塞时记录阻塞的插件和函数
+        self.loop_monitor = LoopMonitor(self.config["bot"].get("loop_monitor", {}))
+        self.register_stats_provider("loop", self.loop_monitor.stats)
+        if self.recorder is not None:
+            self.register_stats_provider("recorder", self.recorder.stats)
+        
+    def _connection_configs(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """读取连接配置
+        
+        bot.connections 中的每一项覆盖 bot.napcat 中的同名配置；
+        未配置 connections 时只使用 bot.napcat 一个连接；
+        enabled 为 false 的连接不会创建（例如只使用服务端模式时）。
+        """
+        napcat = self.config["bot"]["napcat"]
+        entries = self.config["bot"].get("connections") or []
+        if not entries:
+            return [("default", napcat)] if napcat.get("enabled", True) else []
+        configs = []
+        for index, entry in enumerate(entries):
+            name = str(entry.get("name") or f"account{index + 1}")
+            config = {**napcat, **entry}
+            if config.get("enabled", True):
+                configs.append((name, config))
+        return configs
+        
+    async def add_connection(self, name: str, config: Dict[str, Any]) -> MessageHandler:
+        """运行时添加一个连接（服务端模式下新账号首次连接时调用）"""
+        connection = self.get_connection(name)
+        if connection is None:
+            connection = MessageHandler(self, API(self, config, name), config, name)
+            self.connections.append(connection)
+            await connection.api.initialize()
+        return connection
+        
+    @property
+    def handler(self) -> MessageHandler:
+        """当前事件所属连接的消息处理器，不在事件处理中时为第一个连接"""
+        connection = current_connection.get()
+        if connection is None:
+            if not self.connections:
+                raise RuntimeError("没有可用的连接")
+            connection = self.connections[0]
+        return connection
+        
+    @property
+    def api(self) -> API:
+        """当前事件所属账号的API"""
+        return self.handler.api
+        
+    @property
+    def self_id(self) -> Optional[int]:
+        """当前事件所属账号的QQ号"""
+        return self.handler.self_id
+        
+    def get_connection(self, name: str) -> Optional[MessageHandler]:
+        """按名称获取连接"""
+        for connection in self.connections:
+            if connection.name == name:
+                return connection
+        return None
+        
+    def _connection_stats(self) -> Dict[str, Any]:
+        return {
+            connection.name: {
+                "self_id": connection.self_id,
+                "connected": connection.connected,
+                "reconnects": connection.total_reconnects,
+            }
+            for connection in self.connections
+        }
+        
+    def register_stats_provider(self, name: str, provider: Callable[[], Dict[str, Any]]):
+        """注册运行统计来源，provider 返回可格式化的字典"""
+        self.stats_providers[name] = provider
+        
+    def collect_stats(self, name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """收集运行统计，指定name时只返回该项"""
+        names = [name] if name else list(self.stats_providers)
+        stats = {}
+        for key in names:
+            provider = self.stats_providers.get(key)
+            if provider is None:
+                continue
+            try:
+                stats[key] = provider()
+            except Exception as e:
+                logger.error(f"获取统计 {key} 时出错: {e}")
+        return stats
+        
+    def render_metrics(self) -> str:
+        """Prometheus 文本格式的指标
+        
+        包括各账号的API调用结果、进行中请求数和延迟分布，事件处理耗时分布，
+        以及所有运行统计（/debug stats）中的数值。对比API延迟和事件处理耗时，
+        可以区分是NapCat响应慢还是插件处理慢。
+        """
+        writer = PrometheusWriter()
+        for connection in self.connections:
+            connection.api.write_metrics(writer)
+            writer.histogram("event_handle_seconds", "单个事件的处理耗时（插件处理及其等待的API调用）",
+                             connection.workers.handle_time, {"account": connection.name})
+        for name, data in self.collect_stats().items():
+            writer.stats(name, data)
+        return writer.render()
         
     async def start(self):
         """启动机器人"""
         logger.info("正在启动机器人...")
+        self.loop_monitor.start()
+        if self.recorder is not None:
+            self.recorder.start()
         
         # 确保端口设置正确
         if "napcat" in self.config["bot"] and "port" not in self.config["bot"]["napcat"]:
@@ -30,23 +165,45 @@ class BettQQBot:
         await self.plugin_manager.load_plugins()
         logger.success("机器人已启动")
         
-        # 启动消息处理器
-        await self.handler.start()
+        # 服务端模式：等待NapCat反向连接或POST上报
+        server_config = self.config["bot"].get("server", {})
+        if server_config.get("enabled", False):
+            from .server import OneBotServer
+            self.server = OneBotServer(self, server_config)
+            await self.server.start()
+        
+        metrics_config = self.config["bot"].get("metrics", {})
+        if metrics_config.get("enabled", False):
+            from .server import MetricsServer
+            self.metrics_server = MetricsServer(self, metrics_config)
+            await self.metrics_server.start()
+        
+        # 启动所有主动连接的消息处理器
+        await asyncio.gather(*(connection.start() for connection in list(self.connections)))
         
     async def shutdown(self):
         logger.info("正在关闭机器人...")
         
-        # 关闭消息处理器
-        if hasattr(self, 'handler') and self.handler:
-            await self.handler.stop()
-            
-        # 关闭API连接
-        if hasattr(self, 'api') and self.api:
-            await self.api.close()
+        # 关闭消息处理器和API连接（先关闭连接，服务端模式的反向WebSocket会话随之结束）
+        for connection in getattr(self, 'connections', []):
+            await connection.stop()
+            await connection.api.close()
+        
+        if self.server is not None:
+            await self.server.stop()
+        if getattr(self, 'metrics_server', None) is not None:
+            await self.metrics_server.stop()
         
         # 卸载插件
         if hasattr(self, 'plugin_manager') and self.plugin_manager:
             await self.plugin_manager.unload_plugins()
+        
+        if hasattr(self, 'loop_monitor'):
+            await self.loop_monitor.stop()
+        if getattr(self, 'recorder', None) is not None:
+            self.recorder.close()
+        if hasattr(self, 'http'):
+            await self.http.close()
             
         logger.success("机器人已关闭")
 
@@ -55,7 +212,8 @@ class BettQQBot:
         logger.info("正在初始化机器人组件...")
         
         # 初始化API连接
-        await self.api.initialize()
+        for connection in self.connections:
+            await connection.api.initialize()
         
         # 初始化用户管理器
         await self.user_manager.load()
@@ -0,0 +1,152 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from .utils.message_builder import parse_cq
+
+
+def extract_plain_text(message: List[Dict[str, Any]]) -> str:
+    """从消息段列表中提取文本
+
+    Args:
+        message: 消息段列表
+
+    Returns:
+        拼接并去除首尾空白后的文本
+    """
+    return "".join(
+        seg["data"].get("text", "") for seg in message if seg.get("type") == "text"
+    ).strip()
+
+
+class Event:
+    """OneBot 事件基类
+
+    原始字典保存在 raw 中，常用字段在构造时解析一次，之后只读访问。
+    account 为接收该事件的连接名称，多账号时用于区分来源。
+    """
+    __slots__ = ("raw", "post_type", "time", "self_id", "account")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.raw = data
+        self.post_type: str = data.get("post_type", "")
+        self.time: int = data.get("time", 0)
+        self.self_id: Optional[int] = data.get("self_id")
+        self.account: Optional[str] = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """按原始字段名读取，兼容按字典访问的旧代码"""
+        return self.raw.get(key, default)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.raw})"
+
+
+class MessageEvent(Event):
+    """消息事件（群聊/私聊）
+
+    plain_text、at_targets、is_at_self、image_urls 在构造时通过一次遍历
+    消息段得到，插件直接读取即可，无需再各自拼接文本。
+    """
+    __slots__ = (
+        "message_type", "sub_type", "message_id", "user_id", "group_id",
+        "message", "raw_message", "sender",
+        "plain_text", "at_targets", "is_at_self", "image_urls",
+    )
+
+    def __init__(self, data: Dict[str, Any]):
+        super().__init__(data)
+        self.message_type: str = data.get("message_type", "")
+        self.sub_type: str = data.get("sub_type", "")
+        self.message_id: Optional[int] = data.get("message_id")
+        self.user_id: Optional[int] = data.get("user_id")
+        self.group_id: Optional[int] = data.get("group_id")
+        self.raw_message: str = data.get("raw_message", "")
+        self.sender: Dict[str, Any] = data.get("sender") or {}
+
+        message = data.get("message", [])
+        if isinstance(message, str):
+            # 字符串格式（CQ码）的上报，解析为消息段数组
+            message = parse_cq(message)
+        self.message: List[Dict[str, Any]] = message
+
+        texts = []
+        at_targets = []
+        image_urls = []
+        for seg in message:
+            seg_type = seg.get("type")
+            seg_data = seg.get("data") or {}
+            if seg_type == "text":
+                texts.append(seg_data.get("text", ""))
+            elif seg_type == "at":
+                at_targets.append(str(seg_data.get("qq", "")))
+            elif seg_type == "image":
+                url = seg_data.get("url") or seg_data.get("file")
+                if url:
+                    image_urls.append(url)
+
+        self.plain_text: str = "".join(texts).strip()
+        self.at_targets: Tuple[str, ...] = tuple(at_targets)
+        self.is_at_self: bool = self.self_id is not None and str(self.self_id) in self.at_targets
+        self.image_urls: Tuple[str, ...] = tuple(image_urls)
+
+    @property
+    def is_group(self) -> bool:
+        return self.message_type == "group"
+
+    @property
+    def is_private(self) -> bool:
+        return self.message_type == "private"
+
+
+class NoticeEvent(Event):
+    """通知事件（戳一戳、群成员变动、群名片变更等）"""
+    __slots__ = ("notice_type", "sub_type", "user_id", "group_id", "target_id", "operator_id")
+
+    def __init__(self, data: Dict[str, Any]):
+        super().__init__(data)
+        self.notice_type: str = data.get("notice_type", "")
+        self.sub_type: str = data.get("sub_type", "")
+        self.user_id: Optional[int] = data.get("user_id")
+        self.group_id: Optional[int] = data.get("group_id")
+        self.target_id: Optional[int] = data.get("target_id")
+        self.operator_id: Optional[int] = data.get("operator_id")
+
+
+class RequestEvent(Event):
+    """请求事件（加好友、加群）"""
+    __slots__ = ("request_type", "sub_type", "user_id", "group_id", "flag", "comment")
+
+    def __init__(self, data: Dict[str, Any]):
+        super().__init__(data)
+        self.request_type: str = data.get("request_type", "")
+        self.sub_type: str = data.get("sub_type", "")
+        self.user_id: Optional[int] = data.get("user_id")
+        self.group_id: Optional[int] = data.get("group_id")
+        self.flag: str = data.get("flag", "")
+        self.comment: str = data.get("comment", "")
+
+
+class MetaEvent(Event):
+    """元事件（心跳、生命周期）"""
+    __slots__ = ("meta_event_type", "sub_type")
+
+    def __init__(self, data: Dict[str, Any]):
+        super().__init__(data)
+        self.meta_event_type: str = data.get("meta_event_type", "")
+        self.sub_type: str = data.get("sub_type", "")
+
+
+_EVENT_TYPES = {
+    "message": MessageEvent,
+    "message_sent": MessageEvent,
+    "notice": NoticeEvent,
+    "request": RequestEvent,
+    "meta_event": MetaEvent,
+}
+
+
+def parse_event(data: Dict[str, Any]) -> Optional[Event]:
+    """将上报的原始字典解析为事件对象，未知类型返回None"""
+    event_class = _EVENT_TYPES.get(data.get("post_type"))
+    if event_class is None:
+        return None
+    return event_class(data)
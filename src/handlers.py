@@ -2,95 +2,312 @@ from typing import TYPE_CHECKING, Dict, Any, Optional, List, Set
 from loguru import logger
 import json
 import asyncio
+import random
+import time
 import aiohttp
 from urllib.parse import urlencode
 import websockets
+from .utils.json_codec import get_codec
+from .events import parse_event, MessageEvent, NoticeEvent
+from .utils.context import current_connection, current_event
+from .utils.ingress import IngressScheduler
+from .utils.worker_pool import ConversationWorkerPool
+from .utils.frames import classify_frame, FRAME_HEARTBEAT, FRAME_LIFECYCLE, FRAME_ECHO
+from .utils.metrics import RollingHistogram
+from collections import Counter
 
 if TYPE_CHECKING:
     from .bot import BettQQBot
+    from .api import API
+
+def _frame_to_text(frame) -> str:
+    """将原始帧转换为用于日志的文本"""
+    if isinstance(frame, (bytes, bytearray, memoryview)):
+        return bytes(frame).decode("utf-8", errors="replace")
+    return frame
+
+def _format_stats(name: str, data: Any, indent: int = 0) -> str:
+    """将统计数据格式化为缩进文本"""
+    prefix = "  " * indent
+    if not isinstance(data, dict):
+        return f"{prefix}{name}: {data}"
+    lines = [f"{prefix}{name}:"]
+    for key, value in data.items():
+        lines.append(_format_stats(str(key), value, indent + 1))
+    return "\n".join(lines)
+
+def build_ws_target(config: Dict[str, Any]):
+    """根据NapCat连接配置生成WebSocket地址、HTTP头和用于日志的脱敏地址"""
+    host = config.get("host", "127.0.0.1")
+    port = config.get("port", 5700)
+    token = config.get("access_token", "")
+    path = config.get("path", "/bot")
+    
+    # websockets 10.4版本的连接方式
+    ws_url = f"ws://{host}:{port}{path}"
+    
+    # 如果有token，将其添加为查询参数
+    if token:
+        ws_url = f"{ws_url}?access_token={token}"
+    
+    # 准备额外的HTTP头
+    extra_headers = {}
+    if token:
+        # 尝试多种可能的token格式
+        extra_headers["Authorization"] = f"{token}"
+        extra_headers["access_token"] = token
+        logger.info(f"正在使用token: {'*' * (len(token) // 3)}***")  # 隐藏真实token
+    
+    # 隐藏token的WebSocket URL
+    masked_ws_url = ws_url
+    if token:
+        masked_ws_url = masked_ws_url.replace(token, '***********')
+    return ws_url, extra_headers, masked_ws_url
+
+async def open_websocket(ws_url: str, extra_headers: Dict[str, str]):
+    """建立WebSocket连接"""
+    return await websockets.connect(ws_url, additional_headers=extra_headers)
 
 class MessageHandler:
-    def __init__(self, bot: 'BettQQBot'):
+    """一个NapCat连接的消息处理器
+    
+    多账号时每个账号各有一个处理器和API，共享同一组插件。
+    """
+    def __init__(self, bot: 'BettQQBot', api: 'API', config: Optional[Dict[str, Any]] = None, name: str = "default"):
         self.bot = bot
+        self.api = api
+        api.handler = self
+        self.name = name
+        self.napcat_config = config if config is not None else bot.config["bot"]["napcat"]
+        # 账号QQ号，可在配置中指定，否则从收到的事件中获取
+        self.self_id: Optional[int] = self.napcat_config.get("self_id")
         self.plugins = bot.plugin_manager.plugins
         self.ws = None
         self.connected = False
         self.tasks: Set[asyncio.Task] = set()
-        self.message_queue = asyncio.Queue()
+        self._processor: Optional[asyncio.Task] = None
         self._stop_event = asyncio.Event()
         
-    async def start(self):
-        logger.info("消息处理器已启动")
-        
-        config = self.bot.config["bot"]["napcat"]
-        host = config.get("host", "127.0.0.1")
-        port = config.get("port", 5700)
-        token = config.get("access_token", "")
-        
-        # websockets 10.4版本的连接方式
-        ws_url = f"ws://{host}:{port}/bot"
-        
-        # 如果有token，将其添加为查询参数
-        if token:
-            ws_url = f"{ws_url}?access_token={token}"
-        
-        # 准备额外的HTTP头
-        extra_headers = {}
-        if token:
-            # 尝试多种可能的token格式
-            extra_headers["Authorization"] = f"{token}"
-            extra_headers["access_token"] = token
-            logger.info(f"正在使用token: {'*' * (len(token) // 3)}***")  # 隐藏真实token
-        
-        # 隐藏token的WebSocket URL
-        masked_ws_url = ws_url
-        if token:
-            masked_ws_url = masked_ws_url.replace(token, '***********')
-        logger.info(f"正在连接到 WebSocket: {masked_ws_url}")
+        # 入站事件按 管理员 > 私聊 > 群聊 分通道排队，超出容量时按策略丢弃
+        ingress_config = bot.config["bot"].get("ingress", {})
+        admin_config = bot.config["bot"].get("admin", {})
+        admin_ids = list(admin_config.get("super_users", [])) + list(admin_config.get("group_admins", []))
+        self.ingress = IngressScheduler(ingress_config, admin_ids)
+        bot.register_stats_provider(self._stats_name("ingress"), self.ingress.stats)
         
-        try:
-            # 使用websockets 11.0+的连接方式并传递HTTP头
-            websocket = await websockets.connect(ws_url, headers=extra_headers)
-            self.ws = websocket
-            self.connected = True
-            logger.success(f"WebSocket 连接成功！")
+        # 按会话分片的工作池：同一群/私聊内按顺序处理，不同会话并行
+        worker_config = bot.config["bot"].get("workers", {})
+        self.workers = ConversationWorkerPool(
+            self._dispatch_event,
+            workers=worker_config.get("count", 32),
+            max_pending=worker_config.get("max_pending", 256),
+            max_pending_per_key=worker_config.get("max_pending_per_conversation", 8),
+            on_key_available=self.ingress.wake,
+        )
+        bot.register_stats_provider(self._stats_name("workers"), self.workers.stats)
+        
+        # 断线重连配置（指数退避 + 随机抖动）
+        reconnect_config = self.napcat_config.get("reconnect", {})
+        self.reconnect_enabled = reconnect_config.get("enabled", True)
+        self.reconnect_initial_delay = float(reconnect_config.get("initial_delay", 1.0))
+        self.reconnect_max_delay = float(reconnect_config.get("max_delay", 60.0))
+        self.reconnect_multiplier = float(reconnect_config.get("multiplier", 2.0))
+        self.reconnect_jitter = float(reconnect_config.get("jitter", 0.5))
+        self.reconnect_max_retries = int(reconnect_config.get("max_retries", 0))  # 0 表示不限次数
+        # 连接保持超过该时长后才重置退避计数，避免连上即断时频繁重连
+        self.reconnect_stable_after = float(reconnect_config.get("stable_after", 30.0))
+        self.reconnect_attempts = 0
+        self.total_reconnects = 0
+        
+        # JSON编解码器，优先使用orjson/msgspec
+        self.codec = get_codec(bot.config["bot"].get("json_codec", "auto"))
+        
+        # 按帧类型统计，心跳/生命周期/API响应帧走快速路径，不进入事件解析
+        self.frame_stats = Counter()
+        # 最近一次收到心跳的时间(time.monotonic)，用于判断连接是否存活
+        self.last_heartbeat_at: Optional[float] = None
+        # 事件流录制器（由bot统一创建，未开启时为None）
+        self.recorder = bot.recorder
+        self.roster = bot.roster
+        bot.register_stats_provider(self._stats_name("frames"), self._frame_stats)
+        
+        # 主动心跳：定期发送轻量请求测量往返延迟，连续多次超时或过慢时主动断开重连
+        heartbeat_config = self.napcat_config.get("heartbeat", {})
+        self.heartbeat_enabled = heartbeat_config.get("enabled", True)
+        self.heartbeat_interval = float(heartbeat_config.get("interval", 30.0))
+        self.heartbeat_timeout = float(heartbeat_config.get("timeout", 10.0))
+        self.heartbeat_action = heartbeat_config.get("action", "get_status")
+        # 往返时间超过该秒数也视为一次未响应，0 表示不限制
+        self.heartbeat_max_rtt = float(heartbeat_config.get("max_rtt", 0))
+        self.heartbeat_max_missed = max(1, int(heartbeat_config.get("max_missed", 3)))
+        self.heartbeat_rtt = RollingHistogram(heartbeat_config.get("window", 100))
+        self.heartbeat_missed = 0
+        self.heartbeat_missed_total = 0
+        self.heartbeat_forced_reconnects = 0
+        bot.register_stats_provider(self._stats_name("heartbeat"), self._heartbeat_stats)
+        
+    def _stats_name(self, name: str) -> str:
+        """统计项名称，非默认连接带上账号名"""
+        return name if self.name == "default" else f"{name}@{self.name}"
+        
+    def _frame_stats(self) -> Dict[str, Any]:
+        stats = dict(self.frame_stats)
+        if self.last_heartbeat_at is not None:
+            stats["last_heartbeat_age"] = round(time.monotonic() - self.last_heartbeat_at, 1)
+        return stats
+        
+    def _heartbeat_stats(self) -> Dict[str, Any]:
+        return {
+            "rtt_ms": self.heartbeat_rtt.summary(scale=1000),
+            "missed": self.heartbeat_missed,
+            "missed_total": self.heartbeat_missed_total,
+            "forced_reconnects": self.heartbeat_forced_reconnects,
+        }
+        
+    def _build_ws_target(self):
+        """根据配置生成WebSocket地址、HTTP头和用于日志的脱敏地址"""
+        return build_ws_target(self.napcat_config)
+        
+    async def _open_websocket(self, ws_url: str, extra_headers: Dict[str, str]):
+        return await open_websocket(ws_url, extra_headers)
             
+    def _next_reconnect_delay(self) -> float:
+        """计算下一次重连等待时间（带抖动的指数退避）"""
+        delay = min(
+            self.reconnect_max_delay,
+            self.reconnect_initial_delay * (self.reconnect_multiplier ** self.reconnect_attempts)
+        )
+        return delay * (1 - self.reconnect_jitter * random.random())
+        
+    async def start(self):
+        logger.info(f"消息处理器已启动: {self.name}")
+        
+        ws_url, extra_headers, masked_ws_url = self._build_ws_target()
+        
+        self._ensure_processing()
+        
+        while not self._stop_event.is_set():
+            logger.info(f"正在连接到 WebSocket: {masked_ws_url}")
+            connected_at = None
             try:
-                # 启动消息处理任务
-                await asyncio.gather(
-                    self._heartbeat(websocket),
-                    self._receive_messages(websocket),
-                    self._process_messages()
-                )
+                websocket = await self._open_websocket(ws_url, extra_headers)
+                connected_at = time.monotonic()
+                await self._run_session(websocket)
+                # 如果执行到这里，说明连接已经断开
+                logger.warning("WebSocket 连接已断开")
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"WebSocket 任务执行错误: {e}")
-            finally:
-                # 关闭连接
-                if not websocket.closed:
-                    await websocket.close()
-                
-            # 如果执行到这里，说明连接已经断开
-            logger.warning("WebSocket 连接已断开")
-        except Exception as e:
-            logger.error(f"WebSocket 连接失败: {e}")
-            self.connected = False
-            self.ws = None
+                logger.error(f"WebSocket 连接失败: {e}")
+            
+            if self._stop_event.is_set():
+                break
+            if not self.reconnect_enabled:
+                logger.warning("自动重连已禁用，消息处理器退出")
+                break
+                
+            if connected_at is not None and time.monotonic() - connected_at >= self.reconnect_stable_after:
+                self.reconnect_attempts = 0
+            if self.reconnect_max_retries and self.reconnect_attempts >= self.reconnect_max_retries:
+                logger.error(f"已连续重连 {self.reconnect_attempts} 次仍失败，放弃重连")
+                break
+                
+            delay = self._next_reconnect_delay()
+            self.reconnect_attempts += 1
+            logger.info(f"{delay:.1f} 秒后进行第 {self.reconnect_attempts} 次重连...")
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
         
-        self.connected = False
-        self.ws = None
         logger.warning("WebSocket 连接已关闭")
         
+    def _ensure_processing(self):
+        """启动消息处理任务（只启动一次）
+        
+        消息处理任务在整个生命周期内运行，重连期间队列中的消息继续处理。
+        """
+        if self._processor is not None:
+            return
+        self.workers.start()
+        self._processor = asyncio.create_task(self._process_messages())
+        self.tasks.add(self._processor)
+        self._processor.add_done_callback(self.tasks.discard)
+        
+    async def serve(self, websocket):
+        """在服务端模式接受的反向WebSocket连接上运行会话，直到连接断开
+        
+        同一账号的新连接会替换旧连接，之后的API请求从新连接发出。
+        """
+        self._ensure_processing()
+        await self._run_session(websocket)
+        
+    def ingest(self, frame) -> bool:
+        """处理一帧由HTTP POST上报的事件，帧无法解析时返回False"""
+        self._ensure_processing()
+        try:
+            self._handle_frame(frame)
+        except ValueError:
+            self.frame_stats["invalid"] += 1
+            logger.error(f"JSON解析失败: {_frame_to_text(frame)}")
+            return False
+        return True
+        
+    async def _run_session(self, websocket):
+        """在一条已建立的连接上运行心跳和接收任务，直到连接断开"""
+        self.ws = websocket
+        self.connected = True
+        if self.reconnect_attempts:
+            self.total_reconnects += 1
+        logger.success(f"WebSocket 连接成功！")
+        
+        # 补发断线期间缓冲的API请求
+        flush_task = asyncio.create_task(self.api.on_connect())
+        session_tasks = [
+            asyncio.create_task(self._heartbeat(websocket)),
+            asyncio.create_task(self._receive_messages(websocket)),
+        ]
+        try:
+            # 任一任务结束（通常是接收循环因断线退出）即视为会话结束
+            await asyncio.wait(session_tasks, return_when=asyncio.FIRST_COMPLETED)
+        except Exception as e:
+            logger.error(f"WebSocket 任务执行错误: {e}")
+        finally:
+            # 连接已被同账号的新连接替换时，不影响新连接的状态
+            replaced = self.ws is not websocket
+            if not replaced:
+                self.connected = False
+                self.ws = None
+            for task in session_tasks + [flush_task]:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*session_tasks, flush_task, return_exceptions=True)
+            if not replaced:
+                # 让进行中的API请求尽快失败或转入重发缓冲
+                self.api.on_disconnect()
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+        
     async def stop(self):
         logger.info("停止消息处理器...")
         self._stop_event.set()
         
+        if self.ws is not None:
+            try:
+                await self.ws.close()
+            except Exception:
+                pass
+        
         for task in self.tasks:
             if not task.done():
                 task.cancel()
+        await self.workers.stop()
                 
         await asyncio.sleep(0.5)
         
-        for task in self.tasks:
+        for task in list(self.tasks):
             try:
                 await task
             except asyncio.CancelledError:
@@ -99,42 +316,107 @@ class MessageHandler:
         logger.info("消息处理器已停止")
         
     async def _heartbeat(self, websocket):
-        # 由于NapCat不支持标准心跳包，我们只是简单的保持任务活动但不实际发送心跳
+        """定期发送探测请求并记录往返延迟
+        
+        连续 max_missed 次超时（或超过 max_rtt）时返回，会话随之结束并触发重连，
+        避免半开连接直到API调用超时才被发现。
+        """
         try:
+            if not self.heartbeat_enabled:
+                await self._stop_event.wait()
+                return
+            self.heartbeat_missed = 0
             while not self._stop_event.is_set():
-                await asyncio.sleep(30)
-                logger.debug("心跳检查 - 连接正常")
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=self.heartbeat_interval)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+                if self.ws is not websocket:
+                    # 已被同账号的新连接替换
+                    return
+                
+                rtt = await self.api.probe(self.heartbeat_action, self.heartbeat_timeout)
+                if rtt is not None:
+                    self.heartbeat_rtt.observe(rtt)
+                if rtt is None or (self.heartbeat_max_rtt and rtt > self.heartbeat_max_rtt):
+                    self.heartbeat_missed += 1
+                    self.heartbeat_missed_total += 1
+                    reason = "超时" if rtt is None else f"延迟过高 ({rtt * 1000:.0f}ms)"
+                    logger.warning(f"心跳{reason}，连续 {self.heartbeat_missed}/{self.heartbeat_max_missed} 次")
+                    if self.heartbeat_missed >= self.heartbeat_max_missed:
+                        self.heartbeat_forced_reconnects += 1
+                        logger.error("心跳连续未响应，判定连接已失效，主动断开重连")
+                        return
+                else:
+                    self.heartbeat_missed = 0
+                    logger.debug(f"心跳正常 - 往返 {rtt * 1000:.1f}ms")
         except asyncio.CancelledError:
             logger.debug("心跳任务已取消")
         except Exception as e:
             logger.error(f"心跳出错: {e}")
             
+    async def _recv_frame(self, websocket):
+        """接收一帧原始数据，以bytes形式返回，省去一次UTF-8解码（需要 websockets 14 及以上）"""
+        return await websocket.recv(decode=False)
+        
+    def _handle_frame(self, message):
+        """处理收到的一帧数据，JSON无法解析时抛出ValueError"""
+        kind = classify_frame(message)
+        if self.recorder is not None and (kind != FRAME_ECHO or self.recorder.include_responses):
+            self.recorder.record(self.name, message)
+        
+        if kind == FRAME_HEARTBEAT:
+            # 心跳只更新存活时间，不做JSON解析
+            self.frame_stats["heartbeat"] += 1
+            self.last_heartbeat_at = time.monotonic()
+            return
+        
+        data = self.codec.loads(message)
+        
+        if kind == FRAME_ECHO and "echo" in data:
+            # API响应直接交给调用方（失败的响应也要交给调用方，避免其等满超时）
+            self.frame_stats["echo"] += 1
+            if data.get("status") == "failed":
+                logger.error(f"收到错误响应: {data}")
+            self.api.handle_api_response(data)
+            return
+        
+        if kind == FRAME_LIFECYCLE:
+            self.frame_stats["lifecycle"] += 1
+            logger.info(f"收到生命周期事件: {data.get('sub_type')}")
+            if data.get("self_id"):
+                self.self_id = data["self_id"]
+            return
+        
+        self.frame_stats["event"] += 1
+        logger.opt(lazy=True).debug("收到消息: {}", lambda: _frame_to_text(message))
+        
+        if data.get("status") == "failed":
+            logger.error(f"收到错误响应: {data}")
+            if data.get("retcode") == 1403:
+                logger.error("token验证失败，请检查配置")
+            return
+        
+        # 每帧只解析一次事件对象，后续所有插件共用
+        event = parse_event(data)
+        if event is None or event.post_type == "meta_event":
+            return
+        event.account = self.name
+        
+        # 放入对应的入站通道，通道已满时由调度器按策略丢弃
+        self.ingress.put(event)
+        
     async def _receive_messages(self, websocket):
+        frame_stats = self.frame_stats
         try:
             while not self._stop_event.is_set():
                 try:
-                    message = await websocket.recv()
-                    data = json.loads(message)
-                    
-                    if data.get("post_type") != "meta_event" or data.get("meta_event_type") != "heartbeat":
-                        logger.debug(f"收到消息: {message}")
-                    
-                    if data.get("status") == "failed":
-                        logger.error(f"收到错误响应: {data}")
-                        if data.get("retcode") == 1403:
-                            logger.error("token验证失败，请检查配置")
-                        continue
-                    
-                    # 检查是否是API响应
-                    if "echo" in data:
-                        # 将API响应传递给API处理器
-                        self.bot.api.handle_api_response(data)
-                        continue
-                    
-                    # 将消息放入队列等待处理
-                    await self.message_queue.put(data)
-                except json.JSONDecodeError:
-                    logger.error(f"JSON解析失败: {message}")
+                    message = await self._recv_frame(websocket)
+                    self._handle_frame(message)
+                except ValueError:
+                    frame_stats["invalid"] += 1
+                    logger.error(f"JSON解析失败: {_frame_to_text(message)}")
                 except websockets.exceptions.ConnectionClosed:
                     logger.error("WebSocket连接已关闭")
                     break
@@ -149,46 +431,62 @@ class MessageHandler:
         try:
             while not self._stop_event.is_set():
                 try:
-                    data = await asyncio.wait_for(self.message_queue.get(), 1)
-                    
-                    if data.get("post_type") == "message":
-                        message_type = data.get("message_type")
-                        
-                        if message_type == "group":
-                            group_id = data.get("group_id")
-                            user_id = data.get("user_id")
-                            raw_message = data.get("raw_message", "")
-                            message = data.get("message", [])
-                            
-                            task = asyncio.create_task(
-                                self._process_group_message(group_id, user_id, message, raw_message)
-                            )
-                            self.tasks.add(task)
-                            task.add_done_callback(self.tasks.discard)
-                        
-                        elif message_type == "private":
-                            user_id = data.get("user_id")
-                            raw_message = data.get("raw_message", "")
-                            message = data.get("message", [])
-                            
-                            task = asyncio.create_task(
-                                self._process_private_message(user_id, message, raw_message)
-                            )
-                            self.tasks.add(task)
-                            task.add_done_callback(self.tasks.discard)
-                    
-                    self.message_queue.task_done()
+                    # 待处理事件已满的会话暂不取出，避免单个繁忙的群占满工作池的名额
+                    event = await asyncio.wait_for(self.ingress.get(self.workers.is_full), 1)
                 except asyncio.TimeoutError:
-                    pass
+                    continue
+                # 群成员变动、群名片变更和消息发送者用于更新成员名单
+                self.roster.observe(event, self.name)
+                if event.post_type == "message":
+                    if event.message_type not in ("group", "private"):
+                        continue
+                elif event.post_type != "notice":
+                    continue
+                try:
+                    # 工作池已满时在此等待，积压留在有界的入站通道中
+                    key = ("g", event.group_id) if event.group_id else ("u", event.user_id)
+                    await self.workers.submit(key, event)
                 except Exception as e:
                     logger.error(f"处理消息时出错: {e}")
         except asyncio.CancelledError:
             logger.debug("消息处理任务已取消")
             
-    async def _process_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]], raw_message: str):
+    async def _dispatch_event(self, event):
+        if event.self_id:
+            self.self_id = event.self_id
+        # 处理期间 bot.api 等指向本连接，插件的回复从收到消息的账号发出
+        connection_token = current_connection.set(self)
+        event_token = current_event.set(event)
+        try:
+            if event.post_type == "notice":
+                await self._process_notice(event)
+            elif event.message_type == "group":
+                await self._process_group_message(event)
+            else:
+                await self._process_private_message(event)
+        finally:
+            current_event.reset(event_token)
+            current_connection.reset(connection_token)
+            
+    async def _process_notice(self, event: NoticeEvent):
+        for plugin_name, plugin in self.bot.plugin_manager.match_notice(event):
+            try:
+                reply = await plugin.handle_notice(event.notice_type, event.user_id, event.group_id, event.raw)
+                if reply:
+                    if event.group_id:
+                        await self.bot.api.send_group_msg(group_id=event.group_id, message=reply)
+                    else:
+                        await self.bot.api.send_private_msg(user_id=event.user_id, message=reply)
+            except Exception as e:
+                logger.error(f"插件 {plugin_name} 处理通知时出错: {e}")
+                
+    async def _process_group_message(self, event: MessageEvent):
+        group_id = event.group_id
+        user_id = event.user_id
+        raw_message = event.raw_message
         try:
             # 如果是命令, 优先使用命令管理器处理
-            text = self._extract_text_from_message(message)
+            text = event.plain_text
             
             # 先检查是否是斜杠命令，由一个插件处理
             if raw_message.startswith("/"):
@@ -202,8 +500,9 @@ class MessageHandler:
                         await self.bot.api.send_group_msg(group_id=group_id, message=response)
                     return
                 
-                # 尝试让一个插件处理命令
-                for plugin_name, plugin in self.plugins.items():
+                # 按命令路由表交给声明该命令的插件处理
+                command = raw_message[1:].strip().split(" ", 1)[0]
+                for plugin_name, plugin in self.bot.plugin_manager.route_command(command):
                     try:
                         if await self._process_command(plugin, raw_message, user_id, group_id):
                             command_handled = True
@@ -222,20 +521,21 @@ class MessageHandler:
                     await self.bot.plugin_manager._handle_command(cmd_info, user_id, group_id)
                     return
             
-            # 非命令或命令处理失败后，正常处理消息
-            for plugin_name, plugin in self.plugins.items():
+            # 非命令或命令处理失败后，交给订阅了该消息的插件处理
+            for plugin_name, plugin in self.bot.plugin_manager.match_message(event):
                 try:
-                    if hasattr(plugin, "handle_group_message"):
-                        await plugin.handle_group_message(group_id, user_id, message)
+                    await plugin.handle_group_message(group_id, user_id, event.message, event=event)
                 except Exception as e:
                     logger.error(f"插件 {plugin_name} 处理群消息时出错: {e}")
         except Exception as e:
             logger.error(f"处理群消息时出错: {e}")
             
-    async def _process_private_message(self, user_id: int, message: List[Dict[str, Any]], raw_message: str):
+    async def _process_private_message(self, event: MessageEvent):
+        user_id = event.user_id
+        raw_message = event.raw_message
         try:
             # 如果是命令, 优先使用命令管理器处理
-            text = self._extract_text_from_message(message)
+            text = event.plain_text
             
             # 先检查是否是斜杠命令，由一个插件处理
             if raw_message.startswith("/"):
@@ -249,8 +549,9 @@ class MessageHandler:
                         await self.bot.api.send_private_msg(user_id=user_id, message=response)
                     return
                 
-                # 尝试让一个插件处理命令
-                for plugin_name, plugin in self.plugins.items():
+                # 按命令路由表交给声明该命令的插件处理
+                command = raw_message[1:].strip().split(" ", 1)[0]
+                for plugin_name, plugin in self.bot.plugin_manager.route_command(command):
                     try:
                         if await self._process_command(plugin, raw_message, user_id):
                             command_handled = True
@@ -269,31 +570,15 @@ class MessageHandler:
                     await self.bot.plugin_manager._handle_command(cmd_info, user_id)
                     return
             
-            # 非命令或命令处理失败后，正常处理消息
-            for plugin_name, plugin in self.plugins.items():
+            # 非命令或命令处理失败后，交给订阅了该消息的插件处理
+            for plugin_name, plugin in self.bot.plugin_manager.match_message(event):
                 try:
-                    if hasattr(plugin, "handle_private_message"):
-                        await plugin.handle_private_message(user_id, message)
+                    await plugin.handle_private_message(user_id, event.message, event=event)
                 except Exception as e:
                     logger.error(f"插件 {plugin_name} 处理私聊消息时出错: {e}")
         except Exception as e:
             logger.error(f"处理私聊消息时出错: {e}")
             
-    def _extract_text_from_message(self, message: List[Dict[str, Any]]) -> str:
-        """从消息中提取文本
-        
-        Args:
-            message: 消息对象
-        
-        Returns:
-            提取的文本
-        """
-        text = ""
-        for msg in message:
-            if msg["type"] == "text":
-                text += msg["data"]["text"]
-        return text.strip()
-            
     async def _process_command(self, plugin, raw_message: str, user_id: int, group_id: Optional[int] = None) -> bool:
         """处理命令，返回是否成功处理
         
@@ -342,9 +627,17 @@ class MessageHandler:
     async def _handle_debug_command(self, args: str) -> str:
         """处理调试命令，允许直接修改变量或执行代码"""
         if not args:
-            return "调试命令格式: /debug <表达式>\n可用命令:\n- 查询: /debug plugins.chat\n- 设置: /debug plugins.chat.debug=true\n- 获取插件命令: /debug plugins.list\n- 测试命令: /debug test.command 命令名称 参数\n- 诊断: /debug diagnose 命令名称 [参数]"
+            return "调试命令格式: /debug <表达式>\n可用命令:\n- 查询: /debug plugins.chat\n- 设置: /debug plugins.chat.debug=true\n- 获取插件命令: /debug plugins.list\n- 测试命令: /debug test.command 命令名称 参数\n- 诊断: /debug diagnose 命令名称 [参数]\n- 运行统计: /debug stats [模块]"
             
         try:
+            # 运行统计
+            if args == "stats" or args.startswith("stats "):
+                name = args[5:].strip() or None
+                stats = self.bot.collect_stats(name)
+                if not stats:
+                    return f"没有名为 {name} 的统计项" if name else "暂无统计数据"
+                return "\n".join(_format_stats(section, data) for section, data in stats.items())
+                
             # 特殊命令处理
             if args == "plugins.list":
                 # 列出所有插件及其可用命令
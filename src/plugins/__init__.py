@@ -1,15 +1,90 @@
-from typing import TYPE_CHECKING, List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Optional, Tuple
 from loguru import logger
 import importlib
 import os
 import inspect
+import re
 from ..utils.command_manager import CommandManager
+from ..events import MessageEvent, NoticeEvent, extract_plain_text
 
 if TYPE_CHECKING:
     from ..bot import BettQQBot
 
+class Subscription:
+    """插件事件订阅
+    
+    message_types、groups、max_length 为过滤条件，必须全部满足；
+    at_self、exact、prefixes、keywords、regex 为触发条件，声明了任意一项时
+    至少满足一项才会分发，都未声明时同类型的消息全部分发。
+    
+    Args:
+        message_types: 订阅的消息类型 group / private
+        notice_types: 订阅的通知类型，如 notify、group_increase
+        at_self: @机器人时触发
+        exact: 纯文本完全等于其中之一时触发
+        prefixes: 纯文本以其中之一开头时触发
+        keywords: 纯文本包含其中之一时触发
+        regex: 纯文本匹配该正则时触发
+        groups: 只接收这些群的消息，私聊不受限制
+        max_length: 纯文本长度上限
+    """
+    __slots__ = (
+        "message_types", "notice_types", "at_self", "exact", "prefixes",
+        "keyword_pattern", "regex", "groups", "max_length", "has_triggers",
+    )
+    
+    def __init__(self, message_types: Iterable[str] = ("group", "private"), notice_types: Iterable[str] = (),
+                 at_self: bool = False, exact: Iterable[str] = (), prefixes: Iterable[str] = (),
+                 keywords: Iterable[str] = (), regex: Optional[str] = None,
+                 groups: Optional[Iterable[int]] = None, max_length: Optional[int] = None):
+        self.message_types = frozenset(message_types)
+        self.notice_types = frozenset(notice_types)
+        self.at_self = at_self
+        self.exact = frozenset(exact)
+        self.prefixes = tuple(prefixes)
+        keywords = list(keywords)
+        # 多个关键词合并为一个正则，一次扫描完成匹配
+        self.keyword_pattern = re.compile("|".join(map(re.escape, keywords))) if keywords else None
+        self.regex = re.compile(regex) if regex else None
+        self.groups = frozenset(groups) if groups is not None else None
+        self.max_length = max_length
+        self.has_triggers = bool(at_self or self.exact or self.prefixes or self.keyword_pattern or self.regex)
+        
+    def matches_message(self, event: MessageEvent) -> bool:
+        if event.message_type not in self.message_types:
+            return False
+        if self.groups is not None and event.group_id is not None and event.group_id not in self.groups:
+            return False
+        text = event.plain_text
+        if self.max_length is not None and len(text) > self.max_length:
+            return False
+        if not self.has_triggers:
+            return True
+        return bool(
+            (self.at_self and event.is_at_self)
+            or text in self.exact
+            or (self.prefixes and text.startswith(self.prefixes))
+            or (self.keyword_pattern and self.keyword_pattern.search(text))
+            or (self.regex and self.regex.search(text))
+        )
+        
+    def matches_notice(self, event: NoticeEvent) -> bool:
+        if event.notice_type not in self.notice_types:
+            return False
+        return self.groups is None or event.group_id is None or event.group_id in self.groups
+
 class Plugin:
-    """插件基类"""
+    """插件基类
+    
+    插件通过实例属性 commands 声明自己处理的斜杠命令：
+    键为命令名，值中可选的 aliases 列出别名。加载时据此建立命令路由表，
+    斜杠命令直接交给声明它的插件的 execute_command 处理。
+    
+    subscriptions 声明插件关心的消息和通知（Subscription 列表），
+    只有匹配的事件才会调用 handle_* 钩子；为None时接收全部消息。
+    """
+    subscriptions: Optional[List[Subscription]] = None
+    
     def __init__(self, bot: 'BettQQBot'):
         self.bot = bot
         
@@ -21,18 +96,28 @@ class Plugin:
         """插件卸载时调用"""
         pass
         
-    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]]):
-        """处理私聊消息"""
+    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
+        """处理私聊消息
+        
+        event 为接收循环中解析好的事件对象，可直接读取 plain_text 等字段
+        """
         pass
         
-    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]]):
-        """处理群消息"""
+    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
+        """处理群消息
+        
+        event 为接收循环中解析好的事件对象，可直接读取 plain_text、is_at_self 等字段
+        """
         pass
         
     async def handle_group_request(self, flag: str, sub_type: str, user_id: int, group_id: int):
         """处理群请求"""
         pass
         
+    async def handle_notice(self, notice_type: str, user_id: int, group_id: Optional[int], data: Dict[str, Any]) -> Optional[str]:
+        """处理订阅的通知事件，返回的文本会回复到对应的群或私聊"""
+        return None
+        
     async def execute_command(self, command: str, args: str, user_id: int, group_id: Optional[int] = None) -> str:
         """执行命令
         
@@ -53,6 +138,13 @@ class PluginManager:
         self.bot = bot
         self.plugins: Dict[str, Plugin] = {}
         self.command_manager = CommandManager(bot.config.get("features", {}).get("commands", {"enabled": False}))
+        # 斜杠命令路由表: 命令名/别名 -> (插件名, 插件)
+        self.command_routes: Dict[str, Tuple[str, Plugin]] = {}
+        # 未声明 commands 的插件，斜杠命令未命中路由表时依次尝试
+        self.unrouted_plugins: List[Tuple[str, Plugin]] = []
+        # 事件分发索引: 消息类型/通知类型 -> [(插件名, 插件, 订阅列表或None)]
+        self._message_index: Dict[str, List[Tuple[str, Plugin, Optional[List[Subscription]]]]] = {}
+        self._notice_index: Dict[str, List[Tuple[str, Plugin, List[Subscription]]]] = {}
         
     async def load_plugins(self):
         """加载插件"""
@@ -74,8 +166,12 @@ class PluginManager:
                 continue
                 
             try:
-                # 导入插件模块
-                module = importlib.import_module(f".{name}", "src.plugins")
+                # 导入插件模块，配置了 module 时从该模块路径导入（用于项目外的插件）
+                module_path = plugin_config.get("module")
+                if module_path:
+                    module = importlib.import_module(module_path)
+                else:
+                    module = importlib.import_module(f".{name}", "src.plugins")
                 
                 # 获取插件类
                 plugin_classes = inspect.getmembers(
@@ -99,6 +195,94 @@ class PluginManager:
                 logger.error(f"加载插件 {name} 失败: {e}")
                 logger.exception(e)  # 打印完整的错误堆栈
                 
+        self._build_command_routes()
+        self._build_dispatch_index()
+        
+    def _build_command_routes(self):
+        """根据各插件声明的 commands 建立命令路由表
+        
+        同一命令被多个插件声明时，先加载的插件优先，冲突在启动时报告。
+        """
+        routes: Dict[str, Tuple[str, Plugin]] = {}
+        unrouted: List[Tuple[str, Plugin]] = []
+        conflicts = 0
+        for name, plugin in self.plugins.items():
+            commands = getattr(plugin, "commands", None)
+            if not isinstance(commands, dict):
+                if type(plugin).execute_command is not Plugin.execute_command:
+                    unrouted.append((name, plugin))
+                continue
+            for command, info in commands.items():
+                aliases = (info or {}).get("aliases", []) if isinstance(info, dict) else []
+                for key in [command, *aliases]:
+                    owner = routes.get(key)
+                    if owner is None:
+                        routes[key] = (name, plugin)
+                    elif owner[0] != name:
+                        conflicts += 1
+                        logger.warning(f"命令冲突: /{key} 同时由插件 {owner[0]} 和 {name} 声明，将由 {owner[0]} 处理")
+                        
+        self.command_routes = routes
+        self.unrouted_plugins = unrouted
+        logger.info(f"命令路由表已建立，共 {len(routes)} 个命令，{conflicts} 处冲突")
+        if unrouted:
+            logger.debug(f"未声明命令的插件: {', '.join(name for name, _ in unrouted)}")
+            
+    def _build_dispatch_index(self):
+        """根据各插件的 subscriptions 建立事件分发索引
+        
+        没有实现对应钩子的插件不进入索引，每条消息只为匹配的插件创建协程。
+        """
+        hooks = {"group": "handle_group_message", "private": "handle_private_message"}
+        message_index = {message_type: [] for message_type in hooks}
+        notice_index: Dict[str, List[Tuple[str, Plugin, List[Subscription]]]] = {}
+        for name, plugin in self.plugins.items():
+            subscriptions = plugin.subscriptions
+            for message_type, hook in hooks.items():
+                if getattr(type(plugin), hook, None) is getattr(Plugin, hook):
+                    continue
+                if subscriptions is None:
+                    message_index[message_type].append((name, plugin, None))
+                    continue
+                matching = [sub for sub in subscriptions if message_type in sub.message_types]
+                if matching:
+                    message_index[message_type].append((name, plugin, matching))
+            if subscriptions and type(plugin).handle_notice is not Plugin.handle_notice:
+                for notice_type in {t for sub in subscriptions for t in sub.notice_types}:
+                    matching = [sub for sub in subscriptions if notice_type in sub.notice_types]
+                    notice_index.setdefault(notice_type, []).append((name, plugin, matching))
+                    
+        self._message_index = message_index
+        self._notice_index = notice_index
+        for message_type, entries in message_index.items():
+            logger.debug(f"{message_type} 消息订阅插件: {', '.join(entry[0] for entry in entries) or '无'}")
+            
+    def match_message(self, event: MessageEvent) -> List[Tuple[str, Plugin]]:
+        """返回订阅了该消息的插件"""
+        return [
+            (name, plugin)
+            for name, plugin, subscriptions in self._message_index.get(event.message_type, ())
+            if subscriptions is None or any(sub.matches_message(event) for sub in subscriptions)
+        ]
+        
+    def match_notice(self, event: NoticeEvent) -> List[Tuple[str, Plugin]]:
+        """返回订阅了该通知的插件"""
+        return [
+            (name, plugin)
+            for name, plugin, subscriptions in self._notice_index.get(event.notice_type, ())
+            if any(sub.matches_notice(event) for sub in subscriptions)
+        ]
+        
+    def route_command(self, command: str) -> List[Tuple[str, Plugin]]:
+        """返回应处理该斜杠命令的插件列表
+        
+        命中路由表时只返回声明该命令的插件，否则返回未声明命令的插件
+        """
+        route = self.command_routes.get(command)
+        if route is not None:
+            return [route]
+        return self.unrouted_plugins
+        
     async def unload_plugins(self):
         """卸载所有插件"""
         for name, plugin in list(self.plugins.items()):
@@ -109,11 +293,15 @@ class PluginManager:
             except Exception as e:
                 logger.error(f"卸载插件 {name} 时出错: {e}")
         self.plugins.clear()
+        self.command_routes.clear()
+        self.unrouted_plugins.clear()
+        self._message_index = {}
+        self._notice_index = {}
         
-    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]]):
+    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
         """处理私聊消息"""
         # 提取文本内容
-        text = self._extract_text_from_message(message)
+        text = event.plain_text if event else extract_plain_text(message)
         
         # 检查是否是命令
         if text and self.command_manager.is_command(text):
@@ -122,18 +310,19 @@ class PluginManager:
                 await self._handle_command(cmd_info, user_id)
                 return
         
-        # 传递给所有插件处理
-        for name, plugin in self.plugins.items():
+        # 有事件对象时只传递给订阅了该消息的插件
+        targets = self.match_message(event) if event else self.plugins.items()
+        for name, plugin in targets:
             try:
-                await plugin.handle_private_message(user_id, message)
+                await plugin.handle_private_message(user_id, message, event=event)
             except Exception as e:
                 logger.error(f"插件 {name} 处理私聊消息失败: {e}")
                 logger.exception(e)  # 打印完整的错误堆栈
                 
-    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]]):
+    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
         """处理群消息"""
         # 提取文本内容
-        text = self._extract_text_from_message(message)
+        text = event.plain_text if event else extract_plain_text(message)
         
         # 检查是否是命令
         if text and self.command_manager.is_command(text):
@@ -142,10 +331,11 @@ class PluginManager:
                 await self._handle_command(cmd_info, user_id, group_id)
                 return
         
-        # 传递给所有插件处理
-        for name, plugin in self.plugins.items():
+        # 有事件对象时只传递给订阅了该消息的插件
+        targets = self.match_message(event) if event else self.plugins.items()
+        for name, plugin in targets:
             try:
-                await plugin.handle_group_message(group_id, user_id, message)
+                await plugin.handle_group_message(group_id, user_id, message, event=event)
             except Exception as e:
                 logger.error(f"插件 {name} 处理群消息失败: {e}")
                 logger.exception(e)  # 打印完整的错误堆栈
@@ -205,18 +395,3 @@ class PluginManager:
         except Exception as e:
             logger.error(f"执行命令 {command} 失败: {e}")
             logger.exception(e)  # 打印完整的错误堆栈
-            
-    def _extract_text_from_message(self, message: List[Dict[str, Any]]) -> str:
-        """从消息中提取文本
-        
-        Args:
-            message: 消息对象
-        
-        Returns:
-            提取的文本
-        """
-        text = ""
-        for msg in message:
-            if msg["type"] == "text":
-                text += msg["data"]["text"]
-        return text.strip() 
\ No newline at end of file
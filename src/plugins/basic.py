@@ -1,16 +1,45 @@
-from src.plugins import Plugin
+from src.plugins import Plugin, Subscription
+from src.events import MessageEvent, extract_plain_text
 from loguru import logger
 from typing import Dict, Any, List, Optional
+import asyncio
 
 class BasicPlugin(Plugin):
     """基础功能插件"""
     
+    subscriptions = [Subscription(exact=["ping"])]
+    
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.commands = {
+            "show_help": {
+                "description": "显示帮助信息",
+                "aliases": ["帮助", "help", "菜单"],
+                "admin_only": False
+            },
+            "test": {
+                "description": "测试命令",
+                "aliases": ["测试"],
+                "admin_only": False
+            },
+            "broadcast": {
+                "description": "向所有群或好友发送消息，用法: 广播 [群|好友|全部] 内容",
+                "aliases": ["广播"],
+                "admin_only": True
+            }
+        }
+        # 正在后台进行的广播
+        self._broadcast_task: Optional[asyncio.Task] = None
+    
     async def on_load(self):
         """插件加载"""
         logger.info("基础插件已加载")
         
     async def on_unload(self):
         """插件卸载"""
+        if self._broadcast_task is not None and not self._broadcast_task.done():
+            self._broadcast_task.cancel()
+            await asyncio.gather(self._broadcast_task, return_exceptions=True)
         logger.info("基础插件已卸载")
         
     async def execute_command(self, command: str, args: str, user_id: int, group_id: Optional[int] = None) -> str:
@@ -32,6 +61,8 @@ class BasicPlugin(Plugin):
             return await self._show_help(args, user_id, group_id)
         elif command in ["test", "测试"]:
             return f"测试命令执行成功！参数: {args}, 用户ID: {user_id}, 群ID: {group_id if group_id else '私聊'}"
+        elif command in ["broadcast", "广播"]:
+            return await self._broadcast(args, user_id, group_id)
         else:
             logger.warning(f"未知的基础插件命令: {command}")
             return f"未知的命令: {command}"
@@ -69,20 +100,75 @@ class BasicPlugin(Plugin):
         
         return help_text
         
-    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]]):
-        text = ""
-        for msg in message:
-            if msg["type"] == "text":
-                text += msg["data"]["text"]
+    async def _broadcast(self, args: str, user_id: int, group_id: Optional[int] = None) -> str:
+        """广播消息到所有群和/或好友
+
+        广播在后台任务中进行，命令立即返回，不占用工作协程，也不阻塞该会话后续的命令；
+        进度和结果通过消息回复。同一时间只进行一个广播。
+        """
+        # 斜杠命令不经过命令管理器的管理员检查，这里再检查一次
+        if user_id not in self.bot.config["bot"]["admin"]["super_users"]:
+            return "此命令仅管理员可用喵~"
+        
+        scope, _, content = args.strip().partition(" ")
+        if scope not in ("群", "好友", "全部"):
+            scope, content = "群", args.strip()
+        content = content.strip()
+        if not content:
+            return "用法: 广播 [群|好友|全部] 内容（默认发送到所有群）"
+        if self._broadcast_task is not None and not self._broadcast_task.done():
+            return "已有广播正在进行，请等待完成后再试喵~"
+        
+        group_ids: List[int] = []
+        user_ids: List[int] = []
+        if scope in ("群", "全部"):
+            groups = await self.bot.api.get_group_list() or []
+            group_ids = [group["group_id"] for group in groups if group.get("group_id")]
+        if scope in ("好友", "全部"):
+            friends = await self.bot.api.get_friend_list() or []
+            user_ids = [friend["user_id"] for friend in friends if friend.get("user_id")]
+        total = len(group_ids) + len(user_ids)
+        if not total:
+            return "没有可以广播的目标喵~"
+        
+        async def reply(text: str):
+            if group_id:
+                await self.bot.api.send_group_msg(group_id=group_id, message=text)
+            else:
+                await self.bot.api.send_private_msg(user_id=user_id, message=text)
+        
+        async def progress(done: int, total: int):
+            if done < total:
+                await reply(f"广播进度: {done}/{total}")
+        
+        async def run():
+            try:
+                result = await self.bot.api.broadcast(content, group_ids=group_ids, user_ids=user_ids, progress=progress)
+                text = f"广播完成: 成功 {result['succeeded']}/{result['total']}，耗时 {result['seconds']} 秒"
+                if result["failed"]:
+                    shown = "、".join(f"{'群' if kind == 'group' else '好友'}{target_id}" for kind, target_id in result["failed"][:10])
+                    more = f" 等 {len(result['failed'])} 个" if len(result["failed"]) > 10 else ""
+                    text += f"\n发送失败: {shown}{more}"
+                await reply(text)
+            except asyncio.CancelledError:
+                logger.warning("广播已取消")
+                raise
+            except Exception as e:
+                logger.error(f"广播出错: {e}")
+                await reply(f"广播出错: {e}")
+        
+        # 后台任务继承当前事件的上下文，回复发往发起广播的会话和账号
+        self._broadcast_task = asyncio.create_task(run())
+        return f"开始广播到 {total} 个目标，完成后会通知你喵~"
+        
+    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
+        text = event.plain_text if event else extract_plain_text(message)
                 
         if text == "ping":
             await self.bot.api.send_private_msg(user_id=user_id, message="pong!")
             
-    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]]):
-        text = ""
-        for msg in message:
-            if msg["type"] == "text":
-                text += msg["data"]["text"]
+    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
+        text = event.plain_text if event else extract_plain_text(message)
                 
         if text == "ping":
             await self.bot.api.send_group_msg(group_id=group_id, message="pong!")
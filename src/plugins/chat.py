@@ -1,13 +1,20 @@
-from ..plugins import Plugin
+from ..plugins import Plugin, Subscription
 from ..ai_providers.factory import create_provider
 from ..utils.access_control import AccessControl
 from ..utils.memory_manager import MemoryManager
+from ..events import MessageEvent, extract_plain_text
+from ..utils.message_builder import MessageBuilder, first_image_url
 from loguru import logger
 from typing import Optional, Dict, Any, List
-import aiohttp
 import os
 
 class ChatPlugin(Plugin):
+    # 群聊只在@机器人、!前缀或管理命令时触发，私聊全部接收
+    subscriptions = [
+        Subscription(message_types=["group"], at_self=True, prefixes=["!", "@bot喵喵", "/chat."]),
+        Subscription(message_types=["private"]),
+    ]
+    
     async def on_load(self):
         logger.info("聊天插件已加载")
         config = self.bot.config["features"]["chat"]
@@ -77,6 +84,7 @@ class ChatPlugin(Plugin):
             "clear_memory": {
                 "function": self._clear_memory_command,
                 "description": "清除记忆",
+                "aliases": ["清除记忆", "forget"],
                 "permission": "user"
             },
             "withdraw": {
@@ -113,6 +121,10 @@ class ChatPlugin(Plugin):
                 "function": self.handle_presets,
                 "description": "管理提示词预设",
                 "permission": "admin"
+            },
+            "send": {
+                "description": "向指定好友或群发送消息",
+                "permission": "admin"
             }
         }
         
@@ -207,11 +219,12 @@ class ChatPlugin(Plugin):
         
     async def _get_user_info(self, user_id: int) -> Dict[str, Any]:
         try:
+            # 结果来自API缓存，不修改返回的字典
             info = await self.bot.api.get_stranger_info(user_id=user_id)
-            if info.get("status") == "failed":
-                logger.error(f"获取用户 {user_id} 信息失败: {info}")
+            if not info:
+                logger.error(f"获取用户 {user_id} 信息失败")
                 return {"user_id": user_id, "nickname": str(user_id)}
-            return info.get("data", {"user_id": user_id, "nickname": str(user_id)})
+            return info
         except Exception as e:
             logger.error(f"获取用户 {user_id} 信息失败: {e}")
             return {"user_id": user_id, "nickname": str(user_id)}
@@ -412,12 +425,12 @@ class ChatPlugin(Plugin):
                     target_id = int(parts[3])
                     message = " ".join(parts[4:])
                     if target_type == "friend":
-                        result = await self.bot.api.send_private_msg(user_id=target_id, message=message)
+                        result = await self.bot.api.send_private_msg(user_id=target_id, message=message, coalesce=False)
                         if result.get("status") == "failed":
                             return f"发送消息失败喵: {result.get('message', '未知错误')}"
                         return f"已向用户 {target_id} 发送消息喵~"
                     elif target_type == "group":
-                        result = await self.bot.api.send_group_msg(group_id=target_id, message=message)
+                        result = await self.bot.api.send_group_msg(group_id=target_id, message=message, coalesce=False)
                         if result.get("status") == "failed":
                             return f"发送消息失败喵: {result.get('message', '未知错误')}"
                         return f"已向群 {target_id} 发送消息喵~"
@@ -550,16 +563,15 @@ class ChatPlugin(Plugin):
                 self.message_counter += 1
                 
                 try:
+                    # 以消息段数组发送，回复中的引号、方括号等字符原样保留
                     if group_id:
-                        # 群聊中@用户并换行（确保不重复@）
-                        formatted_response = f"{formatted_response}\n\n[CQ:at,qq={user_id}]"
-                        # 确保消息内容符合API要求
-                        formatted_response = formatted_response.replace("\"", "'")
-                        result = await self.bot.api.send_group_msg(group_id=group_id, message=formatted_response)
+                        # 群聊中@用户并换行
+                        message = MessageBuilder().text(formatted_response).text("\n\n").at(user_id).build()
+                        result = await self.bot.api.send_group_msg(group_id=group_id, message=message, coalesce=False)
                     else:
                         # 私聊直接发送
-                        formatted_response = formatted_response.replace("\"", "'")
-                        result = await self.bot.api.send_private_msg(user_id=user_id, message=formatted_response)
+                        message = MessageBuilder().text(formatted_response).build()
+                        result = await self.bot.api.send_private_msg(user_id=user_id, message=message, coalesce=False)
                     
                     if result.get("status") == "failed":
                         logger.error(f"发送消息失败: {result}")
@@ -850,13 +862,9 @@ class ChatPlugin(Plugin):
         
         return "".join(result)
         
-    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]]):
-        text = ""
+    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
         at_bot = False
-        for msg in message:
-            if msg["type"] == "text":
-                text += msg["data"]["text"]
-                logger.debug(f"Raw text message part: {msg['data']['text']}")
+        text = event.plain_text if event else extract_plain_text(message)
 
         logger.debug(f"Full message text before processing: {text}")
         
@@ -866,17 +874,19 @@ class ChatPlugin(Plugin):
             at_bot = True
             text = text[7:].strip()  # Remove "@bot喵喵" prefix
             logger.debug(f"Text after removing prefix: {text}")
+        elif event is not None:
+            # @mention 已在事件解析时识别，文本中不包含@片段
+            at_bot = event.is_at_self
+            if at_bot:
+                logger.debug("Detected @mention")
         else:
             # Fallback to original @mention detection
             logger.debug("Checking for @mention")
+            bot_qq = str(self.bot.config["bot"].get("qq", ""))
             for msg in message:
-                if msg["type"] == "at" and ("qq" in msg["data"] and str(msg["data"]["qq"]) == str(self.bot.config["bot"]["qq"])):
+                if msg["type"] == "at" and ("qq" in msg["data"] and str(msg["data"]["qq"]) == bot_qq):
                     logger.debug("Detected @mention")
                     at_bot = True
-                    # Remove any @mention text from the message content
-                    if "qq" in msg["data"]:
-                        text = text.replace(f"[CQ:at,qq={msg['data']['qq']}]", "").strip()
-                        logger.debug(f"Text after removing @mention: {text}")
         
         # 处理管理命令
         if text.startswith("/chat."):
@@ -910,11 +920,8 @@ class ChatPlugin(Plugin):
         if content:
             reply = await self._handle_chat(content, group_id, user_id, is_group=True)
         
-    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]]):
-        text = ""
-        for msg in message:
-            if msg["type"] == "text":
-                text += msg["data"]["text"]
+    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
+        text = event.plain_text if event else extract_plain_text(message)
         
         # 处理所有命令（包括/chat和其他命令）
         if text.startswith("/"):
@@ -1029,7 +1036,7 @@ class ChatPlugin(Plugin):
                 message = " ".join(parts[3:])
                 
                 if target_type == "friend":
-                    result = await self.bot.api.send_private_msg(user_id=target_id, message=message)
+                    result = await self.bot.api.send_private_msg(user_id=target_id, message=message, coalesce=False)
                     if result.get("status") == "failed":
                         return f"发送消息失败喵: {result.get('message', '未知错误')}"
                     
@@ -1065,7 +1072,7 @@ class ChatPlugin(Plugin):
                     return f"已向用户 {target_id} 发送消息喵~"
                     
                 elif target_type == "group":
-                    result = await self.bot.api.send_group_msg(group_id=target_id, message=message)
+                    result = await self.bot.api.send_group_msg(group_id=target_id, message=message, coalesce=False)
                     if result.get("status") == "failed":
                         return f"发送消息失败喵: {result.get('message', '未知错误')}"
                     
@@ -1503,15 +1510,13 @@ class ChatPlugin(Plugin):
             import numpy as np
             from datetime import datetime
             
-            # 检查是否有图片
-            if not args or "[CQ:image" not in args:
+            # 提取图片URL（解析CQ码，参数顺序和转义都不影响结果）
+            image_url = first_image_url(args) if args else None
+            if not image_url:
                 return "请发送'锤<图片>'格式的消息喵~"
-                
-            # 提取图片URL
-            image_url = args.split("url=")[1].split("]")[0]
             
             # 下载图片
-            async with aiohttp.ClientSession() as session:
+            async with self.bot.api.http_session() as session:
                 async with session.get(image_url) as resp:
                     if resp.status != 200:
                         return "下载图片失败喵~"
@@ -1587,16 +1592,11 @@ class ChatPlugin(Plugin):
                 f.write(gif_bytes.getvalue())
             
             # 返回GIF给用户
+            message = MessageBuilder().image_file(gif_path).build()
             if group_id:
-                await self.bot.api.send_group_msg(
-                    group_id=group_id,
-                    message=f"[CQ:image,file=file:///{os.path.abspath(gif_path)}]"
-                )
+                await self.bot.api.send_group_msg(group_id=group_id, message=message)
             else:
-                await self.bot.api.send_private_msg(
-                    user_id=user_id,
-                    message=f"[CQ:image,file=file:///{os.path.abspath(gif_path)}]"
-                )
+                await self.bot.api.send_private_msg(user_id=user_id, message=message)
             
             return ""
             
@@ -1670,7 +1670,7 @@ class ChatPlugin(Plugin):
                 message = " ".join(parts[2:])
                 
                 if target_type == "friend":
-                    result = await self.bot.api.send_private_msg(user_id=target_id, message=message)
+                    result = await self.bot.api.send_private_msg(user_id=target_id, message=message, coalesce=False)
                     if result.get("status") == "failed":
                         return f"发送消息失败喵: {result.get('message', '未知错误')}"
                     
@@ -1706,7 +1706,7 @@ class ChatPlugin(Plugin):
                     return f"已向用户 {target_id} 发送消息喵~"
                     
                 elif target_type == "group":
-                    result = await self.bot.api.send_group_msg(group_id=target_id, message=message)
+                    result = await self.bot.api.send_group_msg(group_id=target_id, message=message, coalesce=False)
                     if result.get("status") == "failed":
                         return f"发送消息失败喵: {result.get('message', '未知错误')}"
                     
@@ -1,7 +1,8 @@
-from src.plugins import Plugin
+from src.plugins import Plugin, Subscription
+from src.events import MessageEvent, extract_plain_text
 from loguru import logger
 from typing import Dict, Any, List, Optional
-import aiohttp
+import asyncio
 import json
 import random
 import os
@@ -12,15 +13,41 @@ import urllib.parse
 import ssl
 import re
 
+# 文本形式的戳一戳
+POKE_TEXTS = ["戳一戳", "戳戳", "poke", "摸摸", "摸一摸", "摸头", "摸摸头", "拍拍", "拍一拍"]
+
 class ExtraFeaturesPlugin(Plugin):
     """额外功能插件"""
     
+    subscriptions = [
+        Subscription(keywords=POKE_TEXTS, max_length=10),
+        Subscription(message_types=(), notice_types=["notify", "poke"]),
+    ]
+    
     async def on_load(self) -> None:
         """插件加载时的处理函数"""
         logger.info("加载额外功能插件")
         
+        self.commands = {
+            "天气": {"description": "查询天气", "aliases": ["weather"]},
+            "运势": {"description": "今日运势", "aliases": ["fortune", "今日运势"]},
+            "早安": {"description": "早安问候", "aliases": ["morning", "good_morning"]},
+            "晚安": {"description": "晚安问候", "aliases": ["night", "good_night"]},
+            "图片": {"description": "随机图片", "aliases": ["pic", "image"]},
+            "点歌": {"description": "搜索音乐", "aliases": ["music", "song"]},
+            "地震": {"description": "地震信息", "aliases": ["earthquake"]},
+            "新闻": {"description": "新闻", "aliases": ["news"]},
+            "历史上的今天": {"description": "历史上的今天", "aliases": ["event", "事件"]},
+            "设置位置": {"description": "设置默认位置", "aliases": ["set_location"]},
+            "戳戳": {"description": "戳一戳", "aliases": ["poke", "摸摸", "摸摸头"]},
+            "积分": {"description": "查看积分", "aliases": ["points", "我的积分"]},
+            "好感度": {"description": "查看好感度", "aliases": ["favor", "我的好感度"]},
+            "签到": {"description": "每日签到", "aliases": ["check_in", "打卡"]},
+            "积分榜": {"description": "积分排行榜", "aliases": ["points_rank", "富豪榜", "积分排名"]},
+        }
+        
         # 创建数据目录
-        self.data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "extra_features")
+        self.data_dir = os.path.join(self.bot.config.get("data_path", "data"), "extra_features")
         os.makedirs(self.data_dir, exist_ok=True)
         
         # 问候数据文件路径
@@ -210,7 +237,7 @@ class ExtraFeaturesPlugin(Plugin):
             
         # 验证位置是否存在
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self.bot.api.http_session() as session:
                 # 使用墨迹天气API验证城市是否存在
                 encoded_location = urllib.parse.quote(location)
                 url = f"https://api.66mz8.com/api/weather.php?location={encoded_location}"
@@ -238,7 +265,7 @@ class ExtraFeaturesPlugin(Plugin):
             
             # 尝试使用备用API验证城市
             try:
-                async with aiohttp.ClientSession() as session:
+                async with self.bot.api.http_session() as session:
                     encoded_location = urllib.parse.quote(location)
                     url = f"https://v0.yiketianqi.com/api?unescape=1&version=v9&appid=75841888&appsecret=ZDE4ZDIxMzc&city={encoded_location}"
                     
@@ -278,31 +305,20 @@ class ExtraFeaturesPlugin(Plugin):
             return location
             
         try:
-            # 通过NapCat API获取用户资料
-            async with aiohttp.ClientSession() as session:
-                api_base = f"http://{self.bot.config['bot']['napcat']['host']}:{self.bot.config['bot']['napcat']['port']}"
-                token = self.bot.config['bot']['napcat']['access_token']
-                headers = {"Authorization": f"Bearer {token}"}
-                
-                # 获取用户资料
-                url = f"{api_base}/get_stranger_info?user_id={user_id}"
-                async with session.get(url, headers=headers) as response:
-                    if response.status != 200:
-                        logger.warning(f"获取用户 {user_id} 资料失败: {response.status}")
-                        return None
-                    
-                    data = await response.json()
-                    if not data or "data" not in data:
-                        return None
-                    
-                    # 尝试从用户资料中获取地区信息
-                    user_info = data["data"]
-                    if "area" in user_info and user_info["area"]:
-                        # 可能返回"北京 朝阳区"这样的格式，我们只取第一个城市名
-                        area = user_info["area"].split()[0]
-                        logger.info(f"从用户资料获取到位置: {area}")
-                        return area
-                
+            # 通过NapCat API获取用户资料（经API缓存）
+            user_info = await self.bot.api.get_stranger_info(user_id=user_id)
+            if not user_info:
+                logger.warning(f"获取用户 {user_id} 资料失败")
+                return None
+            
+            # 尝试从用户资料中获取地区信息
+            if user_info.get("area"):
+                # 可能返回"北京 朝阳区"这样的格式，我们只取第一个城市名
+                area = user_info["area"].split()[0]
+                logger.info(f"从用户资料获取到位置: {area}")
+                return area
+            
+            async with self.bot.api.http_session() as session:
                 # 如果无法从用户资料获取，则尝试使用免费的IP定位API
                 try:
                     # 使用ip-api.com的免费服务
@@ -369,7 +385,7 @@ class ExtraFeaturesPlugin(Plugin):
         try:
             url = f"http://apis.juhe.cn/simpleWeather/query?city={encoded_city}&key=087d7d10f700d20e27bb753cd806e40b"
             
-            async with aiohttp.ClientSession() as session:
+            async with self.bot.api.http_session() as session:
                 async with session.get(url, ssl=ssl_context, timeout=10) as response:
                     if response.status != 200:
                         raise Exception(f"第一个API返回状态码 {response.status}")
@@ -396,7 +412,7 @@ class ExtraFeaturesPlugin(Plugin):
         try:
             url = f"http://apis.juhe.cn/simpleWeather/query?city={encoded_city}&key=087d7d10f700d20e27bb753cd806e40b"
             
-            async with aiohttp.ClientSession() as session:
+            async with self.bot.api.http_session() as session:
                 async with session.get(url, ssl=ssl_context, timeout=10) as response:
                     if response.status != 200:
                         raise Exception(f"第二个API返回状态码 {response.status}")
@@ -578,11 +594,13 @@ class ExtraFeaturesPlugin(Plugin):
         # 构建排行榜字符串
         if len(top_users) > 1:  # 至少有两个人才显示排行榜
             greeting += "\n\n【今日早安排行】"
-            max_display = min(10, len(top_users))  # 最多显示10个
+            display_users = top_users[:10]  # 最多显示10个
+            # 并发查询昵称
+            user_names = await asyncio.gather(
+                *(self._get_user_nickname(int(user["user_id"])) for user in display_users)
+            )
             
-            for i in range(max_display):
-                user = top_users[i]
-                user_name = await self._get_user_nickname(int(user["user_id"]))
+            for user, user_name in zip(display_users, user_names):
                 greeting += f"\n{user['rank']}. {user_name} ({user['time']})"
         
         return greeting
@@ -651,11 +669,13 @@ class ExtraFeaturesPlugin(Plugin):
         # 构建排行榜字符串
         if len(top_users) > 1:  # 至少有两个人才显示排行榜
             greeting += "\n\n【今日晚安排行】"
-            max_display = min(10, len(top_users))  # 最多显示10个
+            display_users = top_users[:10]  # 最多显示10个
+            # 并发查询昵称
+            user_names = await asyncio.gather(
+                *(self._get_user_nickname(int(user["user_id"])) for user in display_users)
+            )
             
-            for i in range(max_display):
-                user = top_users[i]
-                user_name = await self._get_user_nickname(int(user["user_id"]))
+            for user, user_name in zip(display_users, user_names):
                 greeting += f"\n{user['rank']}. {user_name} ({user['time']})"
         
         return greeting
@@ -789,7 +809,7 @@ class ExtraFeaturesPlugin(Plugin):
             ssl_context.check_hostname = False
             ssl_context.verify_mode = ssl.CERT_NONE
             
-            async with aiohttp.ClientSession() as session:
+            async with self.bot.api.http_session() as session:
                 async with session.get(url, ssl=ssl_context, timeout=10) as response:
                     if response.status != 200:
                         return f"获取图片失败喵~错误代码: {response.status}"
@@ -826,7 +846,7 @@ class ExtraFeaturesPlugin(Plugin):
                     ssl_context.check_hostname = False
                     ssl_context.verify_mode = ssl.CERT_NONE
                     
-                    async with aiohttp.ClientSession() as session:
+                    async with self.bot.api.http_session() as session:
                         async with session.get(backup_url, ssl=ssl_context, timeout=10) as response:
                             if response.status == 200:
                                 img_url = str(response.url)
@@ -865,7 +885,7 @@ class ExtraFeaturesPlugin(Plugin):
                 "Connection": "keep-alive"
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with self.bot.api.http_session() as session:
                 async with session.get(url, headers=headers, ssl=ssl_context, timeout=15) as response:
                     if response.status != 200:
                         raise Exception(f"中国地震台网返回状态码 {response.status}")
@@ -1026,7 +1046,7 @@ class ExtraFeaturesPlugin(Plugin):
                     "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
                 }
                 
-                async with aiohttp.ClientSession() as session:
+                async with self.bot.api.http_session() as session:
                     async with session.get(url, headers=headers, ssl=ssl_context, timeout=15) as response:
                         if response.status != 200:
                             raise Exception(f"备用地震网站返回状态码 {response.status}")
@@ -1114,7 +1134,7 @@ class ExtraFeaturesPlugin(Plugin):
                         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
                     }
                     
-                    async with aiohttp.ClientSession() as session:
+                    async with self.bot.api.http_session() as session:
                         async with session.get(url, headers=headers, ssl=ssl_context, timeout=15) as response:
                             if response.status != 200:
                                 raise Exception(f"第三方地震网站返回状态码 {response.status}")
@@ -1202,7 +1222,7 @@ class ExtraFeaturesPlugin(Plugin):
                 "Accept": "application/json"
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with self.bot.api.http_session() as session:
                 # 发送请求
                 async with session.post(url, params=params, headers=headers, ssl=ssl_context, timeout=15) as response:
                     # 检查响应状态码
@@ -1260,7 +1280,7 @@ class ExtraFeaturesPlugin(Plugin):
                     "Accept": "application/json"
                 }
                 
-                async with aiohttp.ClientSession() as session:
+                async with self.bot.api.http_session() as session:
                     async with session.get(url, headers=headers, ssl=ssl_context, timeout=15) as response:
                         if response.status != 200:
                             raise Exception(f"QQ音乐API返回状态码 {response.status}")
@@ -1312,7 +1332,7 @@ class ExtraFeaturesPlugin(Plugin):
                     "Cookie": "kw_token="
                 }
                 
-                async with aiohttp.ClientSession() as session:
+                async with self.bot.api.http_session() as session:
                     async with session.get(url, headers=headers, ssl=ssl_context, timeout=15) as response:
                         if response.status != 200:
                             raise Exception(f"Kuwo音乐API返回状态码 {response.status}")
@@ -1367,7 +1387,7 @@ class ExtraFeaturesPlugin(Plugin):
                 "Connection": "keep-alive"
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with self.bot.api.http_session() as session:
                 async with session.get(url, headers=headers, ssl=ssl_context, timeout=15) as response:
                     if response.status != 200:
                         raise Exception(f"新闻网站返回状态码 {response.status}")
@@ -1424,7 +1444,7 @@ class ExtraFeaturesPlugin(Plugin):
                     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8"
                 }
                 
-                async with aiohttp.ClientSession() as session:
+                async with self.bot.api.http_session() as session:
                     async with session.get(url, headers=headers, ssl=ssl_context, timeout=15) as response:
                         if response.status != 200:
                             raise Exception(f"备用新闻网站返回状态码 {response.status}")
@@ -1495,7 +1515,7 @@ class ExtraFeaturesPlugin(Plugin):
                 "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with self.bot.api.http_session() as session:
                 async with session.get(url, headers=headers, ssl=ssl_context, timeout=15) as response:
                     if response.status != 200:
                         raise Exception(f"历史事件网站返回状态码 {response.status}")
@@ -1554,7 +1574,7 @@ class ExtraFeaturesPlugin(Plugin):
                     "Referer": "https://baike.baidu.com/"
                 }
                 
-                async with aiohttp.ClientSession() as session:
+                async with self.bot.api.http_session() as session:
                     async with session.get(url, headers=headers, ssl=ssl_context, timeout=15) as response:
                         if response.status != 200:
                             raise Exception(f"百度百科返回状态码 {response.status}")
@@ -1621,7 +1641,7 @@ class ExtraFeaturesPlugin(Plugin):
                         "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
                     }
                     
-                    async with aiohttp.ClientSession() as session:
+                    async with self.bot.api.http_session() as session:
                         async with session.get(url, headers=headers, ssl=ssl_context, timeout=15) as response:
                             if response.status != 200:
                                 raise Exception(f"360历史上的今天返回状态码 {response.status}")
@@ -1735,20 +1755,16 @@ class ExtraFeaturesPlugin(Plugin):
                         logger.error(f"本地历史事件数据获取失败: {final_error}")
                         return f"无法获取{month}月{day}日的历史事件数据喵~请稍后再试"
 
-    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]]):
+    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
         """处理私聊消息"""
         # 检查消息是否为文本形式的戳一戳
         try:
-            message_text = ""
-            for msg_segment in message:
-                if msg_segment.get("type") == "text":
-                    message_text += msg_segment.get("data", {}).get("text", "")
+            message_text = event.plain_text if event else extract_plain_text(message)
             
             # 判断消息内容是否为戳一戳类文本
-            poke_texts = ["戳一戳", "戳戳", "poke", "摸摸", "摸一摸", "摸头", "摸摸头", "拍拍", "拍一拍"]
             is_poke_text = False
             
-            for poke_text in poke_texts:
+            for poke_text in POKE_TEXTS:
                 if poke_text in message_text and len(message_text.strip()) <= 10:  # 限制长度，避免误触发
                     is_poke_text = True
                     break
@@ -1780,20 +1796,16 @@ class ExtraFeaturesPlugin(Plugin):
         except Exception as e:
             logger.error(f"处理私聊中的文本形式戳一戳消息时出错: {e}")
     
-    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]]):
+    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
         """处理群聊消息"""
         # 检查消息是否为文本形式的戳一戳
         try:
-            message_text = ""
-            for msg_segment in message:
-                if msg_segment.get("type") == "text":
-                    message_text += msg_segment.get("data", {}).get("text", "")
+            message_text = event.plain_text if event else extract_plain_text(message)
             
             # 判断消息内容是否为戳一戳类文本
-            poke_texts = ["戳一戳", "戳戳", "poke", "摸摸", "摸一摸", "摸头", "摸摸头", "拍拍", "拍一拍"]
             is_poke_text = False
             
-            for poke_text in poke_texts:
+            for poke_text in POKE_TEXTS:
                 if poke_text in message_text and len(message_text.strip()) <= 10:  # 限制长度，避免误触发
                     is_poke_text = True
                     break
@@ -1802,11 +1814,7 @@ class ExtraFeaturesPlugin(Plugin):
                 logger.info(f"检测到文本形式的戳一戳消息: {message_text} 来自用户: {user_id}")
                 
                 # 判断消息是否只@了机器人
-                is_at_bot = False
-                for msg_segment in message:
-                    if msg_segment.get("type") == "at" and msg_segment.get("data", {}).get("qq", "") == str(self.bot.self_id):
-                        is_at_bot = True
-                        break
+                is_at_bot = event.is_at_self if event else False
                 
                 # 如果是@机器人的戳一戳消息，或者只有戳一戳相关文本
                 if is_at_bot or len(message) == 1:
@@ -2003,22 +2011,7 @@ class ExtraFeaturesPlugin(Plugin):
             AI生成的回复
         """
         # 获取用户名称
-        user_name = str(user_id)
-        try:
-            # 尝试获取用户昵称
-            api_base = f"http://{self.bot.config['bot']['napcat']['host']}:{self.bot.config['bot']['napcat']['port']}"
-            token = self.bot.config['bot']['napcat']['access_token']
-            headers = {"Authorization": f"Bearer {token}"}
-            
-            async with aiohttp.ClientSession() as session:
-                url = f"{api_base}/get_stranger_info?user_id={user_id}"
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data and "data" in data and "nickname" in data["data"]:
-                            user_name = data["data"]["nickname"]
-        except Exception as e:
-            logger.error(f"获取用户昵称失败: {e}")
+        user_name = await self._get_user_nickname(user_id)
         
         # 构建提示词
         if is_master:
@@ -2101,7 +2094,7 @@ class ExtraFeaturesPlugin(Plugin):
         
         for api in ai_apis:
             try:
-                async with aiohttp.ClientSession() as session:
+                async with self.bot.api.http_session() as session:
                     method = api.get("method", "GET")
                     # 设置超时避免长时间等待
                     if method == "GET":
@@ -2235,21 +2228,7 @@ class ExtraFeaturesPlugin(Plugin):
         # 如果指定了其他用户为目标
         try:
             # 获取目标用户昵称
-            target_name = str(target_id)
-            try:
-                api_base = f"http://{self.bot.config['bot']['napcat']['host']}:{self.bot.config['bot']['napcat']['port']}"
-                token = self.bot.config['bot']['napcat']['access_token']
-                headers = {"Authorization": f"Bearer {token}"}
-                
-                async with aiohttp.ClientSession() as session:
-                    url = f"{api_base}/get_stranger_info?user_id={target_id}"
-                    async with session.get(url, headers=headers) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            if data and "data" in data and "nickname" in data["data"]:
-                                target_name = data["data"]["nickname"]
-            except Exception as e:
-                logger.error(f"获取目标用户昵称失败: {e}")
+            target_name = await self._get_user_nickname(target_id)
             
             # 生成戳其他人的消息
             responses = [
@@ -2589,18 +2568,10 @@ class ExtraFeaturesPlugin(Plugin):
             用户昵称，如果获取失败则返回用户ID
         """
         try:
-            # 尝试获取用户昵称
-            api_base = f"http://{self.bot.config['bot']['napcat']['host']}:{self.bot.config['bot']['napcat']['port']}"
-            token = self.bot.config['bot']['napcat']['access_token']
-            headers = {"Authorization": f"Bearer {token}"}
-            
-            async with aiohttp.ClientSession() as session:
-                url = f"{api_base}/get_stranger_info?user_id={user_id}"
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data and "data" in data and "nickname" in data["data"]:
-                            return data["data"]["nickname"]
+            # 通过API获取用户昵称（结果有缓存，并发的相同请求只发送一次）
+            user_info = await self.bot.api.get_stranger_info(user_id=int(user_id))
+            if user_info and user_info.get("nickname"):
+                return user_info["nickname"]
         except Exception as e:
             logger.error(f"获取用户昵称失败: {e}")
         
@@ -2687,11 +2658,14 @@ class ExtraFeaturesPlugin(Plugin):
         if not leaderboard:
             return result + "暂无排行数据喵~"
         
-        for i, user_data in enumerate(leaderboard):
+        # 名称来自群成员名单缓存，只有不在名单中的用户才会查询API
+        nicknames = await self.bot.roster.display_names([user_data["user_id"] for user_data in leaderboard])
+        
+        for i, (user_data, nickname) in enumerate(zip(leaderboard, nicknames)):
             try:
                 user_id = user_data["user_id"]
                 points = user_data["points"]
-                nickname = await self._get_user_nickname(user_id)
+                nickname = nickname or str(user_id)
                 
                 # 根据排名添加不同的图标
                 if i == 0:
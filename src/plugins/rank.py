@@ -22,6 +22,13 @@ class RankPlugin(Plugin):
         self.points = {}
         self.favor = {}
         self.checkin = {}
+        
+        self.commands = {
+            "points_rank": {"description": "积分排行榜", "aliases": ["积分排行", "积分榜"]},
+            "favor_rank": {"description": "好感度排行榜", "aliases": ["好感度排行", "好感榜"]},
+            "checkin_rank": {"description": "签到排行榜", "aliases": ["签到排行", "签到榜"]},
+            "rank": {"description": "综合排行榜", "aliases": ["排行榜", "排名"]},
+        }
     
     async def on_load(self):
         logger.info("排行榜插件已加载")
@@ -86,9 +93,9 @@ class RankPlugin(Plugin):
             )[:limit]
             
             result = "🏆 积分排行榜 🏆\n\n"
-            for i, (user_id, data) in enumerate(sorted_users, 1):
-                # 尝试获取用户昵称
-                nickname = await self._get_user_nickname(user_id)
+            # 并发获取所有上榜用户的昵称
+            nicknames = await self._get_user_nicknames([user_id for user_id, _ in sorted_users])
+            for i, ((user_id, data), nickname) in enumerate(zip(sorted_users, nicknames), 1):
                 points = data.get("points", 0)
                 
                 # 前三名使用奖牌图标
@@ -122,9 +129,8 @@ class RankPlugin(Plugin):
             )[:limit]
             
             result = "❤️ 好感度排行榜 ❤️\n\n"
-            for i, (user_id, data) in enumerate(sorted_users, 1):
-                # 尝试获取用户昵称
-                nickname = await self._get_user_nickname(user_id)
+            nicknames = await self._get_user_nicknames([user_id for user_id, _ in sorted_users])
+            for i, ((user_id, data), nickname) in enumerate(zip(sorted_users, nicknames), 1):
                 favor = data.get("favor", 0)
                 level = self._get_favor_level(favor)
                 result += f"{i}. {nickname} - {favor}点 ({level})\n"
@@ -148,9 +154,8 @@ class RankPlugin(Plugin):
             )[:limit]
             
             result = "📅 签到排行榜 📅\n\n"
-            for i, (user_id, data) in enumerate(sorted_users, 1):
-                # 尝试获取用户昵称
-                nickname = await self._get_user_nickname(user_id)
+            nicknames = await self._get_user_nicknames([user_id for user_id, _ in sorted_users])
+            for i, ((user_id, data), nickname) in enumerate(zip(sorted_users, nicknames), 1):
                 total_days = data.get("total_days", 0)
                 streak_days = data.get("streak_days", 0)
                 result += f"{i}. {nickname} - 累计{total_days}天 (连续{streak_days}天)\n"
@@ -190,9 +195,8 @@ class RankPlugin(Plugin):
             sorted_users = sorted(user_scores, key=lambda x: x[1], reverse=True)[:limit]
             
             result = "🌟 综合排行榜 🌟\n\n"
-            for i, (user_id, score) in enumerate(sorted_users, 1):
-                # 尝试获取用户昵称
-                nickname = await self._get_user_nickname(user_id)
+            nicknames = await self._get_user_nicknames([user_id for user_id, _ in sorted_users])
+            for i, ((user_id, score), nickname) in enumerate(zip(sorted_users, nicknames), 1):
                 result += f"{i}. {nickname} - {score}分\n"
             
             return result.strip()
@@ -200,24 +204,17 @@ class RankPlugin(Plugin):
             logger.error(f"获取综合排行榜失败: {e}")
             return f"获取综合排行榜失败: {str(e)}喵~"
     
-    async def _get_user_nickname(self, user_id: str) -> str:
-        """获取用户昵称"""
+    async def _get_user_nicknames(self, user_ids: List[str]) -> List[str]:
+        """获取多个用户的昵称（群名片优先），顺序与 user_ids 一致
+        
+        名称来自群成员名单缓存，只有不在名单中的用户才会查询API
+        """
         try:
-            # 将user_id转换为整数
-            uid = int(user_id)
-            
-            # 尝试获取用户信息
-            user_info = await self.bot.api.get_stranger_info(user_id=uid)
-            
-            # 如果成功获取用户信息，返回昵称
-            if user_info and "data" in user_info and "nickname" in user_info["data"]:
-                return user_info["data"]["nickname"]
-            
-            # 如果没有获取到用户信息，返回QQ号
-            return f"用户{user_id}"
+            names = await self.bot.roster.display_names(user_ids)
         except Exception as e:
             logger.debug(f"获取用户昵称失败: {e}")
-            return f"用户{user_id}"
+            names = [None] * len(user_ids)
+        return [name or f"用户{user_id}" for user_id, name in zip(user_ids, names)]
     
     def _get_favor_level(self, favor: int) -> str:
         """获取好感度等级"""
@@ -1,4 +1,5 @@
 from src.plugins import Plugin
+from src.events import MessageEvent
 from loguru import logger
 from typing import Dict, Any, List, Optional
 import random
@@ -11,17 +12,22 @@ from datetime import datetime, timedelta
 class SignInPlugin(Plugin):
     """签到插件"""
     
+    # 只处理命令，不接收普通消息
+    subscriptions = []
+    
     def __init__(self, bot):
         super().__init__(bot)
         self.commands = {
             "sign_in": {
                 "function": self._do_sign_in,
                 "description": "每日签到",
+                "aliases": ["签到", "打卡"],
                 "admin_only": False
             },
             "points": {
                 "function": self._show_points,
                 "description": "查看积分",
+                "aliases": ["show_points", "我的积分", "积分", "查询积分"],
                 "admin_only": False
             },
             "rank": {
@@ -37,6 +43,7 @@ class SignInPlugin(Plugin):
             "喵": {
                 "function": self.catgirl_command,
                 "description": "与猫娘互动",
+                "aliases": ["猫娘", "neko"],
                 "admin_only": False
             }
         }
@@ -217,11 +224,13 @@ class SignInPlugin(Plugin):
             reverse=True
         )
         
-        # 生成排行榜消息
+        # 生成排行榜消息，名称来自群成员名单缓存
+        top_users = sorted_users[:10]
+        names = await self.bot.roster.display_names([uid for uid, _ in top_users], group_id)
         message = "❤️ 积分排行榜 ❤️\n"
-        for i, (uid, data) in enumerate(sorted_users[:10], 1):
+        for i, ((uid, data), name) in enumerate(zip(top_users, names), 1):
             points = data.get("points", 0)
-            message += f"{i}. 用户 {uid} - {points} 点\n"
+            message += f"{i}. {name or f'用户 {uid}'} - {points} 点\n"
         
         # 根据是否在群聊中决定发送方式
         if group_id:
@@ -277,11 +286,11 @@ class SignInPlugin(Plugin):
         except Exception as e:
             logger.error(f"保存用户 {user_id} 的签到数据失败: {e}")
     
-    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]]):
+    async def handle_private_message(self, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
         """处理私聊消息"""
         pass
         
-    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]]):
+    async def handle_group_message(self, group_id: int, user_id: int, message: List[Dict[str, Any]], event: Optional[MessageEvent] = None):
         """处理群消息"""
         pass
         
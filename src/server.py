@@ -0,0 +1,232 @@
+"""服务端模式：接受 OneBot 反向 WebSocket 和 HTTP POST 事件上报
+
+NapCat 主动连接机器人（反向WS）或把事件 POST 给机器人，因此多个 NapCat
+实例可以经本地负载均衡推送到一组机器人进程，每个进程同时服务多个连接。
+
+连接按 X-Self-ID 请求头（HTTP POST 时也可从事件的 self_id 中获取）路由到
+对应账号的消息处理器。只接受已有连接的账号和 bot.napcat / bot.connections 中
+配置了 self_id 的账号（首次连接时创建处理器）；其他账号只有开启 auto_create
+时才会创建，且总连接数不超过 max_connections。
+"""
+import hashlib
+import hmac
+import ipaddress
+import re
+import secrets
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import websockets
+from aiohttp import WSMsgType, web
+from loguru import logger
+
+if TYPE_CHECKING:
+    from .bot import BettQQBot
+    from .handlers import MessageHandler
+
+_SELF_ID = re.compile(rb'"self_id"\s*:\s*(\d+)')
+
+
+def is_loopback(host: str) -> bool:
+    """监听地址是否只接受本机连接（0.0.0.0、:: 和主机名都视为非本机）"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class AiohttpWebSocketAdapter:
+    """把 aiohttp 的 WebSocketResponse 包装成 MessageHandler 使用的 websockets 连接接口"""
+
+    def __init__(self, ws: web.WebSocketResponse):
+        self.ws = ws
+
+    async def send(self, data):
+        if isinstance(data, str):
+            await self.ws.send_str(data)
+        else:
+            await self.ws.send_bytes(data)
+
+    async def recv(self, decode: Optional[bool] = None):
+        msg = await self.ws.receive()
+        if msg.type in (WSMsgType.TEXT, WSMsgType.BINARY):
+            # 编解码器同时接受 str 和 bytes，这里不做额外转换
+            return msg.data
+        raise websockets.exceptions.ConnectionClosed(None, None)
+
+    async def close(self):
+        await self.ws.close()
+
+
+class OneBotServer:
+    """反向 WebSocket / HTTP POST 服务"""
+
+    def __init__(self, bot: 'BettQQBot', config: Dict[str, Any]):
+        self.bot = bot
+        self.host = config.get("host", "127.0.0.1")
+        self.port = int(config.get("port", 8080))
+        self.ws_path = config.get("ws_path", "/onebot/v11/ws")
+        self.http_path = config.get("http_path", "/onebot/v11/http")
+        # 校验 Authorization: Bearer <token> 或 access_token 查询参数
+        self.access_token = config.get("access_token", "")
+        # HTTP POST 上报的 X-Signature 签名密钥
+        self.secret = config.get("secret", "")
+        # 自动创建的账号调用API时使用的 NapCat HTTP 服务地址
+        self.http_api_url = config.get("http_api_url", "")
+        # 是否为未配置的账号自动创建连接，以及连接总数上限
+        self.auto_create = config.get("auto_create", False)
+        self.max_connections = int(config.get("max_connections", 10))
+        self.rejected_accounts = 0
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application(client_max_size=config.get("max_body_size", 16 * 1024 * 1024))
+        # 反向WebSocket只能用 access_token 校验；非本机地址上没有令牌时不提供该入口
+        self.ws_enabled = bool(self.access_token) or is_loopback(self.host)
+        if self.ws_enabled:
+            self.app.router.add_get(self.ws_path, self._handle_ws)
+        self.app.router.add_post(self.http_path, self._handle_http)
+
+    async def start(self):
+        if not is_loopback(self.host) and not (self.access_token or self.secret):
+            # 否则任何能访问该端口的人都可以伪造事件（包括冒充管理员执行 /debug 等命令）
+            raise RuntimeError(
+                f"服务端模式拒绝在非本机地址 {self.host} 上无校验地监听，请配置 access_token 或 secret，"
+                "或把 host 设为 127.0.0.1"
+            )
+        if not self.ws_enabled:
+            logger.warning(f"未配置 access_token，{self.host} 上不提供反向WebSocket入口，只接受签名的HTTP POST上报")
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # 端口为0时取实际监听的端口
+        if self._runner.addresses:
+            self.port = self._runner.addresses[0][1]
+        logger.success(
+            f"服务端模式已在 {self.host}:{self.port} 监听 "
+            f"(WS: {self.ws_path if self.ws_enabled else '未启用'}, HTTP: {self.http_path})"
+        )
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _authorized(self, request: web.Request) -> bool:
+        if not self.access_token:
+            return True
+        token = request.query.get("access_token", "")
+        authorization = request.headers.get("Authorization", "")
+        if authorization:
+            token = authorization[7:] if authorization.lower().startswith("bearer ") else authorization
+        return secrets.compare_digest(token, self.access_token)
+
+    def _configured_accounts(self) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """配置中写明了 self_id 的账号: QQ号 -> (连接名称, 连接配置)"""
+        napcat = self.bot.config["bot"]["napcat"]
+        accounts = {}
+        if napcat.get("self_id"):
+            accounts[str(napcat["self_id"])] = ("default", {**napcat})
+        for index, entry in enumerate(self.bot.config["bot"].get("connections") or []):
+            if entry.get("self_id"):
+                name = str(entry.get("name") or f"account{index + 1}")
+                accounts[str(entry["self_id"])] = (name, {**napcat, **entry})
+        return accounts
+
+    async def _get_handler(self, self_id: Optional[str]) -> Optional['MessageHandler']:
+        """按账号QQ号获取消息处理器，不允许的账号返回None"""
+        if not self_id:
+            # 无法识别账号时使用第一个连接
+            if self.bot.connections:
+                return self.bot.connections[0]
+            self_id = "default"
+        for connection in self.bot.connections:
+            if str(connection.self_id) == self_id or connection.name == self_id:
+                return connection
+
+        account = self._configured_accounts().get(self_id)
+        if account is not None:
+            name, config = account
+            config.setdefault("http_api_url", self.http_api_url)
+        elif self.auto_create and len(self.bot.connections) < self.max_connections:
+            name = self_id
+            config = {**self.bot.config["bot"]["napcat"], "http_api_url": self.http_api_url}
+            if self_id.isdigit():
+                config["self_id"] = int(self_id)
+        else:
+            self.rejected_accounts += 1
+            logger.warning(f"拒绝未配置的账号 {self_id}（未开启 auto_create 或连接数已达上限）")
+            return None
+        logger.info(f"账号 {self_id} 已连接，创建消息处理器")
+        return await self.bot.add_connection(name, config)
+
+    async def _handle_ws(self, request: web.Request) -> web.StreamResponse:
+        if not self._authorized(request):
+            logger.warning(f"拒绝未授权的反向WebSocket连接: {request.remote}")
+            return web.Response(status=401)
+        self_id = request.headers.get("X-Self-ID")
+        handler = await self._get_handler(self_id)
+        if handler is None:
+            return web.Response(status=403)
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        logger.info(f"反向WebSocket已连接: 账号 {self_id or handler.name}, 来自 {request.remote}")
+        await handler.serve(AiohttpWebSocketAdapter(ws))
+        logger.warning(f"反向WebSocket已断开: 账号 {self_id or handler.name}")
+        return ws
+
+    async def _handle_http(self, request: web.Request) -> web.StreamResponse:
+        if not self._authorized(request):
+            return web.Response(status=401)
+        body = await request.read()
+        if self.secret:
+            signature = "sha1=" + hmac.new(self.secret.encode(), body, hashlib.sha1).hexdigest()
+            if not secrets.compare_digest(request.headers.get("X-Signature", ""), signature):
+                logger.warning(f"HTTP上报签名校验失败: {request.remote}")
+                return web.Response(status=403)
+        self_id = request.headers.get("X-Self-ID")
+        if not self_id:
+            match = _SELF_ID.search(body)
+            self_id = match.group(1).decode() if match else None
+        handler = await self._get_handler(self_id)
+        if handler is None:
+            return web.Response(status=403)
+        if not handler.ingest(body):
+            return web.Response(status=400)
+        # 不使用快速操作，回复由插件通过API发送
+        return web.Response(status=204)
+
+
+class MetricsServer:
+    """Prometheus 指标端点（GET /metrics）"""
+
+    def __init__(self, bot: 'BettQQBot', config: Dict[str, Any]):
+        self.bot = bot
+        self.host = config.get("host", "127.0.0.1")
+        self.port = int(config.get("port", 9100))
+        self.path = config.get("path", "/metrics")
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.router.add_get(self.path, self._handle_metrics)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self._runner.addresses:
+            self.port = self._runner.addresses[0][1]
+        logger.success(f"指标端点已在 http://{self.host}:{self.port}{self.path} 提供")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_metrics(self, request: web.Request) -> web.StreamResponse:
+        return web.Response(
+            body=self.bot.render_metrics().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# 只读API的默认缓存秒数
+DEFAULT_TTLS = {
+    "get_stranger_info": 600.0,
+    "get_group_info": 300.0,
+    "get_group_member_info": 300.0,
+}
+
+
+class ApiCache:
+    """只读API的结果缓存
+
+    - 按API设置TTL，过期后重新请求
+    - 条目数超过上限时淘汰最久未使用的条目(LRU)
+    - 相同请求正在进行时，后来的调用等待同一个结果，不重复请求(single-flight)
+    - 请求失败(结果为None)不缓存
+
+    缓存的结果会被多个调用方共享，调用方不应修改返回的字典。
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.enabled = config.get("enabled", True)
+        self.max_entries = int(config.get("max_entries", 5000))
+        self.ttls = {action: float(ttl) for action, ttl in {**DEFAULT_TTLS, **config.get("ttl", {})}.items()}
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+        self.hits = Counter()
+        self.misses = Counter()
+        self.coalesced = Counter()
+        self.evictions = 0
+
+    def cacheable(self, action: str) -> bool:
+        return self.enabled and self.ttls.get(action, 0) > 0
+
+    @staticmethod
+    def _key(action: str, params: Dict[str, Any]) -> Hashable:
+        return (action, tuple(sorted(params.items())))
+
+    async def get(self, action: str, params: Dict[str, Any], fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """返回缓存的结果，没有时调用 fetch 获取并缓存"""
+        key = self._key(action, params)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits[action] += 1
+                return entry[1]
+            del self._entries[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced[action] += 1
+            # shield: 某个等待方被取消不影响其他等待方
+            return await asyncio.shield(inflight)
+
+        self.misses[action] += 1
+        future = asyncio.get_event_loop().create_future()
+        self._inflight[key] = future
+        value = None
+        try:
+            value = await fetch()
+            if value is not None:
+                self._store(key, action, value)
+        finally:
+            self._inflight.pop(key, None)
+            # 发起方被取消或出错时，等待方得到None（与请求失败一致）
+            future.set_result(value)
+        return value
+
+    def put(self, action: str, params: Dict[str, Any], value: Any):
+        """写入一个结果（如通过 no_cache 强制刷新得到的结果）"""
+        if value is not None and self.cacheable(action):
+            self._store(self._key(action, params), action, value)
+
+    def _store(self, key: Hashable, action: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttls[action], value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, action: str, params: Optional[Dict[str, Any]] = None):
+        """删除缓存，不指定params时删除该API的所有条目"""
+        if params is not None:
+            self._entries.pop(self._key(action, params), None)
+            return
+        for key in [key for key in self._entries if key[0] == action]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        actions = {}
+        for action in sorted(set(self.hits) | set(self.misses)):
+            lookups = self.hits[action] + self.misses[action] + self.coalesced[action]
+            actions[action] = {
+                "hits": self.hits[action],
+                "misses": self.misses[action],
+                "coalesced": self.coalesced[action],
+                "hit_rate": f"{(self.hits[action] + self.coalesced[action]) / lookups:.1%}" if lookups else "-",
+            }
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "evictions": self.evictions,
+            "actions": actions,
+        }
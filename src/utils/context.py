@@ -0,0 +1,10 @@
+from contextvars import ContextVar
+
+# 当前正在处理的事件所属的连接(MessageHandler)，多账号时据此选择回复用的API
+current_connection: ContextVar = ContextVar("current_connection", default=None)
+
+# 当前正在处理的事件
+current_event: ContextVar = ContextVar("current_event", default=None)
+
+# 当前发送的优先级(high/normal/low)，为None时由发送调度器根据当前事件决定
+send_priority: ContextVar = ContextVar("send_priority", default=None)
@@ -0,0 +1,78 @@
+import re
+from typing import Any, Dict, List
+
+from .message_builder import parse_cq, text_length
+
+# CQ码整体作为一个片段，不在中间切开
+_CQ_CODE = re.compile(r"(\[CQ:[^\]]*\])")
+# CQ码转义序列，硬切时不切开
+_ESCAPE = re.compile(r"&(?:amp|#91|#93|#44);")
+_ESCAPE_MAX = 5
+# 在句末标点（连续的标点和后面的右引号/括号算作同一句）和换行之后断句
+_SENTENCE_BREAK = re.compile(r"(?<=[。！？!?…；;\n])(?![。！？!?…；;」』”’\"')）\n])")
+
+
+def needs_forward(message: Any, max_length: int, max_lines: int) -> bool:
+    """消息中的可见文本过长或行数过多时返回True
+
+    字符串和消息段数组按同样的方式计算：只计文本段，CQ码和转义序列不计入长度。
+    """
+    if isinstance(message, str):
+        # 去掉CQ码并还原转义后不会变长，原始长度未超限时不必解析
+        if len(message) <= max_length and message.count("\n") + 1 <= max_lines:
+            return False
+        message = parse_cq(message)
+    if not isinstance(message, list):
+        return False
+    lines = sum(seg["data"].get("text", "").count("\n") for seg in message if seg.get("type") == "text")
+    return text_length(message) > max_length or lines + 1 > max_lines
+
+
+def _cut_index(text: str, size: int) -> int:
+    """硬切的位置：不落在转义序列中间，开头的转义序列比 size 长时整体保留"""
+    start = text.rfind("&", max(0, size - _ESCAPE_MAX + 1), size)
+    if start >= 0:
+        match = _ESCAPE.match(text, start)
+        if match and match.end() > size:
+            return start or match.end()
+    return size
+
+
+def split_text(text: str, chunk_size: int) -> List[str]:
+    """按句子把长文本分成不超过 chunk_size 个字符的若干段
+
+    尽量在句末和换行处分段；单句超长时按长度硬切；CQ码和转义序列不会被切开。
+    """
+    pieces: List[str] = []
+    for part in _CQ_CODE.split(text):
+        if not part:
+            continue
+        if _CQ_CODE.fullmatch(part):
+            pieces.append(part)
+            continue
+        for sentence in _SENTENCE_BREAK.split(part):
+            while len(sentence) > chunk_size:
+                cut = _cut_index(sentence, chunk_size)
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:]
+            if sentence:
+                pieces.append(sentence)
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) > chunk_size:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current:
+        chunks.append(current)
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+def build_nodes(chunks: List[str], name: str, uin: Any) -> List[Dict[str, Any]]:
+    """把若干段文本组装为合并转发的节点列表"""
+    return [
+        {"type": "node", "data": {"nickname": name, "user_id": str(uin or 0), "content": chunk}}
+        for chunk in chunks
+    ]
@@ -0,0 +1,43 @@
+from typing import Union
+
+# 帧类型
+FRAME_HEARTBEAT = "heartbeat"
+FRAME_LIFECYCLE = "lifecycle"
+FRAME_ECHO = "echo"
+FRAME_EVENT = "event"
+
+# 元事件帧很短，只在该长度内识别
+_META_FRAME_LIMIT = 512
+
+# 紧凑和带空格两种JSON分隔符下的键值对
+_META_EVENT = (b'"post_type":"meta_event"', b'"post_type": "meta_event"')
+_HEARTBEAT = (b'"meta_event_type":"heartbeat"', b'"meta_event_type": "heartbeat"')
+_LIFECYCLE = (b'"meta_event_type":"lifecycle"', b'"meta_event_type": "lifecycle"')
+
+
+def _contains(frame: bytes, markers) -> bool:
+    return any(marker in frame for marker in markers)
+
+
+def classify_frame(frame: Union[bytes, str]) -> str:
+    """不解析JSON，仅通过子串扫描判断帧类型
+
+    匹配完整的键值对（如 "post_type":"meta_event"）而不是单独的值：
+    字符串内的引号会被转义为 \\"，因此未转义的 "键":"值" 只会出现在JSON结构中，
+    消息内容恰好是 heartbeat 之类的字符串值不会被误判。
+    兼容紧凑和带空格两种JSON分隔符。
+
+    Returns:
+        FRAME_HEARTBEAT / FRAME_LIFECYCLE / FRAME_ECHO / FRAME_EVENT，
+        无法确定时返回 FRAME_EVENT，由调用方完整解析
+    """
+    if isinstance(frame, str):
+        frame = frame.encode("utf-8")
+    if len(frame) <= _META_FRAME_LIMIT and _contains(frame, _META_EVENT):
+        if _contains(frame, _HEARTBEAT):
+            return FRAME_HEARTBEAT
+        if _contains(frame, _LIFECYCLE):
+            return FRAME_LIFECYCLE
+    if b'"echo":' in frame or b'"echo" :' in frame:
+        return FRAME_ECHO
+    return FRAME_EVENT
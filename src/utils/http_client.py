@@ -0,0 +1,86 @@
+import aiohttp
+from collections import Counter
+from contextlib import asynccontextmanager
+from loguru import logger
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+class HttpClient:
+    """机器人共用的HTTP连接池
+
+    所有出站HTTP请求（NapCat HTTP API、天气、音乐、图片等）共用一个
+    ClientSession：保持长连接复用TCP/TLS握手，缓存DNS解析结果，
+    并限制总连接数和单个主机的连接数。
+    配置了 allowed_hosts 时只允许访问其中的主机，其他请求直接失败。
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.limit = int(config.get("limit", 100))
+        self.limit_per_host = int(config.get("limit_per_host", 10))
+        self.dns_cache_ttl = int(config.get("dns_cache_ttl", 300))
+        self.keepalive_timeout = float(config.get("keepalive_timeout", 30))
+        self.allowed_hosts = set(config.get("allowed_hosts") or [])
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.counters = Counter()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """共用的会话，首次使用时创建（需在事件循环中调用）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, trace_configs=[self._trace_config()])
+        return self._session
+
+    @asynccontextmanager
+    async def borrow(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """以 async with 的方式使用共用会话，退出时不关闭会话
+
+        用于替换 `async with aiohttp.ClientSession() as session:`
+        """
+        yield self.session
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """统计请求数、新建/复用的连接数和DNS缓存命中数"""
+        counters = self.counters
+
+        def count(name: str):
+            async def handler(session, context, params):
+                counters[name] += 1
+            return handler
+
+        async def check_host(session, context, params):
+            if params.url.host not in self.allowed_hosts:
+                counters["blocked"] += 1
+                raise aiohttp.ClientConnectionError(f"不允许访问的主机: {params.url.host}")
+
+        trace_config = aiohttp.TraceConfig()
+        if self.allowed_hosts:
+            trace_config.on_request_start.append(check_host)
+        trace_config.on_request_start.append(count("requests"))
+        trace_config.on_request_exception.append(count("errors"))
+        trace_config.on_connection_create_end.append(count("connections_created"))
+        trace_config.on_connection_reuseconn.append(count("connections_reused"))
+        trace_config.on_dns_cache_hit.append(count("dns_cache_hits"))
+        trace_config.on_dns_cache_miss.append(count("dns_cache_misses"))
+        return trace_config
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.debug("HTTP连接池已关闭")
+        self._session = None
+
+    def stats(self) -> Dict[str, Any]:
+        created = self.counters["connections_created"]
+        reused = self.counters["connections_reused"]
+        return {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            **dict(self.counters),
+            "reuse_rate": f"{reused / (created + reused):.1%}" if created + reused else "-",
+        }
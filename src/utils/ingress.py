@@ -0,0 +1,177 @@
+import asyncio
+from collections import Counter, deque
+from loguru import logger
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+# 按优先级从高到低排列
+LANES = ("admin", "private", "group")
+
+DEFAULT_LANES = {
+    "admin": {"depth": 200, "policy": "drop_lane_oldest"},
+    "private": {"depth": 500, "policy": "drop_conversation_oldest"},
+    "group": {"depth": 2000, "policy": "drop_conversation_oldest"},
+}
+
+# 通道已满时的丢弃策略：
+# reject_new: 拒绝新事件；
+# drop_lane_oldest: 丢弃本通道中最旧的事件（不论属于哪个会话）；
+# drop_conversation_oldest: 丢弃新事件所属会话中最旧的事件（该会话没有排队事件时丢弃积压最多的会话的最旧事件）
+# 不支持合并事件：排队的消息可能是各自独立的命令，合并会丢失其中的命令
+POLICIES = ("reject_new", "drop_lane_oldest", "drop_conversation_oldest")
+
+
+class IngressScheduler:
+    """入站事件调度器
+
+    事件按来源分到 admin / private / group 三个有界通道，
+    取出时总是先取高优先级通道。通道或单个会话超出容量时按配置的策略丢弃，
+    避免单个群刷屏导致内存无限增长并饿死私聊和管理员消息。
+    """
+
+    def __init__(self, config: Dict[str, Any], admin_ids: Iterable[int]):
+        lanes_config = config.get("lanes", {})
+        self.depths: Dict[str, int] = {}
+        self.policies: Dict[str, str] = {}
+        for lane in LANES:
+            lane_config = {**DEFAULT_LANES[lane], **lanes_config.get(lane, {})}
+            self.depths[lane] = max(1, int(lane_config["depth"]))
+            policy = lane_config["policy"]
+            if policy not in POLICIES:
+                default = DEFAULT_LANES[lane]["policy"]
+                logger.warning(
+                    f"入站通道 {lane} 的丢弃策略 {policy} 无效（可选: {', '.join(POLICIES)}），使用 {default}"
+                )
+                policy = default
+            self.policies[lane] = policy
+        # 单个会话（群或私聊用户）在通道内最多排队的事件数
+        self.per_conversation_depth = max(1, int(config.get("per_group_depth", 100)))
+        self.admin_ids = set(admin_ids)
+
+        self._queues: Dict[str, Deque[Tuple[Any, Any]]] = {lane: deque() for lane in LANES}
+        self._conversation_counts: Dict[str, Counter] = {lane: Counter() for lane in LANES}
+        self._ready = asyncio.Event()
+
+        self.enqueued = Counter()
+        self.dropped = Counter()
+        self.dropped_by_group = Counter()
+
+    def classify(self, event) -> str:
+        """判断事件所属通道"""
+        user_id = getattr(event, "user_id", None)
+        if user_id in self.admin_ids:
+            return "admin"
+        if getattr(event, "group_id", None):
+            return "group"
+        return "private"
+
+    @staticmethod
+    def _conversation_key(event) -> Any:
+        group_id = getattr(event, "group_id", None)
+        if group_id:
+            return ("g", group_id)
+        return ("u", getattr(event, "user_id", None))
+
+    def put(self, event) -> bool:
+        """放入事件，被丢弃时返回False"""
+        lane = self.classify(event)
+        key = self._conversation_key(event)
+        queue = self._queues[lane]
+        counts = self._conversation_counts[lane]
+        policy = self.policies[lane]
+
+        if counts[key] >= self.per_conversation_depth:
+            # 单个会话积压过多，只在该会话内丢弃
+            if policy == "reject_new":
+                self._record_drop(lane, key)
+                return False
+            self._evict(lane, key)
+        elif len(queue) >= self.depths[lane]:
+            if policy == "reject_new":
+                self._record_drop(lane, key)
+                return False
+            if policy == "drop_lane_oldest":
+                self._evict(lane, None)
+            else:
+                victim = key if counts[key] else counts.most_common(1)[0][0]
+                self._evict(lane, victim)
+
+        queue.append((key, event))
+        counts[key] += 1
+        self.enqueued[lane] += 1
+        self._ready.set()
+        return True
+
+    def _evict(self, lane: str, key: Optional[Any]):
+        """丢弃通道中最旧的事件，指定key时只丢弃该会话的事件"""
+        queue = self._queues[lane]
+        if key is None:
+            victim = queue.popleft()
+        else:
+            victim = next(item for item in queue if item[0] == key)
+            queue.remove(victim)
+        victim_key = victim[0]
+        counts = self._conversation_counts[lane]
+        counts[victim_key] -= 1
+        if counts[victim_key] <= 0:
+            del counts[victim_key]
+        self._record_drop(lane, victim_key)
+
+    def _record_drop(self, lane: str, key: Any):
+        self.dropped[lane] += 1
+        if key[0] == "g":
+            self.dropped_by_group[key[1]] += 1
+        total = sum(self.dropped.values())
+        # 避免刷屏时日志本身成为瓶颈
+        if total == 1 or total % 100 == 0:
+            logger.warning(f"入站通道 {lane} 已满，累计丢弃 {total} 个事件")
+
+    def _pop(self, is_blocked: Optional[Callable[[Any], bool]] = None):
+        for lane in LANES:
+            queue = self._queues[lane]
+            if not queue:
+                continue
+            if is_blocked is None or not is_blocked(queue[0][0]):
+                key, event = queue.popleft()
+            else:
+                # 跳过被阻塞会话的事件，同一会话内的顺序不变
+                index = next((i for i, item in enumerate(queue) if not is_blocked(item[0])), None)
+                if index is None:
+                    continue
+                key, event = queue[index]
+                del queue[index]
+            counts = self._conversation_counts[lane]
+            counts[key] -= 1
+            if counts[key] <= 0:
+                del counts[key]
+            return event
+        return None
+
+    async def get(self, is_blocked: Optional[Callable[[Any], bool]] = None):
+        """按优先级取出下一个事件，没有事件时等待
+
+        is_blocked(key) 为True的会话暂不取出，其事件留在通道中（仍受通道和会话的容量
+        及丢弃策略约束），会话解除阻塞时需调用 wake。
+        """
+        while True:
+            event = self._pop(is_blocked)
+            if event is not None:
+                return event
+            self._ready.clear()
+            await self._ready.wait()
+
+    def wake(self):
+        """唤醒等待中的 get，重新检查被阻塞的会话"""
+        self._ready.set()
+
+    def qsize(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """队列深度和丢弃计数"""
+        return {
+            "depth": {lane: len(self._queues[lane]) for lane in LANES},
+            "capacity": dict(self.depths),
+            "enqueued": {lane: self.enqueued[lane] for lane in LANES},
+            "dropped": {lane: self.dropped[lane] for lane in LANES},
+            "top_dropped_groups": dict(self.dropped_by_group.most_common(5)),
+        }
@@ -0,0 +1,113 @@
+import json
+from loguru import logger
+from typing import Any, Callable, Dict, Union
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # 可选依赖
+    msgspec = None
+
+
+class JsonCodec:
+    """JSON编解码器
+
+    loads 直接接受 bytes 或 str，解析失败统一抛出 ValueError；
+    dumps 返回 str，便于作为 WebSocket 文本帧发送。
+    """
+
+    def __init__(self, name: str, loads: Callable[[Union[bytes, str]], Any], dumps: Callable[[Any], str]):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self) -> str:
+        return f"JsonCodec({self.name})"
+
+
+def _stdlib_loads(data: Union[bytes, str]) -> Any:
+    # json.loads 对 bytes 会先探测编码，直接按 UTF-8 解码更快
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    return json.loads(data)
+
+
+def _create_json_codec() -> JsonCodec:
+    return JsonCodec("json", _stdlib_loads, json.dumps)
+
+
+def _create_orjson_codec() -> JsonCodec:
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+    return JsonCodec("orjson", orjson.loads, dumps)
+
+
+def _create_msgspec_codec() -> JsonCodec:
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder()
+
+    def loads(data: Union[bytes, str]) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    def dumps(obj: Any) -> str:
+        return encoder.encode(obj).decode("utf-8")
+    return JsonCodec("msgspec", loads, dumps)
+
+
+_FACTORIES = {
+    "orjson": (lambda: orjson is not None, _create_orjson_codec),
+    "msgspec": (lambda: msgspec is not None, _create_msgspec_codec),
+    "json": (lambda: True, _create_json_codec),
+}
+
+# auto 模式下的优先顺序
+_AUTO_ORDER = ("orjson", "msgspec", "json")
+
+_codecs: Dict[str, JsonCodec] = {}
+
+
+def available_codecs() -> list:
+    """返回当前环境可用的编解码器名称"""
+    return [name for name in _AUTO_ORDER if _FACTORIES[name][0]()]
+
+
+def get_codec(preferred: str = "auto") -> JsonCodec:
+    """获取JSON编解码器
+
+    Args:
+        preferred: auto / orjson / msgspec / json，指定的库未安装时回退到 auto
+
+    Returns:
+        编解码器实例（同名实例会被复用）
+    """
+    preferred = (preferred or "auto").lower()
+    if preferred in _codecs:
+        return _codecs[preferred]
+
+    if preferred != "auto" and preferred not in _FACTORIES:
+        logger.warning(f"未知的JSON编解码器 {preferred}，将自动选择")
+        candidates = _AUTO_ORDER
+    elif preferred != "auto" and not _FACTORIES[preferred][0]():
+        logger.warning(f"JSON编解码器 {preferred} 未安装，将自动选择")
+        candidates = _AUTO_ORDER
+    elif preferred == "auto":
+        candidates = _AUTO_ORDER
+    else:
+        candidates = (preferred,)
+
+    for name in candidates:
+        is_available, factory = _FACTORIES[name]
+        if is_available():
+            codec = factory()
+            _codecs[preferred] = codec
+            logger.debug(f"使用JSON编解码器: {codec.name}")
+            return codec
+    # 标准库总是可用，不会执行到这里
+    return _create_json_codec()
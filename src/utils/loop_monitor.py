@@ -0,0 +1,113 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from loguru import logger
+from typing import Any, Dict, List, Optional
+
+from .metrics import RollingHistogram
+
+# 插件模块所在目录，用于把阻塞位置归属到具体插件
+_PLUGIN_DIR = os.path.join("src", "plugins") + os.sep
+
+
+class LoopMonitor:
+    """事件循环延迟监控
+
+    事件循环中的定时任务每隔 interval 秒记录一次调度延迟；另起一个看门狗线程，
+    发现定时任务超过 threshold 秒没有运行时，抓取事件循环线程当前的调用栈，
+    记录是哪个插件的哪个函数阻塞了事件循环。
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.enabled = config.get("enabled", True)
+        self.interval = float(config.get("interval", 0.1))
+        self.threshold = float(config.get("threshold", 0.3))
+        # 日志中打印的调用栈层数
+        self.stack_depth = int(config.get("stack_depth", 8))
+        self.lag = RollingHistogram(config.get("window", 1000))
+        self.stalls = 0
+        self.recent_stalls = deque(maxlen=int(config.get("recent_stalls", 10)))
+
+        self._last_tick = time.monotonic()
+        # 当前这次阻塞是否已经抓取过调用栈
+        self._reported = False
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_stop = threading.Event()
+
+    def start(self):
+        """在事件循环线程中调用"""
+        if not self.enabled or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._task = asyncio.create_task(self._tick())
+        self._thread_stop.clear()
+        self._thread = threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"事件循环监控已启动，阻塞阈值 {self.threshold * 1000:.0f}ms")
+
+    async def stop(self):
+        self._thread_stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _tick(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.lag.observe(lag)
+            self._last_tick = now
+            if self._reported:
+                self._reported = False
+                logger.warning(f"事件循环阻塞已恢复，共延迟 {lag * 1000:.0f}ms")
+
+    def _watchdog(self):
+        while not self._thread_stop.wait(self.threshold / 2):
+            lag = time.monotonic() - self._last_tick - self.interval
+            if lag < self.threshold or self._reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._reported = True
+            self._report_stall(lag, traceback.extract_stack(frame))
+
+    def _report_stall(self, lag: float, stack: List[traceback.FrameSummary]):
+        """记录阻塞位置：最内层的调用，以及所属插件中最内层的函数"""
+        self.stalls += 1
+        innermost = stack[-1]
+        plugin = None
+        plugin_frame = None
+        for frame in reversed(stack):
+            path = frame.filename.replace("/", os.sep)
+            if _PLUGIN_DIR in path and not path.endswith("__init__.py"):
+                plugin = os.path.splitext(os.path.basename(path))[0]
+                plugin_frame = frame
+                break
+        location = f"{innermost.name} ({os.path.basename(innermost.filename)}:{innermost.lineno})"
+        source = f"插件 {plugin} 的 {plugin_frame.name} (第{plugin_frame.lineno}行)" if plugin else "非插件代码"
+        self.recent_stalls.append(f"{time.strftime('%H:%M:%S')} {lag * 1000:.0f}ms {source} @ {location}")
+        stack_text = "".join(traceback.format_list(stack[-self.stack_depth:]))
+        logger.warning(
+            f"事件循环已阻塞 {lag * 1000:.0f}ms，来自{source}，阻塞位置: {location}\n{stack_text}"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lag_ms": self.lag.summary(scale=1000),
+            "stalls": self.stalls,
+            "recent_stalls": list(self.recent_stalls),
+        }
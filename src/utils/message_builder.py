@@ -0,0 +1,161 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+Segment = Dict[str, Any]
+Message = Union[str, List[Segment]]
+
+_CQ_PREFIX = "[CQ:"
+
+
+class MessageBuilder:
+    """OneBot 消息段数组构建器
+
+    直接发送消息段数组，NapCat 不需要再解析CQ码，文本中的 [ ] , & 等字符
+    也无需转义或替换。
+
+    用法: MessageBuilder().text("你好").at(user_id).build()
+    """
+
+    __slots__ = ("segments",)
+
+    def __init__(self):
+        self.segments: List[Segment] = []
+
+    def text(self, text: str) -> "MessageBuilder":
+        if text:
+            # 相邻的文本段合并为一段
+            if self.segments and self.segments[-1]["type"] == "text":
+                self.segments[-1]["data"]["text"] += text
+            else:
+                self.segments.append({"type": "text", "data": {"text": text}})
+        return self
+
+    def at(self, user_id: Union[int, str]) -> "MessageBuilder":
+        self.segments.append({"type": "at", "data": {"qq": str(user_id)}})
+        return self
+
+    def reply(self, message_id: Union[int, str]) -> "MessageBuilder":
+        self.segments.append({"type": "reply", "data": {"id": str(message_id)}})
+        return self
+
+    def face(self, face_id: Union[int, str]) -> "MessageBuilder":
+        self.segments.append({"type": "face", "data": {"id": str(face_id)}})
+        return self
+
+    def image(self, file: str) -> "MessageBuilder":
+        """图片，file 可以是 URL、file:/// 路径或 base64://"""
+        self.segments.append({"type": "image", "data": {"file": file}})
+        return self
+
+    def image_file(self, path: str) -> "MessageBuilder":
+        """本地图片文件"""
+        return self.image(f"file:///{os.path.abspath(path)}")
+
+    def segment(self, seg_type: str, **data: Any) -> "MessageBuilder":
+        """其他类型的消息段"""
+        self.segments.append({"type": seg_type, "data": {key: str(value) for key, value in data.items()}})
+        return self
+
+    def build(self) -> List[Segment]:
+        return self.segments
+
+    def to_cq(self) -> str:
+        return to_cq(self.segments)
+
+
+def escape(text: str, in_param: bool = False) -> str:
+    """CQ码转义：文本中转义 & [ ]，参数值中另外转义逗号"""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "[" in text:
+        text = text.replace("[", "&#91;")
+    if "]" in text:
+        text = text.replace("]", "&#93;")
+    if in_param and "," in text:
+        text = text.replace(",", "&#44;")
+    return text
+
+
+def unescape(text: str) -> str:
+    if "&" not in text:
+        return text
+    # &amp; 最后还原，避免 &amp;#91; 被还原成 [
+    return text.replace("&#44;", ",").replace("&#91;", "[").replace("&#93;", "]").replace("&amp;", "&")
+
+
+def parse_cq(raw: str) -> List[Segment]:
+    """把CQ码字符串解析为消息段数组
+
+    单次从左到右扫描：转义后的文本和参数中不会出现 [ ] ,，
+    因此只需查找 "[CQ:" 和随后的 "]"，不需要正则回溯。
+    不完整的CQ码按普通文本处理。
+    """
+    segments: List[Segment] = []
+    pos = 0
+    length = len(raw)
+    while pos < length:
+        start = raw.find(_CQ_PREFIX, pos)
+        if start < 0:
+            start = length
+        end = raw.find("]", start) if start < length else -1
+        if start < length and end < 0:
+            # 没有结束的 ]，剩余部分都是文本
+            start = length
+        if start > pos:
+            segments.append({"type": "text", "data": {"text": unescape(raw[pos:start])}})
+        if start >= length:
+            break
+
+        body = raw[start + len(_CQ_PREFIX):end]
+        seg_type, _, params = body.partition(",")
+        data: Dict[str, str] = {}
+        if params:
+            for item in params.split(","):
+                key, _, value = item.partition("=")
+                data[key] = unescape(value)
+        segments.append({"type": seg_type, "data": data})
+        pos = end + 1
+    return segments
+
+
+def to_cq(message: Message) -> str:
+    """把消息段数组序列化为CQ码字符串，字符串原样返回"""
+    if isinstance(message, str):
+        return message
+    parts = []
+    for seg in message:
+        seg_type = seg.get("type")
+        data = seg.get("data") or {}
+        if seg_type == "text":
+            parts.append(escape(str(data.get("text", ""))))
+        elif data:
+            params = ",".join(f"{key}={escape(str(value), in_param=True)}" for key, value in data.items())
+            parts.append(f"[CQ:{seg_type},{params}]")
+        else:
+            parts.append(f"[CQ:{seg_type}]")
+    return "".join(parts)
+
+
+def plain_text(message: Message) -> str:
+    """消息中的纯文本部分"""
+    segments = parse_cq(message) if isinstance(message, str) else message
+    return "".join(seg["data"].get("text", "") for seg in segments if seg.get("type") == "text")
+
+
+def find_segments(message: Message, seg_type: str) -> List[Segment]:
+    """消息中指定类型的所有消息段"""
+    segments = parse_cq(message) if isinstance(message, str) else message
+    return [seg for seg in segments if seg.get("type") == seg_type]
+
+
+def first_image_url(message: Message) -> Optional[str]:
+    """消息中第一张图片的地址（优先 url，其次 file）"""
+    for seg in find_segments(message, "image"):
+        url = seg["data"].get("url") or seg["data"].get("file")
+        if url:
+            return url
+    return None
+
+
+def text_length(segments: Iterable[Segment]) -> int:
+    return sum(len(seg["data"].get("text", "")) for seg in segments if seg.get("type") == "text")
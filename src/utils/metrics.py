@@ -0,0 +1,164 @@
+import bisect
+import math
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+class RollingHistogram:
+    """滚动窗口直方图
+
+    只保留最近 window 个样本用于计算分位数，同时累计总次数，
+    用于延迟等指标的统计。
+    """
+
+    def __init__(self, window: int = 1000):
+        self.samples = deque(maxlen=max(1, int(window)))
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, p: float) -> Optional[float]:
+        """窗口内第 p 百分位的值（最近秩法），没有样本时返回None"""
+        if not self.samples:
+            return None
+        return percentile(sorted(self.samples), p)
+
+    def summary(self, scale: float = 1.0, digits: int = 1) -> Dict[str, Any]:
+        """窗口内的统计摘要，scale 用于单位换算（如秒转毫秒传1000）"""
+        if not self.samples:
+            return {"count": self.count}
+        ordered = sorted(self.samples)
+
+        def fmt(value: float) -> float:
+            return round(value * scale, digits)
+
+        return {
+            "count": self.count,
+            "last": fmt(self.samples[-1]),
+            "min": fmt(ordered[0]),
+            "avg": fmt(sum(ordered) / len(ordered)),
+            "p50": fmt(percentile(ordered, 50)),
+            "p95": fmt(percentile(ordered, 95)),
+            "p99": fmt(percentile(ordered, 99)),
+            "max": fmt(ordered[-1]),
+        }
+
+
+def percentile(ordered: Sequence[float], p: float) -> float:
+    """已排序序列的第 p 百分位（最近秩法）"""
+    if not ordered:
+        raise ValueError("空序列没有分位数")
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+# 延迟分桶上限（秒），与 Prometheus 客户端的默认分桶相近，覆盖到API超时的量级
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class BucketHistogram:
+    """累计分桶直方图
+
+    与 Prometheus 的 histogram 语义一致：自启动以来的每个样本都计入
+    不超过其上限的分桶，用于导出可跨实例聚合的延迟分布。
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # 最后一项为超过所有上限的样本(+Inf)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """[(上限, 不超过该上限的样本数), ...]，最后一项为 +Inf"""
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            result.append((_format_value(bound), running))
+        result.append(("+Inf", self.count))
+        return result
+
+
+class PrometheusWriter:
+    """生成 Prometheus 文本格式的指标，同名指标的样本归在一起输出"""
+
+    def __init__(self, namespace: str = "bettqqbot"):
+        self.namespace = namespace
+        # 指标名 -> (类型, 说明, 样本行)
+        self._metrics: Dict[str, Tuple[str, str, List[str]]] = {}
+
+    def _family(self, name: str, kind: str, help_text: str) -> List[str]:
+        name = f"{self.namespace}_{name}"
+        if name not in self._metrics:
+            self._metrics[name] = (kind, help_text, [])
+        return self._metrics[name][2]
+
+    def sample(self, name: str, kind: str, help_text: str, value: float,
+               labels: Optional[Dict[str, Any]] = None):
+        """添加一个 counter 或 gauge 样本"""
+        self._family(name, kind, help_text).append(
+            f"{self.namespace}_{name}{_format_labels(labels)} {_format_value(value)}"
+        )
+
+    def histogram(self, name: str, help_text: str, histogram: BucketHistogram,
+                  labels: Optional[Dict[str, Any]] = None):
+        lines = self._family(name, "histogram", help_text)
+        labels = labels or {}
+        full_name = f"{self.namespace}_{name}"
+        for bound, count in histogram.cumulative():
+            lines.append(f"{full_name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+        lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(histogram.total)}")
+        lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+
+    def stats(self, provider: str, data: Any):
+        """把运行统计字典中的数值展开为 gauge，键路径以点号连接"""
+        for key, value in _flatten_numbers(data):
+            self.sample("stat", "gauge", "运行统计（/debug stats）中的数值", value,
+                        {"provider": provider, "key": key})
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help_text, samples) in self._metrics.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def _flatten_numbers(data: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from _flatten_numbers(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(data, bool):
+        yield prefix, int(data)
+    elif isinstance(data, (int, float)):
+        yield prefix, data
+
+
+def _format_labels(labels: Optional[Dict[str, Any]]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
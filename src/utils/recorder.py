@@ -0,0 +1,98 @@
+import gzip
+import json
+import queue
+import threading
+import time
+from loguru import logger
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+
+class FrameRecorder:
+    """事件流录制器
+
+    把收到的原始帧连同时间戳和账号名追加写入 gzip 压缩的 JSONL 文件，
+    每行格式为 {"ts": 时间戳, "account": 账号名, "frame": 原始帧文本}。
+    写入在后台线程中进行，队列满时丢弃新帧，不阻塞事件循环。
+    录制文件可用 tools/replay.py 回放。
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.enabled = config.get("enabled", False)
+        # 路径支持 strftime 格式，每次启动生成新文件
+        self.path = Path(time.strftime(config.get("path", "data/recordings/frames-%Y%m%d-%H%M%S.jsonl.gz")))
+        # 是否同时录制API响应帧，回放时用不到，默认不录制
+        self.include_responses = config.get("include_responses", False)
+        self.flush_interval = float(config.get("flush_interval", 1.0))
+        self._queue: queue.Queue = queue.Queue(maxsize=int(config.get("max_queue", 10000)))
+        self._thread: Optional[threading.Thread] = None
+        self.recorded = 0
+        self.dropped = 0
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._writer, name="frame-recorder", daemon=True)
+        self._thread.start()
+        logger.info(f"事件录制已开启: {self.path}")
+
+    def record(self, account: str, frame: Union[bytes, str]):
+        """记录一帧（在事件循环中调用，只做入队）"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put_nowait((time.time(), account, frame))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """写完队列中剩余的帧后停止"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._thread = None
+        logger.info(f"事件录制已停止，共录制 {self.recorded} 帧，丢弃 {self.dropped} 帧")
+
+    def _writer(self):
+        try:
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                last_flush = time.monotonic()
+                while True:
+                    try:
+                        item = self._queue.get(timeout=self.flush_interval)
+                    except queue.Empty:
+                        item = False
+                    if item is None:
+                        break
+                    if item:
+                        ts, account, frame = item
+                        if isinstance(frame, (bytes, bytearray, memoryview)):
+                            frame = bytes(frame).decode("utf-8", errors="replace")
+                        f.write(json.dumps({"ts": ts, "account": account, "frame": frame}, ensure_ascii=False))
+                        f.write("\n")
+                        self.recorded += 1
+                    # 定期刷新，进程意外退出时最多丢失最近一个刷新周期的数据
+                    if time.monotonic() - last_flush >= self.flush_interval:
+                        f.flush()
+                        last_flush = time.monotonic()
+        except Exception as e:
+            logger.error(f"写入录制文件失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "recorded": self.recorded,
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+        }
+
+
+def read_recording(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """逐行读取录制文件"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
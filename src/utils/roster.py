@@ -0,0 +1,225 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from loguru import logger
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .context import current_connection, current_event
+
+# (账号名称, 群号)
+GroupKey = Tuple[str, int]
+
+
+class GroupRoster:
+    """群成员名单缓存
+
+    首次需要某个群的成员名称时，通过 get_group_member_list 一次性加载整个群，
+    之后由事件增量更新，渲染排行榜等不再需要逐个用户请求API：
+    - 群消息的 sender 更新成员的昵称和群名片
+    - group_increase / group_decrease 通知增删成员，机器人被移出时丢弃整个群
+    - group_card 通知更新群名片
+
+    名单按账号分开保存：多账号时各账号所在的群不同，某个账号被移出群只影响该账号。
+    加载失败后按指数退避暂停重试，期间继续使用旧名单或直接补查，
+    避免NapCat缓慢时每次渲染排行榜都等待一次完整的超时。
+
+    另外按用户保存最近见到的昵称（有上限，LRU），用于不在当前群名单中的用户。
+    """
+
+    def __init__(self, bot, config: Dict[str, Any]):
+        self.bot = bot
+        self.enabled = config.get("enabled", True)
+        # 名单加载后超过该秒数重新完整加载一次，纠正漏掉的变动，0 表示不刷新
+        self.refresh_interval = float(config.get("refresh_interval", 3600))
+        self.max_names = int(config.get("max_names", 50000))
+        # 加载失败后暂停重试的秒数，连续失败时翻倍，不超过 max_retry_after
+        self.retry_after = float(config.get("retry_after", 60))
+        self.max_retry_after = float(config.get("max_retry_after", 900))
+
+        # (账号, 群号) -> 用户ID -> {"nickname": 昵称, "card": 群名片}
+        self._groups: Dict[GroupKey, Dict[int, Dict[str, str]]] = {}
+        self._loaded_at: Dict[GroupKey, float] = {}
+        self._loading: Dict[GroupKey, asyncio.Future] = {}
+        # (账号, 群号) -> (连续失败次数, 下次允许重试的时间)
+        self._failures: Dict[GroupKey, Tuple[int, float]] = {}
+        self._names: "OrderedDict[int, str]" = OrderedDict()
+
+        self.bulk_loads = 0
+        self.load_failures = 0
+        # 退避期间跳过的加载次数
+        self.skipped_loads = 0
+        self.updates = Counter()
+        self.hits = 0
+        self.misses = 0
+
+    def observe(self, event, account: str = "default"):
+        """根据账号 account 收到的事件更新名单（在消息处理循环中调用，只做字典操作）"""
+        if not self.enabled:
+            return
+        if event.post_type == "message":
+            self._observe_sender(event, account)
+        elif event.post_type == "notice":
+            self._observe_notice(event, account)
+
+    def _observe_sender(self, event, account: str):
+        user_id = event.user_id
+        if not user_id:
+            return
+        nickname = event.sender.get("nickname") or ""
+        if nickname:
+            self._remember_name(user_id, nickname)
+        members = self._groups.get((account, event.group_id)) if event.group_id else None
+        if members is not None:
+            members[user_id] = {"nickname": nickname, "card": event.sender.get("card") or ""}
+            self.updates["message"] += 1
+
+    def _observe_notice(self, event, account: str):
+        members = self._groups.get((account, event.group_id)) if event.group_id else None
+        if members is None or not event.user_id:
+            return
+        if event.notice_type == "group_increase":
+            members.setdefault(event.user_id, {"nickname": self._names.get(event.user_id, ""), "card": ""})
+            self.updates["increase"] += 1
+        elif event.notice_type == "group_decrease":
+            if event.user_id == event.self_id:
+                # 该账号退出或被移出该群
+                self.forget_group(event.group_id, account)
+            else:
+                members.pop(event.user_id, None)
+            self.updates["decrease"] += 1
+        elif event.notice_type == "group_card":
+            member = members.setdefault(event.user_id, {"nickname": self._names.get(event.user_id, ""), "card": ""})
+            member["card"] = event.get("card_new") or ""
+            self.updates["card"] += 1
+
+    def _remember_name(self, user_id: int, nickname: str):
+        self._names[user_id] = nickname
+        self._names.move_to_end(user_id)
+        if len(self._names) > self.max_names:
+            self._names.popitem(last=False)
+
+    def _current_account(self) -> str:
+        """当前事件所属的账号，不在事件处理中时为第一个连接"""
+        connection = current_connection.get()
+        if connection is None and self.bot.connections:
+            connection = self.bot.connections[0]
+        return connection.name if connection is not None else "default"
+
+    def forget_group(self, group_id: int, account: Optional[str] = None):
+        key = (account or self._current_account(), group_id)
+        self._groups.pop(key, None)
+        self._loaded_at.pop(key, None)
+        self._failures.pop(key, None)
+
+    async def ensure_group(self, group_id: int, account: Optional[str] = None) -> bool:
+        """确保账号 account（默认为当前账号）在该群的名单已加载（并发调用只请求一次），返回是否可用"""
+        if not self.enabled:
+            return False
+        key = (account or self._current_account(), group_id)
+        now = time.monotonic()
+        loaded_at = self._loaded_at.get(key)
+        if loaded_at is not None and (not self.refresh_interval or now - loaded_at < self.refresh_interval):
+            return True
+        failure = self._failures.get(key)
+        if failure is not None and now < failure[1]:
+            # 最近加载失败，退避期间不再请求
+            self.skipped_loads += 1
+            return key in self._groups
+        loading = self._loading.get(key)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        future = asyncio.get_event_loop().create_future()
+        self._loading[key] = future
+        ok = False
+        try:
+            ok = await self._load_group(key)
+        finally:
+            self._loading.pop(key, None)
+            future.set_result(ok)
+        # 刷新失败时继续使用旧名单
+        return ok or key in self._groups
+
+    async def _load_group(self, key: GroupKey) -> bool:
+        account, group_id = key
+        connection = self.bot.get_connection(account)
+        api = connection.api if connection is not None else self.bot.api
+        member_list = await api.get_group_member_list(group_id=group_id)
+        if not isinstance(member_list, list):
+            self.load_failures += 1
+            count = self._failures.get(key, (0, 0.0))[0] + 1
+            delay = min(self.max_retry_after, self.retry_after * 2 ** (count - 1))
+            self._failures[key] = (count, time.monotonic() + delay)
+            logger.warning(f"加载群 {group_id} 成员列表失败（账号 {account}），{delay:.0f} 秒内不再重试")
+            return False
+        self._failures.pop(key, None)
+        members = {}
+        for member in member_list:
+            user_id = member.get("user_id")
+            if not user_id:
+                continue
+            nickname = member.get("nickname") or ""
+            members[user_id] = {"nickname": nickname, "card": member.get("card") or ""}
+            if nickname:
+                self._remember_name(user_id, nickname)
+        self._groups[key] = members
+        self._loaded_at[key] = time.monotonic()
+        self.bulk_loads += 1
+        logger.debug(f"已加载群 {group_id} 的 {len(members)} 名成员（账号 {account}）")
+        return True
+
+    def display_name(self, user_id: int, group_id: Optional[int] = None,
+                     account: Optional[str] = None) -> Optional[str]:
+        """返回用户在群内的名片或昵称，不在缓存中时返回None（不请求API）"""
+        member = None
+        if group_id:
+            member = self._groups.get((account or self._current_account(), group_id), {}).get(user_id)
+        if member:
+            name = member["card"] or member["nickname"]
+            if name:
+                return name
+        return self._names.get(user_id)
+
+    async def display_names(self, user_ids: Iterable[Any], group_id: Optional[int] = None,
+                            fallback: bool = True) -> List[Optional[str]]:
+        """批量获取显示名称，顺序与 user_ids 一致
+
+        未指定 group_id 时使用当前处理的事件所在的群。名单中没有的用户在
+        fallback 为True时通过 get_stranger_info（有API缓存）补查，仍失败的为None。
+        """
+        if group_id is None:
+            event = current_event.get()
+            group_id = getattr(event, "group_id", None) if event is not None else None
+        account = self._current_account()
+        user_ids = [int(user_id) for user_id in user_ids]
+        if group_id and user_ids:
+            await self.ensure_group(group_id, account)
+
+        names = [self.display_name(user_id, group_id, account) for user_id in user_ids]
+        missing = [i for i, name in enumerate(names) if name is None]
+        self.hits += len(names) - len(missing)
+        self.misses += len(missing)
+        if missing and fallback:
+            infos = await asyncio.gather(
+                *(self.bot.api.get_stranger_info(user_id=user_ids[i]) for i in missing),
+                return_exceptions=True,
+            )
+            for i, info in zip(missing, infos):
+                if isinstance(info, dict) and info.get("nickname"):
+                    names[i] = info["nickname"]
+                    self._remember_name(user_ids[i], info["nickname"])
+        return names
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "groups": len(self._groups),
+            "members": sum(len(members) for members in self._groups.values()),
+            "names": len(self._names),
+            "bulk_loads": self.bulk_loads,
+            "load_failures": self.load_failures,
+            "skipped_loads": self.skipped_loads,
+            "backing_off": sum(1 for _, retry_at in self._failures.values() if time.monotonic() < retry_at),
+            "updates": dict(self.updates),
+            "hit_rate": f"{self.hits / lookups:.1%}" if lookups else "-",
+        }
@@ -0,0 +1,140 @@
+import asyncio
+from loguru import logger
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from .context import current_event
+from .send_scheduler import PRIORITIES, with_priority
+
+
+class _Batch:
+    __slots__ = ("parts", "length", "priority", "send", "timer")
+
+    def __init__(self, send: Callable[[str], Awaitable[Any]], priority: str):
+        # (消息, 需要@的用户ID)
+        self.parts: List[Tuple[str, Optional[int]]] = []
+        self.length = 0
+        self.priority = priority
+        self.send = send
+        self.timer: Optional[asyncio.Task] = None
+
+
+class SendCoalescer:
+    """出站消息合并窗口
+
+    处理事件时发回该群/私聊的文本回复先进入合并窗口，window 秒内同一目标的
+    多条回复合并为一条消息发送，减少突发时的发送次数（如零点签到高峰）。
+    合并多条时，群聊中每条回复前加上触发它的用户的@（回复中已经@了该用户时
+    不重复添加）；只有一条时原样发送。
+
+    同一会话的事件按顺序处理，回复必须不等待发送结果才能与后续事件的回复合并，
+    因此进入窗口的回复立即返回None：此时消息还没有发出，没有 message_id，
+    返回None避免调用方把它当作发送成功记录下来。需要发送结果的调用方用
+    send_*_msg(..., coalesce=False) 绕过窗口；发往其他目标的消息（广播、
+    转发给别的群等）不经过合并窗口。
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.enabled = config.get("enabled", False)
+        self.window = float(config.get("window", 0.3))
+        self.max_messages = max(1, int(config.get("max_messages", 5)))
+        # 合并后的字数上限，超出时先发出已合并的部分
+        self.max_length = int(config.get("max_length", 500))
+        self.separator = config.get("separator", "\n\n")
+        self._batches: Dict[Hashable, _Batch] = {}
+        self._sending: Set[asyncio.Task] = set()
+
+        self.submitted = 0
+        self.sent = 0
+        # 因合并而少发的消息数
+        self.saved = 0
+        self.failed = 0
+
+    def accepts(self, target: Hashable) -> bool:
+        """是否为对当前事件所在会话的回复"""
+        if not self.enabled:
+            return False
+        event = current_event.get()
+        if event is None:
+            return False
+        if getattr(event, "group_id", None):
+            return target == ("g", event.group_id)
+        return target == ("u", getattr(event, "user_id", None))
+
+    def submit(self, target: Hashable, message: str, send: Callable[[str], Awaitable[Any]],
+               priority: str, mention: bool = True) -> None:
+        """加入目标的合并窗口，不等待发送，返回None"""
+        event = current_event.get()
+        user_id = getattr(event, "user_id", None) if mention and event is not None else None
+
+        batch = self._batches.get(target)
+        if batch is not None and batch.length + len(self.separator) + len(message) > self.max_length:
+            self._flush(target)
+            batch = None
+        if batch is None:
+            batch = self._batches[target] = _Batch(send, priority)
+            batch.timer = asyncio.create_task(self._flush_later(target, batch))
+        elif PRIORITIES.index(priority) < PRIORITIES.index(batch.priority):
+            # 合并后的消息按其中最高的优先级发送
+            batch.priority = priority
+
+        batch.parts.append((message, user_id))
+        batch.length += len(message) + (len(self.separator) if len(batch.parts) > 1 else 0)
+        self.submitted += 1
+        if len(batch.parts) >= self.max_messages:
+            self._flush(target)
+        return None
+
+    async def _flush_later(self, target: Hashable, batch: _Batch):
+        await asyncio.sleep(self.window)
+        if self._batches.get(target) is batch:
+            self._flush(target)
+
+    def _flush(self, target: Hashable):
+        batch = self._batches.pop(target, None)
+        if batch is None:
+            return
+        if batch.timer is not None and batch.timer is not asyncio.current_task():
+            batch.timer.cancel()
+        self._sending.add(asyncio.create_task(self._send(batch)))
+
+    async def _send(self, batch: _Batch):
+        try:
+            with with_priority(batch.priority):
+                result = await batch.send(self._merge(batch.parts))
+            if result is None:
+                self.failed += 1
+                logger.warning(f"合并消息发送失败，包含 {len(batch.parts)} 条回复")
+            else:
+                self.sent += 1
+                self.saved += len(batch.parts) - 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"发送合并消息失败: {e}")
+        finally:
+            self._sending.discard(asyncio.current_task())
+
+    def _merge(self, parts: List[Tuple[str, Optional[int]]]) -> str:
+        if len(parts) == 1:
+            return parts[0][0]
+        merged = []
+        for message, user_id in parts:
+            if user_id and f"[CQ:at,qq={user_id}]" not in message:
+                message = f"[CQ:at,qq={user_id}] {message}"
+            merged.append(message)
+        return self.separator.join(merged)
+
+    async def flush_all(self):
+        """立即发出所有等待中的合并消息并等待发送完成（关闭时调用）"""
+        for target in list(self._batches):
+            self._flush(target)
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "saved": self.saved,
+            "failed": self.failed,
+            "open_batches": len(self._batches),
+        }
@@ -0,0 +1,271 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from loguru import logger
+from typing import Any, Deque, Dict, Hashable, Iterable, List, Optional
+
+from .context import current_event, send_priority
+from .metrics import RollingHistogram
+
+# 优先级从高到低
+PRIORITY_HIGH = "high"
+PRIORITY_NORMAL = "normal"
+PRIORITY_LOW = "low"
+PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
+
+# 默认参与限速的发送类API
+DEFAULT_SEND_ACTIONS = (
+    "send_msg",
+    "send_group_msg",
+    "send_private_msg",
+    "send_group_forward_msg",
+    "send_private_forward_msg",
+    "send_like",
+    "group_poke",
+    "friend_poke",
+)
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积攒 burst 个"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """距离有一个可用令牌还需等待的秒数"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class _Waiter:
+    __slots__ = ("target", "future", "enqueued")
+
+    def __init__(self, target: Hashable, future: asyncio.Future, enqueued: float):
+        self.target = target
+        self.future = future
+        self.enqueued = enqueued
+
+
+@contextmanager
+def with_priority(priority: str):
+    """在该上下文内发出的消息使用指定优先级，如广播等批量发送使用 PRIORITY_LOW"""
+    token = send_priority.set(priority)
+    try:
+        yield
+    finally:
+        send_priority.reset(token)
+
+
+class SendScheduler:
+    """出站发送调度器
+
+    用全局和按目标（群/用户）的令牌桶控制发送速率，避免突发消息触发QQ风控。
+    没有排队且令牌充足时直接放行；否则按 高 > 普通 > 低 的优先级排队，
+    同一优先级内先进先出，某个目标的令牌耗尽时不阻塞其他目标的消息。
+    队列有界：已满时新请求挤掉优先级更低的排队请求，否则被拒绝。
+
+    未显式指定优先级时：回复管理员的消息为高优先级，其余事件中的回复为普通，
+    不在事件处理中发出的消息（定时任务、广播等）为低优先级。
+    """
+
+    def __init__(self, config: Dict[str, Any], admin_ids: Iterable[int] = ()):
+        self.enabled = config.get("enabled", True)
+        self.global_rate = float(config.get("global_rate", 5.0))
+        self.global_burst = float(config.get("global_burst", 10))
+        self.target_rate = float(config.get("target_rate", 1.0))
+        self.target_burst = float(config.get("target_burst", 5))
+        self.max_queue = int(config.get("max_queue", 500))
+        # 同时保留的目标令牌桶数量上限，超出时清理已满的桶
+        self.max_targets = int(config.get("max_targets", 10000))
+        self.actions = set(config.get("actions", DEFAULT_SEND_ACTIONS))
+        self.admin_ids = set(admin_ids)
+
+        now = time.monotonic()
+        self._global = TokenBucket(self.global_rate, self.global_burst, now)
+        self._targets: Dict[Hashable, TokenBucket] = {}
+        self._queues: Dict[str, Deque[_Waiter]] = {priority: deque() for priority in PRIORITIES}
+        self._queued = 0
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.granted = 0
+        self.rejected = 0
+        self.evicted = 0
+        self.wait_time = {priority: RollingHistogram(500) for priority in PRIORITIES}
+
+    def resolve_priority(self) -> str:
+        """根据上下文确定当前发送的优先级"""
+        priority = send_priority.get()
+        if priority in self._queues:
+            return priority
+        event = current_event.get()
+        if event is None:
+            return PRIORITY_LOW
+        if event.user_id in self.admin_ids:
+            return PRIORITY_HIGH
+        return PRIORITY_NORMAL
+
+    @staticmethod
+    def target_of(action: str, params: Dict[str, Any]) -> Hashable:
+        if params.get("group_id"):
+            return ("g", params["group_id"])
+        if params.get("user_id"):
+            return ("u", params["user_id"])
+        return (action, None)
+
+    async def acquire(self, action: str, params: Dict[str, Any], priority: Optional[str] = None) -> bool:
+        """等待发送许可，队列已满被拒绝或被挤出时返回False"""
+        if not self.enabled or action not in self.actions:
+            return True
+        priority = priority or self.resolve_priority()
+        target = self.target_of(action, params)
+        now = time.monotonic()
+        bucket = self._target_bucket(target, now)
+
+        # 快速路径：没有排队且令牌充足
+        if not self._queued and self._global.wait_time(now) == 0 and bucket.wait_time(now) == 0:
+            self._grant(bucket, now)
+            self.wait_time[priority].observe(0.0)
+            return True
+
+        if self._queued >= self.max_queue and not self._evict_below(priority):
+            self.rejected += 1
+            logger.warning(f"发送队列已满 ({self._queued})，丢弃 {priority} 优先级的 {action}")
+            return False
+
+        waiter = _Waiter(target, asyncio.get_event_loop().create_future(), now)
+        self._queues[priority].append(waiter)
+        self._queued += 1
+        self._ensure_dispatcher()
+        self._wakeup.set()
+        try:
+            granted = await waiter.future
+        except asyncio.CancelledError:
+            self._remove(priority, waiter)
+            raise
+        if granted:
+            self.wait_time[priority].observe(time.monotonic() - waiter.enqueued)
+        return granted
+
+    def _target_bucket(self, target: Hashable, now: float) -> TokenBucket:
+        bucket = self._targets.get(target)
+        if bucket is None:
+            if len(self._targets) >= self.max_targets:
+                self._targets = {key: b for key, b in self._targets.items() if not b.is_full(now)}
+            bucket = self._targets[target] = TokenBucket(self.target_rate, self.target_burst, now)
+        return bucket
+
+    def _grant(self, bucket: TokenBucket, now: float):
+        self._global.consume(now)
+        bucket.consume(now)
+        self.granted += 1
+
+    def _evict_below(self, priority: str) -> bool:
+        """挤出一个优先级低于 priority 的最新排队请求"""
+        for lower in reversed(PRIORITIES[PRIORITIES.index(priority) + 1:]):
+            queue = self._queues[lower]
+            if queue:
+                waiter = queue.pop()
+                self._queued -= 1
+                self.evicted += 1
+                logger.warning(f"发送队列已满，挤出一条 {lower} 优先级的排队消息")
+                if not waiter.future.done():
+                    waiter.future.set_result(False)
+                return True
+        return False
+
+    def _remove(self, priority: str, waiter: _Waiter):
+        try:
+            self._queues[priority].remove(waiter)
+            self._queued -= 1
+        except ValueError:
+            pass
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while True:
+            now = time.monotonic()
+            delay = self._grant_ready(now)
+            if not self._queued:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _grant_ready(self, now: float) -> float:
+        """按优先级放行所有可以发送的请求，返回距下一个请求可放行的最短等待时间"""
+        next_delay = 1.0
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            skipped: List[_Waiter] = []
+            while queue:
+                global_wait = self._global.wait_time(now)
+                if global_wait > 0:
+                    queue.extendleft(reversed(skipped))
+                    return global_wait
+                waiter = queue.popleft()
+                if waiter.future.done():
+                    self._queued -= 1
+                    continue
+                bucket = self._target_bucket(waiter.target, now)
+                target_wait = bucket.wait_time(now)
+                if target_wait > 0:
+                    skipped.append(waiter)
+                    next_delay = min(next_delay, target_wait)
+                    continue
+                self._grant(bucket, now)
+                self._queued -= 1
+                waiter.future.set_result(True)
+            queue.extend(skipped)
+        return next_delay
+
+    async def stop(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        for queue in self._queues.values():
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.future.done():
+                    waiter.future.set_result(False)
+        self._queued = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": {priority: len(queue) for priority, queue in self._queues.items()},
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+            "targets": len(self._targets),
+            "wait_ms": {priority: histogram.summary(scale=1000) for priority, histogram in self.wait_time.items()},
+        }
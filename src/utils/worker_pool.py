@@ -0,0 +1,129 @@
+import asyncio
+import time
+from collections import deque
+from loguru import logger
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set
+
+from .metrics import BucketHistogram
+
+
+class ConversationWorkerPool:
+    """按会话分片的有序工作池
+
+    同一会话(key)的事件严格按提交顺序逐个处理，不同会话之间并行；
+    固定数量的工作协程即为全局并发上限。每处理完一个事件，
+    该会话会重新排到就绪队列末尾，避免繁忙的会话独占工作协程。
+
+    单个会话最多有 max_pending_per_key 个待处理事件，调用方应先用 is_full
+    检查，把已满会话的积压留在入站通道中，而不是占满全局的待处理名额；
+    会话腾出空位时调用 on_key_available 通知调用方。
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[None]], workers: int = 32, max_pending: int = 256,
+                 max_pending_per_key: int = 8, on_key_available: Optional[Callable[[], None]] = None):
+        self.handler = handler
+        self.worker_count = max(1, int(workers))
+        # 已提交但尚未开始处理的事件总数上限，超出时 submit 会等待
+        self.max_pending = max(1, int(max_pending))
+        self.max_pending_per_key = max(1, int(max_pending_per_key))
+        self.on_key_available = on_key_available
+
+        self._pending: Dict[Hashable, Deque[Any]] = {}
+        # 已在就绪队列中或正在处理的会话
+        self._scheduled: Set[Hashable] = set()
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._capacity = asyncio.Event()
+        self._capacity.set()
+        self._workers: List[asyncio.Task] = []
+
+        self.pending_count = 0
+        self.busy = 0
+        self.processed = 0
+        self.errors = 0
+        # 单个事件的处理耗时（插件处理及其等待的API调用）
+        self.handle_time = BucketHistogram()
+
+    def start(self):
+        """启动工作协程"""
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        logger.debug(f"会话工作池已启动，工作协程数: {self.worker_count}")
+
+    async def stop(self):
+        """停止所有工作协程，未处理的事件被丢弃"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def is_full(self, key: Hashable) -> bool:
+        """该会话的待处理事件是否已达上限"""
+        queue = self._pending.get(key)
+        return queue is not None and len(queue) >= self.max_pending_per_key
+
+    async def submit(self, key: Hashable, item: Any):
+        """提交事件，待处理事件已达上限时等待空位
+
+        不检查单个会话的上限，由调用方通过 is_full 决定是否提交。
+        """
+        while self.pending_count >= self.max_pending:
+            self._capacity.clear()
+            await self._capacity.wait()
+
+        queue = self._pending.get(key)
+        if queue is None:
+            queue = self._pending[key] = deque()
+        queue.append(item)
+        self.pending_count += 1
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            self._ready.put_nowait(key)
+
+    async def _worker(self, index: int):
+        try:
+            while True:
+                key = await self._ready.get()
+                queue = self._pending[key]
+                item = queue.popleft()
+                self.pending_count -= 1
+                if self.pending_count < self.max_pending:
+                    self._capacity.set()
+                if len(queue) == self.max_pending_per_key - 1 and self.on_key_available is not None:
+                    self.on_key_available()
+
+                self.busy += 1
+                started = time.monotonic()
+                try:
+                    await self.handler(item)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"工作协程 {index} 处理事件时出错: {e}")
+                finally:
+                    self.busy -= 1
+                    self.processed += 1
+                    self.handle_time.observe(time.monotonic() - started)
+
+                if queue:
+                    # 还有后续事件，排到队尾等待下一轮
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+                    self._scheduled.discard(key)
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """工作池运行统计"""
+        return {
+            "workers": self.worker_count,
+            "busy": self.busy,
+            "pending": self.pending_count,
+            "max_pending": self.max_pending,
+            "max_pending_per_key": self.max_pending_per_key,
+            "full_conversations": sum(1 for queue in self._pending.values() if len(queue) >= self.max_pending_per_key),
+            "conversations": len(self._scheduled),
+            "processed": self.processed,
+            "errors": self.errors,
+            "avg_handle_ms": round(self.handle_time.total / self.handle_time.count * 1000, 1) if self.handle_time.count else 0,
+        }
@@ -0,0 +1,68 @@
+"""JSON编解码器微基准
+
+对录制的 OneBot 事件逐帧解码，比较各编解码器每个事件的CPU耗时。
+
+用法:
+    python -m tools.bench_json_codec [--file 事件文件.jsonl] [--rounds 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.json_codec import available_codecs, get_codec  # noqa: E402
+
+DEFAULT_SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples", "onebot_events.jsonl")
+
+# 典型的 call_api 请求
+API_REQUEST = {
+    "action": "send_group_msg",
+    "params": {"group_id": 987654321, "message": "签到成功！\n获得 7 积分和 1 点好感度！\n当前总积分：128\n当前好感度：12"},
+    "echo": "6f9619ff-8b86-d011-b42d-00c04fc964ff",
+}
+
+
+def load_frames(path: str) -> list:
+    """读取事件文件，每行一个原始帧，返回bytes列表"""
+    with open(path, "rb") as f:
+        return [line.rstrip(b"\r\n") for line in f if line.strip()]
+
+
+def bench(func, frames: list, rounds: int) -> float:
+    """返回每帧平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for frame in frames:
+            func(frame)
+    elapsed = time.perf_counter() - start
+    return elapsed / (rounds * len(frames)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON编解码器微基准")
+    parser.add_argument("--file", default=DEFAULT_SAMPLES, help="每行一个原始帧的JSONL文件")
+    parser.add_argument("--rounds", type=int, default=2000, help="重复轮数")
+    args = parser.parse_args()
+
+    frames = load_frames(args.file)
+    print(f"样本: {args.file} ({len(frames)} 帧, 平均 {sum(map(len, frames)) / len(frames):.0f} 字节)")
+    print(f"可用编解码器: {', '.join(available_codecs())}\n")
+
+    # 原实现：先解码为str，再用标准库解析
+    baseline = bench(lambda frame: json.loads(frame.decode("utf-8")), frames, args.rounds)
+    baseline_dumps = bench(lambda _: json.dumps(API_REQUEST), [None], args.rounds * len(frames))
+    print(f"{'编解码器':<10}{'解码 µs/帧':>14}{'加速比':>10}{'编码 µs/次':>14}{'加速比':>10}")
+    print(f"{'原实现':<10}{baseline:>14.2f}{1.0:>10.2f}{baseline_dumps:>14.2f}{1.0:>10.2f}")
+
+    for name in available_codecs():
+        codec = get_codec(name)
+        decode = bench(codec.loads, frames, args.rounds)
+        encode = bench(lambda _: codec.dumps(API_REQUEST), [None], args.rounds * len(frames))
+        print(f"{name:<10}{decode:>14.2f}{baseline / decode:>10.2f}{encode:>14.2f}{baseline_dumps / encode:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""消息构建与CQ码解析微基准
+
+出站：比较拼接CQ码字符串（原实现，含引号替换）和 MessageBuilder 构建消息段数组，
+包括序列化为 send_group_msg 请求的耗时；字符串消息还需要 NapCat 再解析一次CQ码，
+这部分用 parse_cq 的耗时估计。
+入站：对录制事件中的 raw_message 比较单次扫描的 parse_cq 和常见的正则解析，
+并检查图片URL提取的结果是否正确。
+
+用法:
+    python -m tools.bench_message [--file 事件文件.jsonl] [--rounds 20000]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.json_codec import get_codec  # noqa: E402
+from src.utils.message_builder import MessageBuilder, first_image_url, parse_cq, unescape  # noqa: E402
+
+DEFAULT_SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples", "onebot_events.jsonl")
+
+# 典型的AI回复（含引号和方括号）
+REPLY = '好的喵~ 这是你要的"笑话"：\n[小猫]去买鱼，老板说"今天没有鱼"，小猫说"那明天呢？"\n\n好感度 +1 喵~'
+USER_ID = 1234567890
+GROUP_ID = 987654321
+
+_CQ_REGEX = re.compile(r"\[CQ:([^,\]]+)((?:,[^,=\]]+=[^,\]]*)*)\]")
+_CQ_PARAM = re.compile(r",([^,=\]]+)=([^,\]]*)")
+
+
+def regex_parse(raw: str) -> list:
+    """常见的正则实现，作为对照"""
+    segments = []
+    pos = 0
+    for match in _CQ_REGEX.finditer(raw):
+        if match.start() > pos:
+            segments.append({"type": "text", "data": {"text": unescape(raw[pos:match.start()])}})
+        data = {key: unescape(value) for key, value in _CQ_PARAM.findall(match.group(2))}
+        segments.append({"type": match.group(1), "data": data})
+        pos = match.end()
+    if pos < len(raw):
+        segments.append({"type": "text", "data": {"text": unescape(raw[pos:])}})
+    return segments
+
+
+def split_url(raw: str) -> str:
+    """原 hammer_command 的图片URL提取方式"""
+    return raw.split("url=")[1].split("]")[0]
+
+
+def load_raw_messages(path: str) -> list:
+    messages = []
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                raw = json.loads(line).get("raw_message")
+                if raw:
+                    messages.append(raw)
+    return messages
+
+
+def bench(func, items: list, rounds: int) -> float:
+    """返回每次调用的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            func(item)
+    elapsed = time.perf_counter() - start
+    return elapsed / (rounds * len(items)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="消息构建与CQ码解析微基准")
+    parser.add_argument("--file", default=DEFAULT_SAMPLES, help="每行一个原始帧的JSONL文件")
+    parser.add_argument("--rounds", type=int, default=20000, help="重复轮数")
+    args = parser.parse_args()
+    codec = get_codec()
+
+    def build_string(_):
+        message = f"{REPLY}\n\n[CQ:at,qq={USER_ID}]".replace("\"", "'")
+        return codec.dumps({"action": "send_group_msg", "params": {"group_id": GROUP_ID, "message": message}})
+
+    def build_segments(_):
+        message = MessageBuilder().text(REPLY).text("\n\n").at(USER_ID).build()
+        return codec.dumps({"action": "send_group_msg", "params": {"group_id": GROUP_ID, "message": message}})
+
+    string_message = f"{REPLY}\n\n[CQ:at,qq={USER_ID}]"
+    print("出站（构建并编码一条带@的群聊回复）:")
+    print(f"{'方式':<12}{'µs/次':>10}{'字节':>8}")
+    print(f"{'CQ码字符串':<12}{bench(build_string, [None], args.rounds):>10.2f}{len(build_string(None)):>8}")
+    print(f"{'消息段数组':<12}{bench(build_segments, [None], args.rounds):>10.2f}{len(build_segments(None)):>8}")
+    print(f"{'NapCat解析':<12}{bench(parse_cq, [string_message], args.rounds):>10.2f}   （字符串消息额外的解析，估计）\n")
+
+    raw_messages = load_raw_messages(args.file)
+    print(f"入站（{len(raw_messages)} 条 raw_message，平均 {sum(map(len, raw_messages)) / len(raw_messages):.0f} 字符）:")
+    regex = bench(regex_parse, raw_messages, args.rounds)
+    scan = bench(parse_cq, raw_messages, args.rounds)
+    print(f"{'正则解析':<12}{regex:>10.2f} µs/条")
+    print(f"{'parse_cq':<12}{scan:>10.2f} µs/条  加速比 {regex / scan:.2f}")
+    mismatched = sum(1 for raw in raw_messages if regex_parse(raw) != parse_cq(raw))
+    print(f"解析结果不一致: {mismatched} 条\n")
+
+    images = [raw for raw in raw_messages if "[CQ:image" in raw]
+    if images:
+        print("图片URL提取:")
+        print(f"{'split(url=)':<12}{bench(split_url, images, args.rounds):>10.2f} µs/条")
+        print(f"{'parse_cq':<12}{bench(first_image_url, images, args.rounds):>10.2f} µs/条")
+        for raw in images:
+            old, new = split_url(raw), first_image_url(raw)
+            print(f"  split(url=) 结果{'正确' if old == new else '错误'}: {old}")
+            print(f"  parse_cq 结果: {new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""合成负载生成器
+
+启动模拟 NapCat，按固定速率向机器人推送群聊和私聊消息，消息按比例分为
+命令、@机器人的聊天和不需要回复的普通闲聊。统计从事件推送出去到机器人
+发出对应 send_group_msg / send_private_msg 的端到端延迟（p50/p95/p99）和吞吐。
+
+同一会话内的消息按顺序处理，因此每个会话的回复按先进先出与需要回复的消息配对；
+插件对一条消息回复多次或不回复都会使配对偏移，请选择只回复一次的命令。
+
+默认在子进程中按 config.yaml 启动机器人；--external 时只监听 --port，
+等待单独启动的机器人连接（napcat 地址指向本工具），用于在目标硬件上测量。
+
+用法:
+    python -m tools.loadgen [--rate 50] [--duration 30] [--groups 20] [--users 200]
+                            [--commands 0.3] [--chat 0.1] [--private 0.1]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, Deque, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.metrics import RollingHistogram  # noqa: E402
+from tools.mock_napcat import MockNapCat  # noqa: E402
+from tools.replay import mock_config, run_bot  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_COMMANDS = "/test,/积分,/help,ping"
+DEFAULT_CHAT = "你好呀,今天天气怎么样,讲个笑话吧"
+CHATTER = ["哈哈哈", "有人吗", "今天好累", "晚上吃什么", "这个好有意思", "+1", "收到"]
+
+
+class LoadGenerator:
+    """按速率生成消息并统计回复延迟"""
+
+    def __init__(self, mock: MockNapCat, args: argparse.Namespace):
+        self.mock = mock
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.commands = [c for c in args.command_texts.split(",") if c]
+        self.chat_texts = [c for c in args.chat_texts.split(",") if c]
+        self.groups = [100000 + i for i in range(args.groups)]
+        self.users = [200000 + i for i in range(args.users)]
+        # 会话 -> 等待回复的消息推送时间
+        self.waiting: Dict[Any, Deque[float]] = defaultdict(deque)
+        self.latency = RollingHistogram(window=1_000_000)
+        self.sent = Counter()
+        self.replies = Counter()
+        self.unexpected_replies = 0
+        self.last_reply = time.perf_counter()
+        mock.on_request = self.on_request
+
+    def on_request(self, request: Dict[str, Any]):
+        action = request.get("action")
+        if action not in ("send_group_msg", "send_private_msg"):
+            return
+        now = time.perf_counter()
+        self.last_reply = now
+        self.replies[action] += 1
+        params = request.get("params") or {}
+        key = ("g", params.get("group_id")) if action == "send_group_msg" else ("u", params.get("user_id"))
+        waiting = self.waiting.get(key)
+        if waiting:
+            self.latency.observe(now - waiting.popleft())
+        else:
+            self.unexpected_replies += 1
+
+    def _next_event(self):
+        """随机生成一条消息，返回 (类型, 会话, 事件)"""
+        user_id = self.random.choice(self.users)
+        roll = self.random.random()
+        if roll < self.args.commands:
+            kind, text = "command", self.random.choice(self.commands)
+        elif roll < self.args.commands + self.args.chat:
+            kind, text = "chat", self.random.choice(self.chat_texts)
+        else:
+            kind, text = "chatter", self.random.choice(CHATTER)
+        if kind != "chatter" and self.random.random() < self.args.private:
+            return kind, ("u", user_id), self.mock.private_message(user_id, text)
+        group_id = self.random.choice(self.groups)
+        event = self.mock.group_message(group_id, user_id, text, at_self=kind == "chat")
+        return kind, ("g", group_id), event
+
+    async def run(self) -> Dict[str, Any]:
+        interval = 1 / self.args.rate
+        total = int(self.args.rate * self.args.duration)
+        start = time.perf_counter()
+        for i in range(total):
+            # 开环发送：按计划时间推送，不等待机器人回复
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            kind, key, event = self._next_event()
+            self.sent[kind] += 1
+            if kind != "chatter":
+                self.waiting[key].append(time.perf_counter())
+            await self.mock.push(event)
+        send_time = time.perf_counter() - start
+
+        # 等待剩余回复，持续 idle 秒没有新回复即结束
+        self.last_reply = max(self.last_reply, time.perf_counter())
+        while time.perf_counter() - self.last_reply < self.args.idle:
+            await asyncio.sleep(0.1)
+        elapsed = max(send_time, self.last_reply - start)
+        replied = sum(self.replies.values())
+        return {
+            "sent": dict(self.sent),
+            "send_rate": round(sum(self.sent.values()) / send_time, 1),
+            "replies": dict(self.replies),
+            "reply_rate": round(replied / elapsed, 1),
+            "unanswered": sum(len(waiting) for waiting in self.waiting.values()),
+            "unexpected_replies": self.unexpected_replies,
+            "latency_ms": self.latency.summary(scale=1000),
+        }
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    mock = MockNapCat(port=args.port)
+    await mock.start()
+    process = None
+    if not args.external:
+        context = multiprocessing.get_context("spawn")
+        process = context.Process(target=run_bot, args=(mock_config(args.config, mock.port),))
+        process.start()
+    else:
+        print(f"模拟 NapCat 已在 ws://127.0.0.1:{mock.port} 监听，等待机器人连接...")
+    try:
+        await mock.wait_connected(timeout=args.connect_timeout)
+        # 等待插件加载完成
+        await asyncio.sleep(args.warmup)
+        return await LoadGenerator(mock, args).run()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join(timeout=10)
+        await mock.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成负载生成器")
+    parser.add_argument("--rate", type=float, default=50, help="每秒推送的消息数")
+    parser.add_argument("--duration", type=float, default=30, help="推送持续秒数")
+    parser.add_argument("--groups", type=int, default=20, help="群数量")
+    parser.add_argument("--users", type=int, default=200, help="用户数量")
+    parser.add_argument("--commands", type=float, default=0.3, help="命令消息占比")
+    parser.add_argument("--chat", type=float, default=0.0, help="@机器人聊天占比（需要聊天插件和AI服务）")
+    parser.add_argument("--private", type=float, default=0.1, help="命令和聊天中以私聊发送的比例")
+    parser.add_argument("--command-texts", default=DEFAULT_COMMANDS, help="逗号分隔的命令文本")
+    parser.add_argument("--chat-texts", default=DEFAULT_CHAT, help="逗号分隔的聊天文本")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--idle", type=float, default=3.0, help="推送结束后无回复多少秒视为处理完毕")
+    parser.add_argument("--warmup", type=float, default=1.0, help="机器人连接后开始推送前的等待秒数")
+    parser.add_argument("--config", default=os.path.join(ROOT, "config.yaml"), help="机器人配置文件")
+    parser.add_argument("--external", action="store_true", help="不启动机器人，等待外部机器人连接")
+    parser.add_argument("--port", type=int, default=0, help="模拟NapCat监听端口，0 表示自动选择")
+    parser.add_argument("--connect-timeout", type=float, default=60, help="等待机器人连接的秒数")
+    args = parser.parse_args()
+    if args.external and not args.port:
+        parser.error("--external 需要指定 --port")
+
+    args.config = os.path.abspath(args.config)
+    if not args.external:
+        # 插件的数据文件按工作目录下的相对路径读写，切换到临时目录后从空数据开始；
+        # 外部服务的访问由 mock_config 切断
+        os.chdir(tempfile.mkdtemp(prefix="loadgen_"))
+    result = asyncio.run(main_async(args))
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""模拟 NapCat 的 WebSocket 服务端
+
+接受机器人连接，对每个API请求回复成功响应，并可主动推送事件，
+用于在没有QQ账号的环境下测试和压测机器人。
+
+用法:
+    python -m tools.mock_napcat [--port 3001] [--self-id 10000]
+
+启动后在命令行输入文本，会作为群 10001 中用户 20001 的消息推送给机器人。
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+import websockets
+
+
+class MockNapCat:
+    """模拟的 NapCat 服务端"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 3001, self_id: int = 10000):
+        self.host = host
+        self.port = port
+        self.self_id = self_id
+        self.connections: List[Any] = []
+        self.requests = Counter()
+        # 收到API请求时的回调，参数为请求字典
+        self.on_request: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._message_ids = itertools.count(1)
+        self._server = None
+
+    async def start(self):
+        self._server = await websockets.serve(self._serve, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for connection in list(self.connections):
+            await connection.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def wait_connected(self, count: int = 1, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        while len(self.connections) < count:
+            if time.monotonic() > deadline:
+                raise TimeoutError("等待机器人连接超时")
+            await asyncio.sleep(0.05)
+
+    async def _serve(self, websocket, path: Optional[str] = None):
+        self.connections.append(websocket)
+        await websocket.send(json.dumps({
+            "time": int(time.time()), "self_id": self.self_id, "post_type": "meta_event",
+            "meta_event_type": "lifecycle", "sub_type": "connect",
+        }))
+        try:
+            async for message in websocket:
+                request = json.loads(message)
+                self.requests[request.get("action")] += 1
+                if self.on_request is not None:
+                    self.on_request(request)
+                await websocket.send(json.dumps({
+                    "status": "ok", "retcode": 0,
+                    "data": {"message_id": next(self._message_ids)},
+                    "message": "", "wording": "", "echo": request.get("echo"),
+                }))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.connections.remove(websocket)
+
+    async def push(self, event: Dict[str, Any]):
+        """把事件推送给最近连接的机器人"""
+        await self.connections[-1].send(json.dumps(event, ensure_ascii=False))
+
+    async def push_raw(self, frame: str):
+        """把原始帧原样推送给最近连接的机器人"""
+        await self.connections[-1].send(frame)
+
+    def group_message(self, group_id: int, user_id: int, text: str, at_self: bool = False) -> Dict[str, Any]:
+        """构造一条群消息事件，at_self 为 True 时在开头@机器人"""
+        message = [{"type": "text", "data": {"text": text}}]
+        raw_message = text
+        if at_self:
+            message.insert(0, {"type": "at", "data": {"qq": str(self.self_id)}})
+            raw_message = f"[CQ:at,qq={self.self_id}] {text}"
+        return {
+            "self_id": self.self_id, "user_id": user_id, "time": int(time.time()),
+            "message_id": next(self._message_ids), "message_seq": 0, "real_id": 0,
+            "message_type": "group", "sub_type": "normal",
+            "sender": {"user_id": user_id, "nickname": f"用户{user_id}", "card": "", "role": "member"},
+            "raw_message": raw_message, "font": 14,
+            "message": message,
+            "message_format": "array", "post_type": "message", "group_id": group_id,
+        }
+
+    def private_message(self, user_id: int, text: str) -> Dict[str, Any]:
+        """构造一条私聊消息事件"""
+        return {
+            "self_id": self.self_id, "user_id": user_id, "time": int(time.time()),
+            "message_id": next(self._message_ids), "message_seq": 0, "real_id": 0,
+            "message_type": "private", "sub_type": "friend",
+            "sender": {"user_id": user_id, "nickname": f"用户{user_id}", "card": ""},
+            "raw_message": text, "font": 14,
+            "message": [{"type": "text", "data": {"text": text}}],
+            "message_format": "array", "post_type": "message",
+        }
+
+
+async def _interactive(port: int, self_id: int):
+    mock = MockNapCat(port=port, self_id=self_id)
+    mock.on_request = lambda request: print(f"<- {request.get('action')} {request.get('params')}")
+    await mock.start()
+    print(f"模拟 NapCat 已在 ws://127.0.0.1:{mock.port} 监听")
+    loop = asyncio.get_running_loop()
+    while True:
+        text = (await loop.run_in_executor(None, input)).strip()
+        if not text:
+            continue
+        if not mock.connections:
+            print("机器人尚未连接")
+            continue
+        await mock.push(mock.group_message(10001, 20001, text))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟 NapCat 的 WebSocket 服务端")
+    parser.add_argument("--port", type=int, default=3001)
+    parser.add_argument("--self-id", type=int, default=10000)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_interactive(args.port, args.self_id))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
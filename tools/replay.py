@@ -0,0 +1,208 @@
+"""事件流回放
+
+把 FrameRecorder 录制的事件流（bot.recorder）推送给机器人，用于离线复现
+生产环境的流量形态，比较分发、插件和存储改动对吞吐和延迟的影响。
+
+机器人在子进程中按 config.yaml 的插件配置运行，连接到本工具启动的模拟
+NapCat（对所有API请求回复成功）。插件的出站HTTP请求只允许访问本机，
+AI服务的密钥和地址被清空，回放不会调用外部服务。回复延迟按会话计算：从该群/私聊最近一条
+事件推送出去，到机器人向该群/私聊发送消息（send_*_msg / send_msg）为止，
+查询成员信息等其他API请求不算回复。
+多账号录制会全部回放到同一个连接上。
+
+用法:
+    python -m tools.replay data/recordings/frames-xxx.jsonl.gz [--speed 1] [--limit 0] [--config config.yaml]
+
+--speed 为回放倍速，0 表示不等待、以最快速度推送。
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import re
+import signal
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml  # noqa: E402
+
+from src.utils.metrics import RollingHistogram  # noqa: E402
+from src.utils.recorder import read_recording  # noqa: E402
+from src.utils.frames import classify_frame, FRAME_EVENT  # noqa: E402
+from tools.mock_napcat import MockNapCat  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_GROUP_ID = re.compile(rb'"group_id"\s*:\s*(\d+)')
+_USER_ID = re.compile(rb'"user_id"\s*:\s*(\d+)')
+# 外部服务的密钥和地址，回放时清空
+_ENDPOINT_KEYS = ("api_key", "ai_endpoint", "base_url")
+_LOCAL_HOSTS = ["127.0.0.1", "localhost", "::1"]
+
+
+def _strip_endpoints(config: Any):
+    """清空配置中所有外部服务的密钥和地址"""
+    if isinstance(config, dict):
+        for key, value in config.items():
+            if key in _ENDPOINT_KEYS:
+                config[key] = ""
+            else:
+                _strip_endpoints(value)
+    elif isinstance(config, list):
+        for item in config:
+            _strip_endpoints(item)
+
+
+def mock_config(path: str, port: int) -> Dict[str, Any]:
+    """读取机器人配置，改为连接到本机的模拟NapCat，并切断对外部服务的访问
+
+    数据文件写到当前工作目录下的 data/，调用方应先切换到临时目录。
+    """
+    with open(path, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    bot_config = config["bot"]
+    bot_config["napcat"].update({"host": "127.0.0.1", "port": port, "access_token": "", "enabled": True})
+    # 回放时只使用一个主动连接，不录制、不开服务端和指标端点
+    bot_config["connections"] = []
+    bot_config["server"] = {"enabled": False}
+    bot_config["recorder"] = {"enabled": False}
+    bot_config["metrics"] = {"enabled": False}
+    # 插件的HTTP请求只允许访问本机，AI服务不可用
+    bot_config["http"] = {**(bot_config.get("http") or {}), "allowed_hosts": _LOCAL_HOSTS}
+    _strip_endpoints(config.get("features"))
+    _strip_endpoints(config.get("plugins"))
+    return config
+
+
+def run_bot(config: Dict[str, Any]):
+    """子进程入口：运行机器人直到收到SIGTERM"""
+    async def main():
+        from src.bot import BettQQBot
+        stop = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        except NotImplementedError:  # Windows
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        bot = BettQQBot(config)
+        await bot.initialize()
+        task = asyncio.create_task(bot.start())
+        await stop.wait()
+        await bot.shutdown()
+        task.cancel()
+
+    asyncio.run(main())
+
+
+def _reply_target(action: str, params: Dict[str, Any]) -> Optional[str]:
+    """发送消息请求的目标会话，其他API请求返回None"""
+    if action != "send_msg" and not (action.startswith("send_") and action.endswith("_msg")):
+        return None
+    # send_msg 未指定 message_type 时，有 group_id 即发往群聊
+    message_type = params.get("message_type") or ("group" if params.get("group_id") else "private")
+    if "group" in action or (action == "send_msg" and message_type == "group"):
+        return f"g{params['group_id']}" if params.get("group_id") else None
+    return f"u{params['user_id']}" if params.get("user_id") else None
+
+
+def _conversation(frame: bytes) -> Optional[str]:
+    match = _GROUP_ID.search(frame)
+    if match:
+        return f"g{match.group(1).decode()}"
+    match = _USER_ID.search(frame)
+    return f"u{match.group(1).decode()}" if match else None
+
+
+async def replay(path: str, speed: float, limit: int, config_path: str, idle: float) -> Dict[str, Any]:
+    records = list(read_recording(path))
+    if limit:
+        records = records[:limit]
+    if not records:
+        raise SystemExit("录制文件为空")
+
+    mock = MockNapCat(port=0)
+    await mock.start()
+    latency = RollingHistogram(window=len(records))
+    # 会话 -> 最近一条事件的推送时间
+    pushed_at: Dict[str, float] = {}
+    actions = Counter()
+    last_request = time.perf_counter()
+
+    def on_request(request: Dict[str, Any]):
+        nonlocal last_request
+        last_request = time.perf_counter()
+        action = request.get("action") or ""
+        actions[action] += 1
+        key = _reply_target(action, request.get("params") or {})
+        sent = pushed_at.pop(key, None) if key else None
+        if sent is not None:
+            latency.observe(last_request - sent)
+    mock.on_request = on_request
+
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(target=run_bot, args=(mock_config(config_path, mock.port),))
+    process.start()
+    try:
+        await mock.wait_connected()
+        await asyncio.sleep(1)
+        start = time.perf_counter()
+        first_ts = records[0]["ts"]
+        events = 0
+        for record in records:
+            if speed > 0:
+                delay = (record["ts"] - first_ts) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            frame = record["frame"]
+            raw = frame.encode("utf-8")
+            key = _conversation(raw)
+            if key is not None and classify_frame(raw) == FRAME_EVENT:
+                pushed_at[key] = time.perf_counter()
+                events += 1
+            await mock.push_raw(frame)
+        feed_time = time.perf_counter() - start
+        last_request = max(last_request, time.perf_counter())
+        # 推送结束后等到机器人持续 idle 秒没有请求为止
+        while time.perf_counter() - last_request < idle:
+            await asyncio.sleep(0.1)
+        elapsed = max(feed_time, last_request - start)
+        return {
+            "frames": len(records),
+            "events": events,
+            "feed_seconds": round(feed_time, 2),
+            "elapsed_seconds": round(elapsed, 2),
+            "events_per_second": round(events / elapsed, 1) if elapsed else 0,
+            "requests": dict(actions),
+            "latency_ms": latency.summary(scale=1000),
+            "unanswered_conversations": len(pushed_at),
+        }
+    finally:
+        process.terminate()
+        process.join(timeout=10)
+        await mock.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放录制的事件流")
+    parser.add_argument("recording", help="录制文件路径 (.jsonl.gz)")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，0 表示最快速度")
+    parser.add_argument("--limit", type=int, default=0, help="只回放前 N 帧，0 表示全部")
+    parser.add_argument("--config", default=os.path.join(ROOT, "config.yaml"), help="机器人配置文件")
+    parser.add_argument("--idle", type=float, default=2.0, help="推送结束后无请求多少秒视为处理完毕")
+    args = parser.parse_args()
+
+    recording = os.path.abspath(args.recording)
+    config_path = os.path.abspath(args.config)
+    # 插件的数据文件按工作目录下的相对路径读写，切换到临时目录后从空数据开始
+    os.chdir(tempfile.mkdtemp(prefix="replay_"))
+    result = asyncio.run(replay(recording, args.speed, args.limit, config_path, args.idle))
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()